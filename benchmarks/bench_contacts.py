@@ -0,0 +1,48 @@
+"""
+Benchmark for finding close contacts
+
+Compares computing the distances of all pairs with the minimum image
+convention with ``close_contacts``, which only compares ions in
+neighbouring bins.
+Usage: python benchmarks/bench_contacts.py [natoms ...]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from castepinput.contacts import close_contacts
+
+# Ions per cubic angstrom and the cutoff
+DENSITY = 0.1
+CUTOFF = 1.5
+
+
+def all_pairs(cell, scaled, cutoff):
+    """Minimum image distances of all pairs, for orthorhombic cells"""
+    diff = scaled[None, :, :] - scaled[:, None, :]
+    diff -= np.rint(diff)
+    dists = np.linalg.norm(diff @ cell, axis=2)
+    i, j = np.nonzero(np.triu(dists < cutoff, 1))
+    return i, j, dists[i, j]
+
+
+def main(sizes):
+    rng = np.random.default_rng(0)
+    for natoms in sizes:
+        cell = np.eye(3) * (natoms / DENSITY) ** (1 / 3)
+        scaled = rng.random((natoms, 3))
+        start = time.perf_counter()
+        npairs = len(close_contacts(cell, scaled, CUTOFF)[0])
+        t_bins = time.perf_counter() - start
+        line = f"natoms={natoms:>9d}  pairs={npairs:>8d}  cell lists: {t_bins:.3f} s"
+        if natoms <= 5000:
+            start = time.perf_counter()
+            assert len(all_pairs(cell, scaled, CUTOFF)[0]) == npairs
+            line += f"  all pairs: {time.perf_counter() - start:.3f} s"
+        print(line)
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 5000, 100000, 1000000])
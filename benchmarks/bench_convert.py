@@ -0,0 +1,60 @@
+"""
+Micro-benchmark for the type conversion of keyword values
+
+Compares ``convert_type_kw`` with trying each of the converters in turn.
+Usage: python benchmarks/bench_convert.py [repeat]
+"""
+
+import sys
+import timeit
+
+from castepinput.parser import PlainParser, _convert_type_slow, convert_type_kw
+
+# Content of a realistic param file
+PARAM_LINES = """
+task                : geometryoptimisation
+xc_functional       : pbesol
+cut_off_energy      : 450
+grid_scale          : 2.0
+fine_grid_scale     : 2.5
+spin_polarized      : true
+elec_energy_tol     : 1e-08
+max_scf_cycles      : 100
+geom_max_iter       : 200
+geom_force_tol      : 0.05
+mix_charge_amp      : 0.5
+opt_strategy        : speed
+basis_precision     : precise
+finite_basis_corr   : 0
+write_checkpoint    : minimal
+kpoints_mp_grid     : 4 4 4
+kpoints_mp_offset   : 0.25 0.25 0.25
+calculate_stress    : false
+metals_method       : dm
+comment             : a high throughput screening run
+iprint              : 1
+symmetry_generate
+""".splitlines()
+
+
+def main(repeat):
+    values = list(PlainParser(PARAM_LINES).get_dict().items())
+
+    def convert(func):
+        for key, value in values:
+            func(value, key)
+
+    def convert_slow(value, _key):
+        return _convert_type_slow(value)
+
+    t_fast = min(timeit.repeat(lambda: convert(convert_type_kw), number=repeat, repeat=5))
+    t_slow = min(timeit.repeat(lambda: convert(convert_slow), number=repeat, repeat=5))
+    nvalues = len(values) * repeat
+    print(f"{nvalues} values converted")
+    print(f"converters : {t_slow:.4f} s ({t_slow / nvalues * 1e6:.2f} us per value)")
+    print(f"single pass: {t_fast:.4f} s ({t_fast / nvalues * 1e6:.2f} us per value)")
+    print(f"speedup: {t_slow / t_fast:.2f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
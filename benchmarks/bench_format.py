@@ -0,0 +1,50 @@
+"""
+Benchmark for formatting positions blocks
+
+Compares formatting each line with ``construct_pos_line`` with the bulk
+rendering of ``NumericBlock`` used by ``CellInput.set_positions``.
+Usage: python benchmarks/bench_format.py [natoms ...]
+"""
+
+import sys
+import timeit
+
+import numpy as np
+
+from castepinput.common import NumericBlock
+from castepinput.inputs import construct_pos_line
+
+
+def make_positions(natoms, seed=0):
+    """Generate random positions with some tagged atoms"""
+    rng = np.random.default_rng(seed)
+    elems = ["Fe"] * natoms
+    pos = rng.random((natoms, 3)) * 20 - 10
+    tags = ["SPIN=1" if i % 2 else "" for i in range(natoms)]
+    return elems, pos, tags
+
+
+def per_line(elems, pos, tags):
+    """The per-line formatting path"""
+    return [construct_pos_line(*args) for args in zip(elems, pos.tolist(), tags)]
+
+
+def bulk(elems, pos, tags):
+    """Formatting through a NumericBlock"""
+    return list(NumericBlock(pos, labels=elems, tags=tags))
+
+
+def main(sizes):
+    for natoms in sizes:
+        args = make_positions(natoms)
+        assert per_line(*args) == bulk(*args)
+        t_line = min(timeit.repeat(lambda: per_line(*args), number=1, repeat=3))
+        t_bulk = min(timeit.repeat(lambda: bulk(*args), number=1, repeat=3))
+        print(
+            f"natoms={natoms:>8d}  per-line: {t_line:.4f} s  "
+            f"bulk: {t_bulk:.4f} s  speedup: {t_line / t_bulk:.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 100000, 1000000])
@@ -0,0 +1,39 @@
+"""
+Benchmark for converting lattice parameters to cell vectors
+
+Compares calling ``cell_abcs_to_vec`` for each cell with converting all
+cells at once with ``cell_abcs_to_vecs``.
+Usage: python benchmarks/bench_lattice.py [ncells ...]
+"""
+
+import sys
+import timeit
+
+import numpy as np
+
+from castepinput.common import cell_abcs_to_vec, cell_abcs_to_vecs
+
+
+def make_abcs(ncells, seed=0):
+    """Random lattice parameters, a third of them orthorhombic"""
+    rng = np.random.default_rng(seed)
+    abcs = np.column_stack([rng.random((ncells, 3)) * 10 + 1, rng.uniform(60, 120, (ncells, 3))])
+    abcs[::3, 3:] = 90.0
+    return abcs
+
+
+def main(sizes):
+    for ncells in sizes:
+        abcs = make_abcs(ncells)
+        t_loop = min(
+            timeit.repeat(lambda: [cell_abcs_to_vec(abc) for abc in abcs], number=1, repeat=3)
+        )
+        t_bulk = min(timeit.repeat(lambda: cell_abcs_to_vecs(abcs), number=1, repeat=3))
+        print(
+            f"ncells={ncells:>8d}  per-cell: {t_loop:.4f} s  "
+            f"vectorized: {t_bulk:.4f} s  speedup: {t_loop / t_bulk:.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 100000])
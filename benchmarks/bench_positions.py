@@ -0,0 +1,49 @@
+"""
+Benchmark for parsing positions blocks
+
+Compares the per-line ``parse_pos_line`` path with the bulk ``parse_pos_block``.
+Usage: python benchmarks/bench_positions.py [natoms ...]
+"""
+import sys
+import timeit
+
+import numpy as np
+
+from castepinput.inputs import parse_pos_line, parse_pos_block
+
+
+def make_lines(natoms, seed=0):
+    """Generate lines of a positions block with some tagged atoms"""
+    rng = np.random.default_rng(seed)
+    pos = rng.random((natoms, 3)) * 10
+    lines = []
+    for i, (x, y, z) in enumerate(pos):
+        tag = " SPIN=1" if i % 2 else ""
+        lines.append(f"Fe {x:.10f} {y:.10f} {z:.10f}{tag}")
+    return lines
+
+
+def per_line(lines):
+    """The per-line parsing path"""
+    elems, pos, tags = [], [], []
+    for line in lines:
+        elem, coor, tag = parse_pos_line(line)
+        elems.append(elem)
+        pos.append(coor)
+        tags.append(tag)
+    return elems, np.array(pos), tags
+
+
+def main(sizes):
+    for natoms in sizes:
+        lines = make_lines(natoms)
+        t_line = min(timeit.repeat(lambda: per_line(lines), number=1, repeat=3))
+        t_block = min(timeit.repeat(lambda: parse_pos_block(lines), number=1, repeat=3))
+        print(
+            f"natoms={natoms:>8d}  per-line: {t_line:.4f} s  "
+            f"block: {t_block:.4f} s  speedup: {t_line / t_block:.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 50000, 500000])
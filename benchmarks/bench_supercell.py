@@ -0,0 +1,67 @@
+"""
+Benchmark for building supercells
+
+Compares tiling the positions with ``get_positions``/``set_positions`` and
+saving with building the supercell with ``CellInput.make_supercell``, both
+in memory and streamed to a file.
+Usage: python benchmarks/bench_supercell.py [repeat ...]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from castepinput import CellInput
+
+
+def make_cell(natoms=8, seed=0):
+    rng = np.random.default_rng(seed)
+    cell = CellInput()
+    cell.set_cell([[5.0, 0, 0], [0.5, 5.0, 0], [0, 0.3, 5.0]])
+    cell.set_scaled_positions(["Si"] * natoms, rng.random((natoms, 3)), frac=False)
+    return cell
+
+
+def tile(cell, repeat, fname):
+    """Build the supercell by hand"""
+    elems, pos, tags = cell.get_positions()
+    vecs = cell.get_cell()
+    shifts = np.stack(np.meshgrid(*[np.arange(n) for n in repeat], indexing="ij"), -1)
+    shifts = shifts.reshape(-1, 3) @ vecs
+    out = CellInput()
+    out.set_cell(np.diag(repeat) @ vecs)
+    out.set_positions(
+        elems * len(shifts),
+        (pos[None, :, :] + shifts[:, None, :]).reshape(-1, 3),
+        tags * len(shifts),
+    )
+    out.save(fname)
+
+
+def main(repeats):
+    cell = make_cell()
+    with tempfile.TemporaryDirectory() as workdir:
+        fname = os.path.join(workdir, "supercell.cell")
+        for repeat in repeats:
+            natoms = len(cell["positions_abs"]) * int(np.prod(repeat))
+            timings = {}
+            for name, func in [
+                ("tile", lambda: tile(cell, repeat, fname)),
+                ("make_supercell", lambda: cell.make_supercell(repeat).save(fname)),
+                ("streamed", lambda: cell.make_supercell(repeat, fname=fname)),
+            ]:
+                start = time.perf_counter()
+                func()
+                timings[name] = time.perf_counter() - start
+            print(
+                f"natoms={natoms:>9d}  "
+                + "  ".join(f"{name}: {value:.3f} s" for name, value in timings.items())
+            )
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10, 25, 50]
+    main([(size, size, size) for size in sizes])
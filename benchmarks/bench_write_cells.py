@@ -0,0 +1,66 @@
+"""
+Benchmark for writing many cell files from a template
+
+Compares calling ``set_positions``/``set_cell``/``save`` for each structure
+with ``write_cells``, reporting the number of files written per second.
+Usage: python benchmarks/bench_write_cells.py [nframes] [natoms]
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from castepinput import CellInput, write_cells
+
+
+def make_template(natoms, seed=0):
+    """A template cell with a few keywords and random positions"""
+    rng = np.random.default_rng(seed)
+    cell = CellInput()
+    cell.header = ["Template for the benchmark"]
+    cell.set_cell(np.eye(3) * 10)
+    elems = ["Si", "O"] * (natoms // 2) + ["Si"] * (natoms % 2)
+    cell.set_positions(elems, rng.random((natoms, 3)) * 10)
+    cell["kpoints_mp_spacing"] = 0.05
+    cell["symmetry_generate"] = ""
+    cell["fix_all_cell"] = "true"
+    return cell
+
+
+def per_file(template, positions, cells, workdir):
+    """Setting the blocks and saving one file at a time"""
+    elems, _, tags = template.get_positions()
+    for idx, (pos, cell) in enumerate(zip(positions, cells)):
+        template.set_positions(elems, pos, tags)
+        template.set_cell(cell)
+        template.save(str(workdir / f"{idx:05d}.cell"))
+
+
+def batched(template, positions, cells, workdir):
+    """Writing all files with write_cells"""
+    write_cells(template, positions, cells, fnames=str(workdir / "{:05d}.cell"))
+
+
+def main(nframes=1000, natoms=64):
+    template = make_template(natoms)
+    rng = np.random.default_rng(1)
+    positions = rng.random((nframes, natoms, 3)) * 10
+    cells = np.eye(3) * 10 + rng.random((nframes, 3, 3)) * 0.1
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        for name, func in [("per-file", per_file), ("write_cells", batched)]:
+            start = time.perf_counter()
+            func(template, positions, cells, workdir)
+            elapsed = time.perf_counter() - start
+            print(
+                f"{name:<12} nframes={nframes} natoms={natoms}  "
+                f"{elapsed:.3f} s  {nframes / elapsed:.0f} files/s"
+            )
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,231 @@
+"""
+Benchmark suite for the parsers, type conversion and writers
+
+Synthetic ``.cell`` and ``.param`` files of the requested sizes are generated
+in a temporary directory, and each stage is timed with the peak memory traced.
+The results are written as JSON together with the commit benchmarked, so that
+runs on different commits can be compared.
+
+Usage:
+    python benchmarks/suite.py [--natoms 10 1000 ...] [--nkeywords 200]
+                               [--output results.json]
+    python benchmarks/suite.py --compare old.json new.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import castepinput
+from castepinput import CellInput, ParamInput
+from castepinput.parser import Parser, PlainParser, convert_type_kw
+
+ELEMENTS = ["Fe", "O", "Si", "Ce", "H"]
+
+
+def make_cell_file(fname, natoms, ncomments=100, seed=0):
+    """Write a cell file with random positions and many comments"""
+    rng = np.random.default_rng(seed)
+    pos = rng.random((natoms, 3)) * 10
+    with open(fname, "w", encoding="utf-8") as fhandle:
+        for i in range(ncomments):
+            fhandle.write(f"# Comment line {i} of the synthetic cell\n")
+        fhandle.write("%BLOCK lattice_cart\n")
+        fhandle.write("10.0 0.0 0.0 ! a\n0.0 10.0 0.0 ! b\n0.0 0.0 10.0 ! c\n")
+        fhandle.write("%ENDBLOCK lattice_cart\n\n%BLOCK positions_frac\n")
+        for i, (x, y, z) in enumerate(pos.tolist()):
+            elem = ELEMENTS[i % len(ELEMENTS)]
+            tag = " SPIN=1.0" if i % 7 == 0 else ""
+            comment = " # comment" if i % 11 == 0 else ""
+            fhandle.write(f"{elem} {x:.10f} {y:.10f} {z:.10f}{tag}{comment}\n")
+        fhandle.write("%ENDBLOCK positions_frac\n\n")
+        fhandle.write("kpoints_mp_spacing : 0.05\nsymmetry_generate\nfix_all_cell : true\n")
+
+
+def make_param_file(fname, nkeywords, ncomments=100):
+    """Write a param file with keywords of different types and comments"""
+    values = ["singlepoint", "300", "1e-6", "true", "1 2 3", "0.5 0.5 0.5", ""]
+    with open(fname, "w", encoding="utf-8") as fhandle:
+        for i in range(ncomments):
+            fhandle.write(f"! Comment line {i} of the synthetic param\n")
+        for i in range(nkeywords):
+            value = values[i % len(values)]
+            comment = " # trailing" if i % 5 == 0 else ""
+            sep = " : " if i % 2 else " = "
+            line = f"keyword_{i}{sep}{value}" if value else f"keyword_{i}"
+            fhandle.write(line + comment + "\n")
+
+
+def measure(func, repeat=3):
+    """
+    Time a function and trace its peak memory
+
+    :returns: A dictionary of the best time in seconds and the peak memory in bytes
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"time": min(times), "peak_memory": peak}
+
+
+def cell_stages(fname, workdir):
+    """The stages benchmarked for a cell file"""
+    with open(fname, encoding="utf-8") as fhandle:
+        lines = fhandle.readlines()
+    cell = CellInput.from_file(fname)
+    elems, pos, tags = cell.get_positions()
+    outname = os.path.join(workdir, "out.cell")
+    sidecar = os.path.join(workdir, "out.sidecar")
+    # Positions stored as arrays in the sidecar
+    numeric = CellInput.from_file(fname)
+    del numeric["positions_frac"]
+    numeric.set_positions(elems, pos, tags)
+    numeric.save_sidecar(sidecar)
+
+    def set_and_save():
+        cell.set_positions(elems, pos, tags)
+        cell.save(outname)
+
+    return {
+        "plain_parse": lambda: PlainParser(lines).get_dict(),
+        "plain_parse_regex": lambda: PlainParser(fname, engine="regex").get_dict(),
+        "parse": lambda: Parser(lines).get_dict(),
+        "from_file": lambda: CellInput.from_file(fname),
+        "from_file_regex": lambda: CellInput.from_file(fname, engine="regex"),
+        "from_file_lazy": lambda: CellInput.from_file(fname, lazy=True),
+        "get_positions": lambda: CellInput.from_file(fname).get_positions(),
+        "set_positions": lambda: cell.set_positions(elems, pos, tags),
+        "render": lambda: "\n".join(cell.iter_lines(cache=False)),
+        "save": set_and_save,
+        "save_stream": lambda: cell.save(outname, cache=False),
+        "save_sidecar": lambda: numeric.save_sidecar(sidecar),
+        "from_sidecar": lambda: CellInput.from_sidecar(sidecar),
+    }
+
+
+def param_stages(fname):
+    """The stages benchmarked for a param file"""
+    with open(fname, encoding="utf-8") as fhandle:
+        lines = fhandle.readlines()
+    plain = PlainParser(lines).get_dict()
+    param = ParamInput.from_file(fname)
+
+    return {
+        "plain_parse": lambda: PlainParser(lines).get_dict(),
+        "plain_parse_regex": lambda: PlainParser(fname, engine="regex").get_dict(),
+        "convert_type": lambda: [convert_type_kw(val, key) for key, val in plain.items()],
+        "from_file": lambda: ParamInput.from_file(fname),
+        "get_file_lines": lambda: param.get_file_lines(),
+    }
+
+
+def git_commit():
+    """Return the commit being benchmarked"""
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+def run(natoms_list, nkeywords, repeat):
+    """Run all benchmarks and return the results"""
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for natoms in natoms_list:
+            fname = os.path.join(workdir, f"synthetic-{natoms}.cell")
+            make_cell_file(fname, natoms)
+            nrepeat = repeat if natoms < 100000 else 1
+            for stage, func in cell_stages(fname, workdir).items():
+                res = measure(func, nrepeat)
+                results.append({"file": "cell", "size": natoms, "stage": stage, **res})
+                print_result(results[-1])
+
+        fname = os.path.join(workdir, "synthetic.param")
+        make_param_file(fname, nkeywords)
+        for stage, func in param_stages(fname).items():
+            res = measure(func, repeat)
+            results.append({"file": "param", "size": nkeywords, "stage": stage, **res})
+            print_result(results[-1])
+
+    return {
+        "commit": git_commit(),
+        "version": castepinput.__version__,
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+
+
+def print_result(res):
+    print(
+        f"{res['file']:<6} size={res['size']:>8d}  {res['stage']:<16} "
+        f"{res['time']:10.4f} s  peak {res['peak_memory'] / 1e6:10.2f} MB"
+    )
+
+
+def compare(old_name, new_name):
+    """Print the ratios of the times and peak memory of two runs"""
+    with open(old_name, encoding="utf-8") as fhandle:
+        old = json.load(fhandle)
+    with open(new_name, encoding="utf-8") as fhandle:
+        new = json.load(fhandle)
+    print(f"old: {old['commit']}\nnew: {new['commit']}")
+    old_results = {(res["file"], res["size"], res["stage"]): res for res in old["results"]}
+    for res in new["results"]:
+        key = (res["file"], res["size"], res["stage"])
+        if key not in old_results:
+            continue
+        ref = old_results[key]
+        print(
+            f"{key[0]:<6} size={key[1]:>8d}  {key[2]:<16} "
+            f"time {res['time'] / ref['time']:6.2f}x  "
+            f"memory {res['peak_memory'] / max(ref['peak_memory'], 1):6.2f}x"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--natoms", type=int, nargs="+", default=[10, 1000, 100000])
+    parser.add_argument("--nkeywords", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    data = run(args.natoms, args.nkeywords, args.repeat)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fhandle:
+            json.dump(data, fhandle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,18 @@
 Base module of castepinput
 """
 from .inputs import ParamInput, CellInput
-from .common import Block
+from .common import Block, NumericBlock
+from .batch import aload_many, load_many, write_cells
+from .tags import PositionTags
 
 __version__ = "0.1.10"
-__all__ = ["Block", "ParamInput", "CellInput"]
+__all__ = [
+    "Block",
+    "NumericBlock",
+    "ParamInput",
+    "CellInput",
+    "PositionTags",
+    "aload_many",
+    "load_many",
+    "write_cells",
+]
@@ -0,0 +1,69 @@
+"""
+Helpers for loading and saving inputs from asyncio code
+
+The blocking work of reading, parsing, rendering and writing files is run in
+a shared executor so that the event loop is never blocked.
+"""
+
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+_executor = None
+
+
+def get_executor():
+    """Return the shared executor, creating a thread pool if not set"""
+    global _executor  # pylint: disable=global-statement
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=min(32, (os.cpu_count() or 1) + 4),
+            thread_name_prefix="castepinput",
+        )
+    return _executor
+
+
+def set_executor(executor):
+    """
+    Set the shared executor, e.g. a ProcessPoolExecutor for CPU bound parsing.
+    The previous executor is not shut down.
+    """
+    global _executor  # pylint: disable=global-statement
+    _executor = executor
+
+
+async def run_in_executor(func, *args, executor=None, **kwargs):
+    """
+    Run a blocking function in an executor and wait for the result
+
+    :param executor: The executor to use, default to the shared one
+    """
+    if executor is None:
+        executor = get_executor()
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+
+
+async def gather_bounded(aws, limit=16, return_exceptions=False):
+    """
+    Wait for many awaitables with at most ``limit`` of them running at once
+
+    Coroutines are only started when a slot is free, so it is fine to pass
+    a large number of them.
+
+    :param aws: An iterable of awaitables
+    :param limit: Maximum number of awaitables running at the same time
+    :param return_exceptions: Return the exceptions raised as results
+      instead of raising the first one
+    :returns: A list of the results in the same order as ``aws``
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def bounded(awaitable):
+        async with semaphore:
+            return await awaitable
+
+    return await asyncio.gather(
+        *[bounded(awaitable) for awaitable in aws], return_exceptions=return_exceptions
+    )
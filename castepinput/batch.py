@@ -0,0 +1,204 @@
+"""
+Loading and writing many input files at once
+"""
+
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+from .aio import gather_bounded, run_in_executor
+from .common import RENDER_CHUNK_SIZE, NumericBlock
+from .inputs import _NO_UNIT, CastepInput, CellInput, ParamInput
+
+LoadResult = namedtuple("LoadResult", ["path", "data", "error"])
+LoadResult.__doc__ = """
+Result of loading a single file. ``data`` is None if the file could not be
+loaded, in which case ``error`` is the exception raised.
+"""
+
+INPUT_CLASSES = {".cell": CellInput, ".param": ParamInput}
+
+
+def input_class(path):
+    """Return the class for loading a file based on its extension"""
+    return INPUT_CLASSES.get(os.path.splitext(path)[1].lower(), CastepInput)
+
+
+def _load_one(task):
+    """Load a single file, returning a LoadResult"""
+    path, plain, cls, engine = task
+    if cls is None:
+        cls = input_class(path)
+    try:
+        data = cls.from_file(path, plain, engine=engine)
+    except Exception as error:  # pylint: disable=broad-except
+        return LoadResult(path, None, error)
+    return LoadResult(path, data, None)
+
+
+def load_many(paths, workers=None, plain=False, cls=None, chunksize=None, engine="lines"):
+    """
+    Load many files in parallel using a process pool
+
+    Errors are reported per file instead of stopping the whole batch.
+
+    :param paths: An iterable of paths to the files
+    :param workers: Number of processes to use, default to the number of CPUs.
+      With a single worker the files are loaded in the current process.
+    :param plain: Do not convert the types of the values
+    :param cls: Class used for loading, default to one based on the extension
+    :param chunksize: Number of files sent to a worker process at a time
+    :param engine: The engine used for parsing, see ``CastepInput.load_file``
+    :returns: An iterator of ``LoadResult`` in the same order as the paths
+    """
+    tasks = [(path, plain, cls, engine) for path in paths]
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(tasks))
+
+    if workers <= 1:
+        yield from map(_load_one, tasks)
+        return
+
+    if chunksize is None:
+        # A few chunks per worker to balance the load
+        chunksize = max(1, len(tasks) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(_load_one, tasks, chunksize=chunksize)
+
+
+async def aload_many(paths, limit=16, plain=False, cls=None, executor=None, engine="lines"):
+    """
+    Load many files from asyncio code, with at most ``limit`` files loaded
+    at the same time in the executor
+
+    :param paths: An iterable of paths to the files
+    :param limit: Maximum number of files being loaded at once
+    :param plain: Do not convert the types of the values
+    :param cls: Class used for loading, default to one based on the extension
+    :param executor: The executor to use, default to the shared one
+    :param engine: The engine used for parsing, see ``CastepInput.load_file``
+    :returns: A list of ``LoadResult`` in the same order as the paths
+    """
+    tasks = [(path, plain, cls, engine) for path in paths]
+    return await gather_bounded(
+        (run_in_executor(_load_one, task, executor=executor) for task in tasks), limit=limit
+    )
+
+
+def _lines_text(lines):
+    """Join lines into text, each line terminated by a newline"""
+    return "".join(line + "\n" for line in lines)
+
+
+def _render_frames(values, labels=None, tags=None, sep=" "):
+    """
+    Render a stack of (M, N, 3) values as M blocks of lines in one go
+
+    :returns: A list of M strings, each the lines of a block joined by newlines
+    """
+    nframes, nrows = values.shape[:2]
+    if labels is not None:
+        labels = np.tile(labels, nframes)
+    if tags is not None:
+        tags = np.tile(tags, nframes)
+    block = NumericBlock(values.reshape(-1, values.shape[2]), labels=labels, tags=tags, sep=sep)
+    lines = block.render()
+    return ["\n".join(lines[i : i + nrows]) for i in range(0, len(lines), nrows)]
+
+
+def write_cells(template, positions, cells=None, fnames="{:05d}.cell", workers=None):
+    """
+    Write many cell files sharing the same template
+
+    Each file has the same content as the template with its positions (and
+    lattice_cart if ``cells`` is given) replaced, as ``set_positions``,
+    ``set_cell`` and ``save`` would give. Absolute positions and cell vectors
+    are in angstrom, so the units of the replaced blocks are not written.
+    The rest of the template is only rendered once, the replaced blocks of
+    many structures are formatted together and the files are written in
+    parallel with a thread pool.
+
+    :param template: A CellInput with the positions block to be replaced, in
+      either ``positions_abs`` or ``positions_frac``
+    :param positions: A (M, N, 3) array of the positions of the M structures
+    :param cells: A (M, 3, 3) array of the cell vectors
+    :param fnames: A sequence of M file names, or a pattern formatted with the
+      index of each structure
+    :param workers: Number of threads to use
+    :returns: A list of the file names written
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+    if positions.ndim != 3 or positions.shape[2] != 3:
+        raise ValueError(f"Positions must be a (M, N, 3) array, but {positions.shape} is given")
+    nframes = positions.shape[0]
+    if cells is not None:
+        cells = np.asarray(cells, dtype=np.float64)
+        if cells.shape != (nframes, 3, 3):
+            raise ValueError(f"Cells must be a ({nframes}, 3, 3) array")
+    if isinstance(fnames, str):
+        fnames = [fnames.format(i) for i in range(nframes)]
+    else:
+        fnames = list(fnames)
+        if len(fnames) != nframes:
+            raise ValueError("There must be one file name per structure")
+
+    pos_key = "positions_abs" if template.get("positions_abs") else "positions_frac"
+    elems, _, tags = template.get_positions()
+    if positions.shape[1] != len(elems):
+        raise ValueError(f"The template has {len(elems)} atoms, but {positions.shape[1]} are given")
+    labels = np.array(elems, dtype=str)
+    tags = np.array(tags, dtype=str)
+
+    # Split the template into static text and the blocks to be replaced
+    replaced = [pos_key] if cells is None else [pos_key, "lattice_cart"]
+    segments = []
+    lines = list(template._iter_header())
+    for key, value in template.items():
+        if key in replaced:
+            segments.extend([_lines_text(lines), key])
+            lines = []
+        elif key == "lattice_abc" and cells is not None:
+            # Replaced by lattice_cart as in set_cell
+            continue
+        else:
+            lines.extend(template._iter_item(key, value))
+    segments.append(_lines_text(lines))
+    if cells is not None and "lattice_cart" not in template:
+        segments.append("lattice_cart")
+    # Text around the content of the replaced blocks
+    wrappers = {}
+    for key in replaced:
+        # set_positions and set_cell remove the units of the blocks they set
+        unit = template.units.get(key, _NO_UNIT) if key == "positions_frac" else _NO_UNIT
+        lines = list(CastepInput._iter_block(key, [], unit))
+        wrappers[key] = (_lines_text(lines[:-1]), _lines_text(lines[-1:]))
+
+    def write_group(group):
+        # Render the blocks of the whole group at once
+        blocks = {pos_key: _render_frames(positions[group], labels, tags)}
+        if cells is not None:
+            blocks["lattice_cart"] = _render_frames(cells[group], sep="  ")
+        for iframe, idx in enumerate(range(group.start, group.stop)):
+            with open(fnames[idx], "w", encoding="utf-8") as fhandle:
+                for seg in segments:
+                    if seg in blocks:
+                        head, tail = wrappers[seg]
+                        seg = head + blocks[seg][iframe] + "\n" + tail
+                    fhandle.write(seg)
+
+    # Group the structures so that each group renders a few thousand lines
+    group_size = max(1, RENDER_CHUNK_SIZE // positions.shape[1])
+    groups = [slice(i, min(i + group_size, nframes)) for i in range(0, nframes, group_size)]
+    if workers is None:
+        workers = min(32, os.cpu_count() or 1)
+    if workers <= 1:
+        for group in groups:
+            write_group(group)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Consume the results to raise any errors
+            list(executor.map(write_group, groups))
+    return fnames
@@ -0,0 +1,166 @@
+"""
+Cache for the parsed content of input files
+"""
+
+import copy
+import hashlib
+import os
+import pickle
+from collections import OrderedDict
+
+from .common import Block
+from .parser import parse_file
+
+
+def copy_dict(dict_out):
+    """
+    Copy a parsed dictionary so that the copy can be modified independently
+
+    Parsed values are strings, numbers, booleans or lists of them, so the
+    lists and blocks are copied at the top level only.
+    """
+    out = {}
+    for key, value in dict_out.items():
+        if type(value) in (Block, list):
+            value = type(value)(value)
+        elif isinstance(value, list):
+            value = copy.deepcopy(value)
+        out[key] = value
+    return out
+
+
+class ParseCache:
+    """
+    A least recently used cache of parsed files.
+
+    Entries are keyed by the path, modification time and size of the file, or
+    the hash of the content if ``use_hash`` is True. Each lookup returns a new
+    copy so that modifying the loaded inputs never changes the cache.
+
+    The number of hits and misses are counted in ``hits`` and ``misses``.
+    """
+
+    def __init__(self, max_entries=128, max_bytes=None, directory=None, use_hash=False):
+        """
+        Instantiate a cache
+
+        :param max_entries: Maximum number of files kept in memory
+        :param max_bytes: Maximum total size of the files kept in memory
+        :param directory: A folder for keeping pickled entries across runs
+        :param use_hash: Use the hash of the content rather than the path,
+          modification time and size as the key
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.use_hash = use_hash
+        self._entries = OrderedDict()
+        self._nbytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def nbytes(self):
+        """Total size of the files with entries in memory"""
+        return self._nbytes
+
+    @property
+    def stats(self):
+        """A dictionary of the counters"""
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "nbytes": self._nbytes,
+        }
+
+    def get_key(self, fname, plain=False):
+        """Return the key of a file and its size"""
+        stat = os.stat(fname)
+        if self.use_hash:
+            digest = hashlib.sha256()
+            with open(fname, "rb") as fhandle:
+                for chunk in iter(lambda: fhandle.read(1 << 20), b""):
+                    digest.update(chunk)
+            return (digest.hexdigest(), plain), stat.st_size
+        return (os.path.abspath(fname), stat.st_mtime_ns, stat.st_size, plain), stat.st_size
+
+    def get_dict(self, fname, plain=False, engine="lines"):
+        """
+        Return the parsed dictionary of a file, parsing it if needed
+
+        :param plain: Do not convert the types of the values
+        :param engine: The engine used for parsing on a miss, see ``PlainParser``.
+          Both engines give the same result, so it is not part of the key.
+        """
+        key, size = self.get_key(fname, plain)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy_dict(entry[0])
+
+        dict_out = self._load_disk(key)
+        if dict_out is not None:
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            dict_out = parse_file(fname, plain, engine)
+            self._save_disk(key, dict_out)
+        self._add(key, dict_out, size)
+        return copy_dict(dict_out)
+
+    def _add(self, key, dict_out, size):
+        """Add an entry and evict the least recently used ones"""
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        self._entries[key] = (dict_out, size)
+        self._nbytes += size
+        while len(self._entries) > self.max_entries or (
+            self.max_bytes is not None and self._nbytes > self.max_bytes
+        ):
+            _, (_, old_size) = self._entries.popitem(last=False)
+            self._nbytes -= old_size
+
+    def _disk_path(self, key):
+        """Path of the pickled entry on the disk"""
+        name = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, name + ".pkl")
+
+    def _load_disk(self, key):
+        """Load an entry from the disk, return None if not found"""
+        if self.directory is None:
+            return None
+        try:
+            with open(self._disk_path(key), "rb") as fhandle:
+                return pickle.load(fhandle)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def _save_disk(self, key, dict_out):
+        """Save an entry to the disk"""
+        if self.directory is None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as fhandle:
+            pickle.dump(dict_out, fhandle, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def clear(self):
+        """Remove all entries in memory and reset the counters"""
+        self._entries.clear()
+        self._nbytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+
+# Cache used when ``cache=True`` is passed to ``CastepInput.from_file``
+default_cache = ParseCache()
@@ -3,7 +3,11 @@ Module for some shared things
 """
 from __future__ import division, print_function
 from __future__ import absolute_import
-from math import sin, cos, pi, sqrt
+import operator
+import re
+import sys
+from functools import lru_cache
+from math import pi
 
 import numpy as np
 
@@ -14,11 +18,57 @@ class FormatError(RuntimeError):
     pass
 
 
+def _versioned(name):
+    """Wrap a list method so that the version of the block is increased"""
+    method = getattr(list, name)
+
+    def wrapped(self, *args, **kwargs):
+        self.version += 1
+        return method(self, *args, **kwargs)
+
+    wrapped.__name__ = name
+    wrapped.__doc__ = method.__doc__
+    return wrapped
+
+
+def _detaching(name, modify=True):
+    """Wrap a list method so that a deferred block becomes a plain list of strings first"""
+    method = getattr(list, name)
+
+    def wrapped(self, *args, **kwargs):
+        self.detach()
+        if modify:
+            self.version += 1
+        return method(self, *args, **kwargs)
+
+    wrapped.__name__ = name
+    wrapped.__doc__ = method.__doc__
+    return wrapped
+
+
+def _rendering(name):
+    """Wrap a list method so that it operates on the rendered lines"""
+    method = getattr(list, name)
+
+    def wrapped(self, *args, **kwargs):
+        if self.is_numeric:
+            return method(self.render(), *args, **kwargs)
+        return method(self, *args, **kwargs)
+
+    wrapped.__name__ = name
+    wrapped.__doc__ = method.__doc__
+    return wrapped
+
+
 class Block(list):
     """
     A class for blocks in CASTEP inputs files stored as a list of strings
+
+    ``version`` is increased every time the content is modified in place.
     """
 
+    version = 0
+
     def __repr__(self):
         r = super().__repr__()
         return "Block(" + r + ")"
@@ -34,6 +84,486 @@ class Block(list):
             return self
         return f
 
+    __setitem__ = _versioned("__setitem__")
+    __delitem__ = _versioned("__delitem__")
+    __iadd__ = _versioned("__iadd__")
+    __imul__ = _versioned("__imul__")
+    append = _versioned("append")
+    extend = _versioned("extend")
+    insert = _versioned("insert")
+    pop = _versioned("pop")
+    remove = _versioned("remove")
+    clear = _versioned("clear")
+    sort = _versioned("sort")
+    reverse = _versioned("reverse")
+
+
+# Number of rows rendered at a time when iterating through a NumericBlock
+RENDER_CHUNK_SIZE = 4096
+
+# Formats of values that can be rendered in bulk
+fixed_fmt = re.compile(r"\{:\.(\d+)f\}")
+
+
+@lru_cache(maxsize=None)
+def _digit_tables():
+    """
+    Return the ASCII digits of 0 - 99999 as (100000, 5) arrays, with the leading
+    zeros and with the leading zeros replaced by zero bytes
+    """
+    numbers = np.arange(100000)
+    digits = ((numbers[:, None] // 10 ** np.arange(4, -1, -1)) % 10 + ord("0")).astype(np.uint8)
+    int_digits = digits.copy()
+    leading = np.cumsum(digits != ord("0"), axis=1) == 0
+    leading[:, -1] = False
+    int_digits[leading] = 0
+    return digits, int_digits
+
+
+def format_fixed(values, precision=10):
+    """
+    Format an array of floats as ``{:.<precision>f}`` would in bulk.
+
+    :param values: An array of floats
+    :param precision: Number of digits after the decimal point, from 1 to 10
+    :returns: A tuple of a (M, 7 + precision) uint8 array of the characters of
+      each value, padded with zero bytes, and a boolean mask of the values that
+      are formatted. Other values (non-finite, not less than 1e5 or too close
+      to a rounding boundary) are left for formatting in python.
+    """
+    if not 1 <= precision <= 10:
+        raise ValueError(f"Precision must be between 1 and 10, but {precision} is given")
+    values = np.asarray(values, dtype=np.float64).ravel()
+    absval = np.abs(values)
+    done = np.isfinite(values) & (absval < 1e5)
+    scaled = np.where(done, absval, 0.0) * 10.0**precision
+    rounded = np.rint(scaled)
+    # Rounding the scaled value may differ from rounding the exact decimal value
+    # if it is close to the middle of two integers. The margin is larger than
+    # two times the spacing of the floats.
+    done &= np.abs(scaled - np.floor(scaled) - 0.5) > scaled * 5e-16
+    done &= rounded < 10.0 ** (5 + precision)
+    rounded = np.where(done, rounded, 0.0).astype(np.int64)
+
+    int_part, frac_part = np.divmod(rounded, 10**precision)
+    frac_hi, frac_lo = np.divmod(frac_part * 10 ** (10 - precision), 100000)
+    digits, int_digits = _digit_tables()
+
+    chars = np.empty((values.size, 7 + precision), dtype=np.uint8)
+    chars[:, 0] = np.signbit(values) * np.uint8(ord("-"))
+    chars[:, 1:6] = np.take(int_digits, int_part, axis=0)
+    chars[:, 6] = ord(".")
+    if precision <= 5:
+        chars[:, 7:] = np.take(digits, frac_hi, axis=0)[:, :precision]
+    else:
+        chars[:, 7:12] = np.take(digits, frac_hi, axis=0)
+        chars[:, 12:] = np.take(digits, frac_lo, axis=0)[:, : precision - 5]
+    return chars, done
+
+
+def _ascii_chars(strings):
+    """
+    Return the characters of an array of strings as a (N, W) uint8 array padded
+    with zero bytes, or None if there are non-ASCII characters or newlines
+    """
+    strings = np.asarray(strings, dtype=str)
+    width = strings.dtype.itemsize // 4
+    if width == 0:
+        return np.zeros((len(strings), 0), dtype=np.uint8)
+    codes = np.ascontiguousarray(strings).view(np.uint32).reshape(len(strings), width)
+    if codes.max() >= 128 or (codes == ord("\n")).any():
+        return None
+    return codes.astype(np.uint8)
+
+
+class NumericBlock(Block):
+    """
+    A block backed by arrays rather than a list of strings.
+
+    Each row is rendered as ``<label>  <values> <tag>``, with the label and
+    the tag only included if they are given. The lines are only formatted
+    when the block is accessed as a list of strings, e.g. when writing it out.
+    The values, labels and tags are stored as read-only arrays, new ones should
+    be assigned through the properties.
+
+    Modifying the block through the list interface turns it into a plain list
+    of strings, after which the arrays are no longer available.
+    """
+
+    def __init__(self, values, labels=None, tags=None, fmt="{:.10f}", sep=" "):
+        """
+        Instantiate a NumericBlock
+
+        :param values: A 2D array of the numerical values
+        :param labels: A sequence of labels placed in front of each row
+        :param tags: A sequence of strings appended to each row
+        :param fmt: Format of each value
+        :param sep: Separator between the values
+        """
+        super().__init__()
+        self._fmt = fmt
+        self._sep = sep
+        self._detached = False
+        self._values = None
+        self._labels = None
+        self._tags = None
+        self.values = values
+        self.labels = labels
+        self.tags = tags
+
+    @property
+    def is_numeric(self):
+        """Whether the block is still backed by the arrays"""
+        return not self._detached
+
+    def _check_numeric(self):
+        if not self.is_numeric:
+            raise RuntimeError("The block has been modified as a list of strings")
+
+    @property
+    def values(self):
+        """The (read-only) array of the numerical values"""
+        self._check_numeric()
+        return self._values
+
+    @values.setter
+    def values(self, values):
+        self._check_numeric()
+        values = np.array(values, dtype=np.float64)
+        if values.ndim != 2:
+            raise ValueError(f"Values must be a 2D array, but shape {values.shape} is given")
+        if self._values is not None and values.shape[0] != self._values.shape[0]:
+            raise ValueError("The number of rows cannot be changed")
+        values.flags.writeable = False
+        self._values = values
+        self.version += 1
+
+    @property
+    def fmt(self):
+        """Format of each value"""
+        return self._fmt
+
+    @fmt.setter
+    def fmt(self, fmt):
+        self._fmt = fmt
+        self.version += 1
+
+    @property
+    def sep(self):
+        """Separator between the values"""
+        return self._sep
+
+    @sep.setter
+    def sep(self, sep):
+        self._sep = sep
+        self.version += 1
+
+    def _as_column(self, seq):
+        """Convert a per-row sequence of strings into an array"""
+        if seq is None:
+            return None
+        seq = np.array(seq, dtype=str)
+        if seq.shape != (len(self._values),):
+            raise ValueError("Labels and tags must have one entry per row")
+        seq.flags.writeable = False
+        return seq
+
+    @property
+    def labels(self):
+        """Labels placed in front of each row"""
+        self._check_numeric()
+        return self._labels
+
+    @labels.setter
+    def labels(self, labels):
+        self._check_numeric()
+        self._labels = self._as_column(labels)
+        self.version += 1
+
+    @property
+    def tags(self):
+        """Tags appended to the end of each row"""
+        self._check_numeric()
+        return self._tags
+
+    @tags.setter
+    def tags(self, tags):
+        self._check_numeric()
+        self._tags = self._as_column(tags)
+        self.version += 1
+
+    def render(self, start=0, stop=None):
+        """
+        Return the content as a list of strings
+
+        :param start: Index of the first row to render
+        :param stop: Index after the last row to render
+        """
+        if not self.is_numeric:
+            return list(self)[start:stop]
+        rows = slice(start, stop)
+        rendered = self._render_bulk(rows)
+        if rendered is None:
+            return self._render_rows(rows)
+
+        text, done = rendered
+        lines = text.split("\n")
+        # Rows with values that cannot be formatted in bulk
+        missing = np.flatnonzero(~done)
+        if missing.size:
+            offset = rows.indices(len(self._values))[0]
+            for idx, line in zip(missing, self._render_rows(missing + offset)):
+                lines[idx] = line
+        return lines
+
+    def render_text(self, start=0, stop=None):
+        """
+        Return the content as a single string of lines joined by newlines
+
+        :param start: Index of the first row to render
+        :param stop: Index after the last row to render
+        """
+        if self.is_numeric:
+            rendered = self._render_bulk(slice(start, stop))
+            if rendered is not None and rendered[1].all():
+                return rendered[0]
+        return "\n".join(self.render(start, stop))
+
+    def _render_rows(self, rows):
+        """Render the selected rows line by line"""
+        row_fmt = self.sep.join([self.fmt] * self._values.shape[1])
+        lines = [row_fmt.format(*row) for row in self._values[rows].tolist()]
+        if self._labels is not None:
+            labels = self._labels[rows].tolist()
+            lines = [f"{label}  {line}" for label, line in zip(labels, lines)]
+        if self._tags is not None:
+            lines = [f"{line} {tag}" for line, tag in zip(lines, self._tags[rows].tolist())]
+        return lines
+
+    def _render_bulk(self, rows):
+        """
+        Render the selected rows by formatting all values at once
+
+        :returns: A string of the lines joined by newlines and a mask of the rows
+          that are rendered, or None if the format or the strings are not supported.
+        """
+        match = fixed_fmt.fullmatch(self.fmt)
+        if match is None or not 1 <= int(match.group(1)) <= 10:
+            return None
+        values = self._values[rows]
+        nrows, ncols = values.shape
+        if nrows == 0 or ncols == 0:
+            return None
+        sep = _ascii_chars([self.sep])
+        if sep is None:
+            return None
+
+        parts = []
+        if self._labels is not None:
+            labels = _ascii_chars(self._labels[rows])
+            if labels is None:
+                return None
+            parts.extend([labels, np.full((nrows, 2), ord(" "), dtype=np.uint8)])
+        chars, done = format_fixed(values, int(match.group(1)))
+        chars = chars.reshape(nrows, ncols, -1)
+        for col in range(ncols):
+            if col:
+                parts.append(np.broadcast_to(sep, (nrows, sep.shape[1])))
+            parts.append(chars[:, col])
+        if self._tags is not None:
+            tags = _ascii_chars(self._tags[rows])
+            if tags is None:
+                return None
+            parts.extend([np.full((nrows, 1), ord(" "), dtype=np.uint8), tags])
+        parts.append(np.full((nrows, 1), ord("\n"), dtype=np.uint8))
+
+        matrix = np.hstack(parts)
+        text = matrix[matrix != 0].tobytes().decode("ascii")
+        return text[:-1], done.reshape(nrows, ncols).all(axis=1)
+
+    def iter_render(self, chunk_size=RENDER_CHUNK_SIZE):
+        """Render the lines in chunks of rows and iterate through them"""
+        if not self.is_numeric:
+            yield from list.__iter__(self)
+            return
+        for start in range(0, len(self._values), chunk_size):
+            yield from self.render(start, start + chunk_size)
+
+    def iter_text(self, chunk_size=RENDER_CHUNK_SIZE):
+        """
+        Render the content in chunks of rows, each chunk as a string of the
+        lines joined by newlines
+        """
+        if not self.is_numeric:
+            if list.__len__(self):
+                yield "\n".join(list.__iter__(self))
+            return
+        for start in range(0, len(self._values), chunk_size):
+            yield self.render_text(start, start + chunk_size)
+
+    def detach(self):
+        """
+        Convert into a plain list of strings, dropping the arrays
+        """
+        if self.is_numeric:
+            lines = self.render()
+            self._detached = True
+            self._values = None
+            self._labels = None
+            self._tags = None
+            list.extend(self, lines)
+        return self
+
+    @classmethod
+    def _from_arrays(cls, values, labels=None, tags=None, fmt="{:.10f}", sep=" "):
+        """
+        Construct a block from arrays without copying them, e.g. arrays
+        that are memory mapped. The arrays should be read-only.
+        """
+        obj = cls.__new__(cls)
+        obj._fmt = fmt
+        obj._sep = sep
+        obj._detached = False
+        obj._values = values
+        obj._labels = labels
+        obj._tags = tags
+        return obj
+
+    @classmethod
+    def _from_lines(cls, lines):
+        """Construct a detached block from a list of strings"""
+        obj = cls.__new__(cls)
+        obj._fmt = "{:.10f}"
+        obj._sep = " "
+        obj._detached = True
+        obj._values = None
+        obj._labels = None
+        obj._tags = None
+        list.extend(obj, lines)
+        return obj
+
+    def __reduce__(self):
+        if self.is_numeric:
+            return (type(self), (self._values, self._labels, self._tags, self.fmt, self.sep))
+        return (type(self)._from_lines, (list(self),))
+
+    def __reduce_ex__(self, protocol):
+        return self.__reduce__()
+
+    def __iter__(self):
+        if self.is_numeric:
+            return self.iter_render()
+        return super().__iter__()
+
+    def __len__(self):
+        if self.is_numeric:
+            return self._values.shape[0]
+        return super().__len__()
+
+    def __eq__(self, other):
+        if isinstance(other, NumericBlock) and other.is_numeric:
+            other = other.render()
+        if self.is_numeric:
+            return self.render() == other
+        return super().__eq__(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        if self.is_numeric:
+            return "NumericBlock(" + repr(self.render()) + ")"
+        return "NumericBlock(" + list.__repr__(self) + ")"
+
+    def __getitem__(self, index):
+        """Return a line or a list of lines, only the rows requested are rendered"""
+        if not self.is_numeric:
+            return list.__getitem__(self, index)
+        nrows = len(self._values)
+        if isinstance(index, slice):
+            rows = range(*index.indices(nrows))
+            if not rows:
+                return []
+            first, last = min(rows[0], rows[-1]), max(rows[0], rows[-1])
+            lines = self.render(first, last + 1)
+            if rows.step == 1:
+                return lines
+            return lines[rows[0] - first :: rows.step]
+        index = operator.index(index)
+        if index < 0:
+            index += nrows
+        if not 0 <= index < nrows:
+            raise IndexError("list index out of range")
+        return self.render(index, index + 1)[0]
+
+    def __contains__(self, value):
+        if not self.is_numeric:
+            return list.__contains__(self, value)
+        return any(line == value for line in self.iter_render())
+
+    def count(self, value):
+        """Return number of occurrences of value"""
+        if not self.is_numeric:
+            return list.count(self, value)
+        return sum(line == value for line in self.iter_render())
+
+    def index(self, value, start=0, stop=sys.maxsize):
+        """Return first index of value, rendering the rows in chunks"""
+        if not self.is_numeric:
+            return list.index(self, value, start, stop)
+        start, stop, _ = slice(start, stop).indices(len(self._values))
+        for chunk_start in range(start, stop, RENDER_CHUNK_SIZE):
+            chunk = self.render(chunk_start, min(chunk_start + RENDER_CHUNK_SIZE, stop))
+            for offset, line in enumerate(chunk):
+                if line == value:
+                    return chunk_start + offset
+        raise ValueError(f"{value!r} is not in list")
+
+    __reversed__ = _rendering("__reversed__")
+    __add__ = _rendering("__add__")
+
+    def __radd__(self, other):
+        # Called before list.__add__ of the other list, which would only see
+        # the empty list storage of the block
+        if not isinstance(other, list):
+            return NotImplemented
+        return list(other) + list(self)
+
+    __mul__ = _rendering("__mul__")
+    __rmul__ = _rendering("__rmul__")
+    copy = _rendering("copy")
+
+    __setitem__ = _detaching("__setitem__")
+    __delitem__ = _detaching("__delitem__")
+    __iadd__ = _detaching("__iadd__")
+    __imul__ = _detaching("__imul__")
+    append = _detaching("append")
+    extend = _detaching("extend")
+    insert = _detaching("insert")
+    pop = _detaching("pop")
+    remove = _detaching("remove")
+    clear = _detaching("clear")
+    sort = _detaching("sort")
+    reverse = _detaching("reverse")
+
+    __hash__ = None
+
+
+def is_unit_line(line):
+    """
+    Whether a line of a block is a unit line, e.g. ``ang`` in the first
+    line of ``lattice_cart``. A unit line is a single token with letters
+    that is not a number, e.g. ``1e-3``, ``nan`` or ``1.0d0``.
+    """
+    tokens = line.split()
+    if len(tokens) != 1 or not any(char.isalpha() for char in tokens[0]):
+        return False
+    try:
+        float(tokens[0].lower().replace("d", "e"))
+    except ValueError:
+        return True
+    return False
+
 
 def cell_abcs_to_vec(abcs):
     """
@@ -43,38 +573,97 @@ def cell_abcs_to_vec(abcs):
 
     :param abcs: a list of [a, b, c, alpha, beta, gamma]
     """
+    abcs = np.asarray(abcs, dtype=np.float64)
+    if abcs.shape != (6,):
+        raise ValueError(f"Expect [a, b, c, alpha, beta, gamma], but {abcs} is given")
+    return cell_abcs_to_vecs(abcs[None, :])[0]
 
-    a, b, c, alpha, beta, gamma = abcs
 
-    # In case of orthorhobic cell - avoid rounding errors
-    e = 2 * np.spacing(90, dtype=np.float64)
+def cell_abcs_to_vecs(abcs):
+    """
+    Convert many cells from the fractional cell format to vectors at once.
+    Each cell is oriented in the same way as ``cell_abcs_to_vec``.
 
-    if abs(abs(alpha) - 90) < e:
-        cos_alpha = 0.0
-    else:
-        cos_alpha = cos(alpha * pi / 180)
+    :param abcs: A (M, 6) array of [a, b, c, alpha, beta, gamma]
+    :returns: A (M, 3, 3) array of the cell vectors
+    """
+    abcs = np.asarray(abcs, dtype=np.float64)
+    if abcs.ndim != 2 or abcs.shape[1] != 6:
+        raise ValueError(f"Expect a (M, 6) array, but shape {abcs.shape} is given")
+    a, b, c, alpha, beta, gamma = abcs.T
 
-    if abs(abs(beta) - 90) < e:
-        cos_beta = 0.0
-    else:
-        cos_beta = cos(beta * pi / 180)
-
-    if abs(gamma - 90) < e:
-        cos_gamma = 0.0
-        sin_gamma = 1.0
-    elif abs(gamma + 90) < e:
-        cos_gamma = 0.0
-        sin_gamma = -1.0
-    else:
-        cos_gamma = cos(gamma * pi / 180)
-        sin_gamma = sin(gamma * pi / 180)
+    # In case of orthorhobic cell - avoid rounding errors
+    e = 2 * np.spacing(90, dtype=np.float64)
+    cos_alpha = np.where(np.abs(np.abs(alpha) - 90) < e, 0.0, np.cos(alpha * pi / 180))
+    cos_beta = np.where(np.abs(np.abs(beta) - 90) < e, 0.0, np.cos(beta * pi / 180))
+    cos_gamma = np.cos(gamma * pi / 180)
+    sin_gamma = np.sin(gamma * pi / 180)
+    right = np.abs(np.abs(gamma) - 90) < e
+    cos_gamma[right] = 0.0
+    sin_gamma[right] = np.sign(gamma[right])
 
-    va = a * np.array([1, 0, 0])
-    vb = b * np.array([cos_gamma, sin_gamma, 0])
+    cells = np.zeros((len(abcs), 3, 3))
+    cells[:, 0, 0] = a
+    cells[:, 1, 0] = b * cos_gamma
+    cells[:, 1, 1] = b * sin_gamma
     cx = cos_beta
     cy = (cos_alpha - cos_beta * cos_gamma) / sin_gamma
-    cz = sqrt(1.0 - cx * cx - cy * cy)
-    vc = c * np.array([cx, cy, cz])
+    cz = np.sqrt(1.0 - cx * cx - cy * cy)
+    cells[:, 2, 0] = c * cx
+    cells[:, 2, 1] = c * cy
+    cells[:, 2, 2] = c * cz
+    return cells
+
+
+def cell_vecs_to_abcs(cells):
+    """
+    Convert cell vectors to the fractional cell format, the inverse of
+    ``cell_abcs_to_vecs``.
+
+    :param cells: A (3, 3) array of the cell vectors or a (M, 3, 3) array of many cells
+    :returns: An array of [a, b, c, alpha, beta, gamma] for each cell,
+      with the angles in degrees
+    """
+    cells = np.asarray(cells, dtype=np.float64)
+    if cells.shape[-2:] != (3, 3) or cells.ndim not in (2, 3):
+        raise ValueError(f"Expect (3, 3) or (M, 3, 3) cells, but shape {cells.shape} is given")
+    lengths = np.linalg.norm(cells, axis=-1)
+    va, vb, vc = cells[..., 0, :], cells[..., 1, :], cells[..., 2, :]
+    la, lb, lc = lengths[..., 0], lengths[..., 1], lengths[..., 2]
+    cosines = [
+        np.sum(vb * vc, axis=-1) / (lb * lc),
+        np.sum(va * vc, axis=-1) / (la * lc),
+        np.sum(va * vb, axis=-1) / (la * lb),
+    ]
+    angles = [np.degrees(np.arccos(np.clip(cos_ang, -1.0, 1.0))) for cos_ang in cosines]
+    return np.stack([la, lb, lc] + angles, axis=-1)
+
+
+def supercell_translations(matrix):
+    """
+    Return the lattice translations of the cells inside a supercell
+
+    :param matrix: A (3, 3) integer matrix, the rows of which are the
+      supercell vectors in units of the cell vectors
+    :returns: A (n, 3) integer array of the translations in units of the cell
+      vectors, where n is the absolute value of the determinant of the matrix
+    """
+    matrix = np.asarray(matrix)
+    if matrix.shape != (3, 3) or not np.all(matrix == np.rint(matrix)):
+        raise ValueError(f"Expect a 3x3 integer matrix, but {matrix} is given")
+    matrix = np.rint(matrix).astype(np.int64)
+    ncells = abs(int(round(np.linalg.det(matrix))))
+    if ncells == 0:
+        raise ValueError(f"The supercell matrix {matrix.tolist()} is singular")
 
-    cell = np.vstack([va, vb, vc])
-    return cell
+    # All lattice points inside the box bounding the supercell
+    corners = np.array(np.meshgrid([0, 1], [0, 1], [0, 1], indexing="ij")).reshape(3, -1).T
+    corners = corners @ matrix
+    axes = [np.arange(low, high + 1) for low, high in zip(corners.min(0), corners.max(0))]
+    points = np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1).reshape(-1, 3)
+    # Keep those with fractional coordinates of the supercell in [0, 1)
+    frac = points @ np.linalg.inv(matrix)
+    tol = 1e-8
+    points = points[np.all((frac > -tol) & (frac < 1 - tol), axis=1)]
+    assert len(points) == ncells, "Problem in finding the lattice translations"
+    return points
@@ -0,0 +1,149 @@
+"""
+Finding ions closer than a cutoff in periodic cells
+
+The ions are sorted into bins along the cell vectors that are at least as
+wide as the cutoff, so that only the ions in neighbouring bins need to be
+compared. The number of distances computed grows linearly with the number
+of ions, and each neighbouring bin is handled for all ions at once.
+"""
+
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Number of ions compared with a neighbouring bin at a time, bounding the memory used
+CONTACT_CHUNK_SIZE = 1 << 16
+
+
+def _empty_result():
+    return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp), np.zeros(0)
+
+
+def close_contacts(cell, scaled, cutoff):
+    """
+    Find the pairs of ions closer than the cutoff
+
+    Each pair is reported once with the distance to the closest periodic image
+    of the other ion (minimum image). An ion closer than the cutoff to its own
+    image, in cells shorter than the cutoff, is reported with ``j == i``.
+
+    :param cell: A (3, 3) array of the cell vectors
+    :param scaled: A (N, 3) array of the fractional coordinates
+    :param cutoff: The distance below which ions are reported
+    :returns: Arrays of the indices ``i`` and ``j`` (with ``i <= j``) and the
+      distances of the pairs, sorted by ``i`` and then ``j``
+    """
+    if cutoff <= 0:
+        raise ValueError(f"The cutoff must be positive, but {cutoff} is given")
+    cell = np.asarray(cell, dtype=np.float64)
+    scaled = np.asarray(scaled, dtype=np.float64).reshape(-1, 3)
+    natoms = len(scaled)
+    if natoms == 0:
+        return _empty_result()
+
+    # Distances between the planes of the cell
+    widths = abs(np.linalg.det(cell)) / np.linalg.norm(
+        np.cross(cell[[1, 2, 0]], cell[[2, 0, 1]]), axis=1
+    )
+    nbins = np.maximum(np.floor(widths / cutoff), 1).astype(np.int64)
+    # Avoid having many more bins than ions
+    excess = np.prod(nbins) / natoms
+    if excess > 1:
+        nbins = np.maximum(np.floor(nbins / excess ** (1 / 3)), 1).astype(np.int64)
+    # Neighbouring bins to look at along each vector
+    reach = np.maximum(np.ceil(cutoff * nbins / widths), 1).astype(np.int64)
+
+    frac = scaled - np.floor(scaled)
+    frac[frac >= 1.0] -= 1.0
+    bins = np.minimum((frac * nbins).astype(np.int64), nbins - 1)
+    flat = np.ravel_multi_index(bins.T, nbins)
+    order = np.argsort(flat, kind="stable")
+    frac = frac[order]
+    bins = bins[order]
+    counts = np.bincount(flat, minlength=int(np.prod(nbins)))
+    starts = np.cumsum(counts) - counts
+
+    found = []
+    offsets = itertools.product(*[range(-int(n), int(n) + 1) for n in reach])
+    for offset in offsets:
+        # Each pair of bins is only visited from one side
+        if offset < (0, 0, 0):
+            continue
+        for start in range(0, natoms, CONTACT_CHUNK_SIZE):
+            found.append(
+                _bin_contacts(
+                    cell, frac, bins, nbins, counts, starts, np.array(offset), start, cutoff
+                )
+            )
+
+    i, j, dist = (np.concatenate(arrays) for arrays in zip(*found))
+    i, j = order[i], order[j]
+    i, j = np.minimum(i, j), np.maximum(i, j)
+    key = i.astype(np.int64) * natoms + j
+    if 2 * cutoff <= widths.min():
+        # Two images of an ion cannot both be within the cutoff
+        sort = np.argsort(key, kind="stable")
+        return i[sort], j[sort], dist[sort]
+
+    # Keep the closest image of each pair
+    sort = np.argsort(dist, kind="stable")
+    sort = sort[np.argsort(key[sort], kind="stable")]
+    key = key[sort]
+    first = np.ones(len(key), dtype=bool)
+    first[1:] = key[1:] != key[:-1]
+    sort = sort[first]
+    return i[sort], j[sort], dist[sort]
+
+
+def _bin_contacts(cell, frac, bins, nbins, counts, starts, offset, start, cutoff):
+    """
+    Compare a chunk of the sorted ions with the ions in the bin at the offset
+
+    :returns: The sorted indices of the pairs closer than the cutoff and their distances
+    """
+    stop = min(start + CONTACT_CHUNK_SIZE, len(frac))
+    target = bins[start:stop] + offset
+    # Image of the cell the neighbouring bin is in
+    shifts = np.floor_divide(target, nbins)
+    target_flat = np.ravel_multi_index((target - shifts * nbins).T, nbins)
+
+    ncand = counts[target_flat]
+    total = int(ncand.sum())
+    if total == 0:
+        return _empty_result()
+    i = np.repeat(np.arange(start, stop), ncand)
+    # Indices running through the ions of each neighbouring bin
+    j = np.arange(total) - np.repeat(np.cumsum(ncand) - ncand, ncand)
+    j += np.repeat(starts[target_flat], ncand)
+    shifts = np.repeat(shifts, ncand, axis=0)
+    if not offset.any():
+        keep = i < j
+        i, j, shifts = i[keep], j[keep], shifts[keep]
+
+    dist = np.linalg.norm((frac[j] + shifts - frac[i]) @ cell, axis=1)
+    keep = dist < cutoff
+    return i[keep], j[keep], dist[keep]
+
+
+def close_contacts_many(structures, cutoff, workers=None):
+    """
+    Find the close contacts in many structures
+
+    :param structures: An iterable of ``CellInput`` or tuples of the cell
+      vectors and the fractional coordinates
+    :param cutoff: The distance below which ions are reported
+    :param workers: Number of threads to use, structures are checked in the
+      current thread if not given
+    :returns: A list of the results of ``close_contacts`` for each structure
+    """
+
+    def check(structure):
+        if isinstance(structure, tuple):
+            return close_contacts(structure[0], structure[1], cutoff)
+        return structure.get_close_contacts(cutoff)
+
+    if not workers or workers <= 1:
+        return [check(structure) for structure in structures]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(check, structures))
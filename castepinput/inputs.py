@@ -1,14 +1,28 @@
 """
 Classes for .param and .cell files
 """
+import copy
 import os
 import tempfile
 import re
 from collections import OrderedDict
 
 import numpy as np
-from .parser import Parser, PlainParser
-from .common import Block, cell_abcs_to_vec
+from . import aio, profiling
+from .cache import default_cache
+from .contacts import close_contacts
+from .parser import MappedBlock, parse_file, parse_mapped
+from .sidecar import read_sidecar, write_sidecar
+from .tags import PositionTags
+from .common import Block, NumericBlock, cell_abcs_to_vecs, cell_vecs_to_abcs, is_unit_line
+from .common import RENDER_CHUNK_SIZE, supercell_translations
+from .keywords import length_in_ang
+
+
+# Marker for blocks without units
+_NO_UNIT = object()
+# Number of characters buffered by ``CastepInput.write_to`` before writing
+WRITE_CHUNK_SIZE = 1 << 20
 
 
 class CastepInput(OrderedDict):
@@ -23,9 +37,15 @@ class CastepInput(OrderedDict):
     ``self.get_string`` is used for getting the content to be passed
     to ``write`` function of a file-like object
 
+    ``self.write_to`` writes the content to a file-like object in chunks
+    without building the whole string
+
     sepecial properties:
     * ``header`` a list of lines to be put into the header
     * ``units`` a dictionary of the units
+
+    The lines of the blocks are cached when rendered, and only rendered again
+    if the block is replaced, modified or its unit is changed.
     """
 
     def __init__(self, *args, **kwargs):
@@ -33,74 +53,339 @@ class CastepInput(OrderedDict):
         super().__init__(*args, **kwargs)
         self.header = []
         self.units = {}
+        # Rendered lines of the blocks keyed by the block name
+        self._rendered = {}
 
     def get_file_lines(self):
         """
         Return a list of strings to be write out to the files
         """
-        lines = []
+        return list(self.iter_lines())
+
+    def iter_lines(self, cache=True):
+        """
+        Iterate through the lines to be written out
+
+        :param cache: Keep the rendered lines of the blocks for later use. If
+          False, blocks that are not cached are rendered a few lines at a time.
+        """
+        return self._iter_lines(cache=cache)
+
+    def _iter_lines(self, raw=False, cache=True):
+        """
+        Iterate through the lines to be written out
+
+        :param raw: If True, the content of any memory mapped blocks that have
+          not been accessed is yielded in chunks of lines copied from the file.
+        :param cache: Keep the rendered lines of the blocks
+        """
+        yield from self._iter_header()
+        for key, value in self.items():
+            yield from self._iter_item(key, value, raw, cache)
+
+        # Drop the cached lines of removed blocks
+        for key in [key for key in self._rendered if key not in self]:
+            del self._rendered[key]
+
+    def _iter_header(self):
+        """Iterate through the lines of the header"""
         for hline in self.header:
             if not hline.startswith("#"):
-                lines.append("# " + hline)
+                yield "# " + hline
             else:
-                lines.append(hline)
+                yield hline
 
-        for key, value in self.items():
-            if isinstance(value, Block):
-                lines.append(f"%BLOCK {key}")
-                # Add units
-                if key in self.units:
-                    lines.append(str(self.units[key]))
-                # Append each line
-                for val in value:
-                    lines.append(val)
-                lines.append(f"%ENDBLOCK {key}\n")
+    def _iter_item(self, key, value, raw=False, cache=True):
+        """
+        Iterate through the lines of a single keyword or block
+
+        :param raw: See ``_iter_lines``
+        :param cache: Keep the rendered lines of the blocks
+        """
+        if raw and isinstance(value, MappedBlock) and value.is_mapped:
+            yield f"%BLOCK {key}"
+            if key in self.units:
+                yield str(self.units[key])
+            yield from value.iter_raw_chunks()
+            yield f"%ENDBLOCK {key}\n"
+        elif isinstance(value, Block):
+            yield from self._render_block(key, value, cache, raw)
+        else:
+            # If a list/tuple is passed join into a string
+            if isinstance(value, (tuple, list)):
+                value = " ".join(map(str, value))
+            # None and "" are treats as simple flag line e.g. SYMMETRY_GENERATE
+            if value is not None and value != "":
+                this_line = f"{key:<20}: {value}"
             else:
-                # If a list/tuple is passed join into a string
-                if isinstance(value, (tuple, list)):
-                    value = " ".join(map(str, value))
-                # None and "" are treats as simple flag line e.g. SYMMETRY_GENERATE
-                if value is not None and value != "":
-                    this_line = f"{key:<20}: {value}"
-                else:
-                    this_line = key
-                if key in self.units:
-                    this_line = this_line + " " + self.units[key]
-                lines.append(this_line)
+                this_line = key
+            if key in self.units:
+                this_line = this_line + " " + self.units[key]
+            yield this_line
 
+    def _render_block(self, key, value, cache=True, raw=False):
+        """
+        Return the lines of a block, reusing the cached ones if the block
+        has not changed since they were rendered
+
+        :param cache: Cache the rendered lines, otherwise an iterator of the
+          lines is returned
+        :param raw: If not cached, the content of NumericBlock is yielded in
+          chunks of lines
+        """
+        unit = self.units.get(key, _NO_UNIT)
+        cached = self._rendered.get(key)
+        if (
+            cached is not None
+            and cached[0] is value
+            and cached[1] == value.version
+            and cached[2] == unit
+        ):
+            return cached[3]
+
+        lines = self._iter_block(key, value, unit, raw=not cache and raw)
+        if not cache:
+            return lines
+        start_time = profiling.start()
+        lines = list(lines)
+        self._rendered[key] = (value, value.version, unit, lines)
+        profiling.record("render_block", start_time, lines=len(lines))
         return lines
 
+    @staticmethod
+    def _iter_block(key, value, unit, raw=False):
+        """
+        Iterate through the lines of a block
+
+        :param raw: Yield the content of NumericBlock in chunks of lines
+        """
+        yield f"%BLOCK {key}"
+        # Add units
+        if unit is not _NO_UNIT:
+            yield str(unit)
+        if raw and isinstance(value, NumericBlock):
+            yield from value.iter_text()
+        else:
+            # Append each line
+            yield from value
+        yield f"%ENDBLOCK {key}\n"
+
+    def get_block_array(self, name, dtype=np.float64, columns=None, labels=False, with_unit=False):
+        """
+        Return the content of a block as an array, e.g. ``kpoints_list``.
+        A unit in the first line of the block is skipped, the values are not
+        converted.
+
+        :param dtype: Type of the values
+        :param columns: The number of columns to read, or a sequence of the
+          indices of the columns. Default to all columns.
+        :param labels: Whether the first column is a label, e.g. the species
+          in ``species_mass``
+        :param with_unit: Also return the unit of the block, or None if there is none
+        :returns: A (N, M) array of the values, preceded by an array of the
+          labels if ``labels`` is True, and followed by the unit if ``with_unit``
+          is True
+        """
+        block = self[name]
+        unit = self.units.get(name)
+        if isinstance(block, NumericBlock) and block.is_numeric:
+            names = block.labels
+            if labels and names is None:
+                raise ValueError(f"Block {name} has no labels")
+            values = block.values[:, _column_index(columns)].astype(dtype)
+        else:
+            lines = list(block)
+            if lines and is_unit_line(lines[0]):
+                unit = lines[0].strip()
+                lines = lines[1:]
+            try:
+                values, names = parse_block_array(lines, dtype, columns, labels)
+            except ValueError as error:
+                raise ValueError(f"Cannot parse block {name}: {error}") from error
+
+        result = (names, values) if labels else (values,)
+        if with_unit:
+            result += (unit,)
+        return result if len(result) > 1 else result[0]
+
+    def set_block_array(self, name, values, labels=None, unit=None, fmt=None):
+        """
+        Set a block from an array of values, stored as a NumericBlock
+
+        :param values: A (N, M) array
+        :param labels: A sequence of labels placed in front of each row
+        :param unit: The unit of the block. If None, the existing unit is kept:
+          the first line of the block being replaced if it is a unit, otherwise
+          the one in ``units``.
+        :param fmt: Format of each value, default to ``{:.0f}`` for integers
+          and ``{:.10f}`` otherwise
+        """
+        values = np.asarray(values)
+        if fmt is None:
+            fmt = "{:.0f}" if values.dtype.kind in "biu" else "{:.10f}"
+        if unit is None:
+            unit = self._block_unit_line(name)
+        if unit is not None:
+            self.units[name] = unit
+        self[name] = NumericBlock(values, labels=labels, fmt=fmt)
+
+    def _block_unit_line(self, name):
+        """Return the unit in the first line of a block, or None if there is none"""
+        block = self.get(name)
+        if not isinstance(block, Block) or (isinstance(block, NumericBlock) and block.is_numeric):
+            return None
+        if len(block) and is_unit_line(block[0]):
+            return block[0].strip()
+        return None
+
     def get_string(self):
         """Return the string representing the input file"""
-        return "\n".join(self.get_file_lines()) + "\n"
+        return "\n".join(self.iter_lines()) + "\n"
 
-    def save(self, fname):
-        """Save the input as a file"""
+    def write_to(self, fhandle, cache=True, chunk_lines=4096, chunk_size=WRITE_CHUNK_SIZE):
+        """
+        Write the content to a file-like object opened in text mode
+
+        The lines are written in chunks, giving the same output as
+        ``get_string`` without building the whole string. Memory mapped blocks
+        that have not been accessed are copied from the original file.
+
+        :param cache: Keep the rendered lines of the blocks, see ``iter_lines``
+        :param chunk_lines: Maximum number of items to buffer before writing
+        :param chunk_size: Maximum number of characters to buffer before
+          writing. Blocks may be yielded as chunks of many lines, so the
+          number of items alone does not bound the memory used.
+        """
+        start_time = profiling.start()
+        chunk = []
+        size = 0
+        written = False
+        nlines = 0
+        for line in self._iter_lines(raw=True, cache=cache):
+            chunk.append(line)
+            size += len(line)
+            if len(chunk) >= chunk_lines or size >= chunk_size:
+                text = "\n".join(chunk) + "\n"
+                fhandle.write(text)
+                nlines += text.count("\n")
+                chunk.clear()
+                size = 0
+                written = True
+        if chunk or not written:
+            text = "\n".join(chunk) + "\n"
+            fhandle.write(text)
+            nlines += text.count("\n")
+        profiling.record("write", start_time, lines=nlines)
+
+    def save(self, fname, cache=False):
+        """
+        Save the input as a file
+
+        The content is streamed to the file, so the memory used does not grow
+        with the size of the blocks. Memory mapped blocks that have not been
+        accessed are copied from the original file without being parsed.
+
+        :param cache: Keep the rendered lines of the blocks, see ``iter_lines``.
+          Only useful if the input is to be saved again without changes.
+        """
+        if os.path.exists(fname):
+            # The mapped file is about to be overwritten
+            for value in self.values():
+                if isinstance(value, MappedBlock) and value.is_mapped:
+                    try:
+                        same = os.path.samefile(value.source, fname)
+                    except OSError:
+                        # The source file has been removed, the mapping is still valid
+                        same = False
+                    if same:
+                        value.detach()
         with open(fname, "w", encoding="utf-8") as fhandle:
-            fhandle.write(self.get_string())
+            self.write_to(fhandle, cache=cache)
+
+    async def asave(self, fname, cache=False, executor=None):
+        """
+        Save the input as a file without blocking the event loop.
+        Rendering and writing are done in an executor, see ``aio.get_executor``.
+        The input should not be modified until it is saved.
+        """
+        await aio.run_in_executor(self.save, fname, cache, executor=executor)
 
     @classmethod
-    def from_file(cls, fname, plain=False):
+    def from_file(cls, fname, plain=False, lazy=False, cache=None, engine="lines"):
         """
         Constrant an instance from the file
         """
         out = cls()
-        out.load_file(fname, plain)
+        out.load_file(fname, plain, lazy, cache, engine)
         return out
 
-    def load_file(self, fname, plain=False):
+    @classmethod
+    async def afrom_file(
+        cls, fname, plain=False, lazy=False, cache=None, executor=None, engine="lines"
+    ):
+        """
+        Construct an instance from the file without blocking the event loop.
+        Reading and parsing are done in an executor, see ``aio.get_executor``.
+        """
+        return await aio.run_in_executor(
+            cls.from_file, fname, plain, lazy, cache, engine, executor=executor
+        )
+
+    def load_file(self, fname, plain=False, lazy=False, cache=None, engine="lines"):
         """
         Load from the file
+
+        :param plain: Do not convert the types of the values
+        :param lazy: Memory map the file and only decode the content of the
+          blocks when they are accessed.
+        :param cache: A ``ParseCache`` to look up the parsed content from,
+          or True to use the default one.
+        :param engine: ``lines`` to parse the file line by line, or ``regex``
+          to parse the whole content with a few regular expression passes,
+          which is faster for large files. Used for parsing the files missing
+          from the cache, not used for lazy loading.
         """
-        with open(fname, encoding="utf-8") as fhandle:
-            lines = fhandle.readlines()
-        if plain:
-            parser = PlainParser(lines)
+        start_time = profiling.start()
+        if cache is True:
+            cache = default_cache
+        elif cache is False:
+            cache = None
+        if lazy:
+            if cache is not None:
+                raise ValueError("Lazy loading cannot be combined with a cache")
+            dict_out = parse_mapped(fname, convert_type=not plain)
+        elif cache is not None:
+            dict_out = cache.get_dict(fname, plain, engine)
         else:
-            parser = Parser(lines)
-        dict_out = parser.get_dict()
+            dict_out = parse_file(fname, plain, engine)
         for k, value in dict_out.items():
             self.__setitem__(k, value)
+        profiling.record("load", start_time, files=1)
+
+    def save_sidecar(self, fname):
+        """
+        Save as a binary sidecar file, which can be loaded much faster than
+        parsing the text. The arrays of NumericBlocks are stored as they are.
+        """
+        write_sidecar(self, fname)
+
+    @classmethod
+    def from_sidecar(cls, fname):
+        """
+        Construct an instance from a sidecar file written by ``save_sidecar``.
+        The arrays of NumericBlocks are memory mapped.
+        """
+        out = cls()
+        out.load_sidecar(fname)
+        return out
+
+    def load_sidecar(self, fname):
+        """Load from a sidecar file written by ``save_sidecar``"""
+        header, units, items = read_sidecar(fname)
+        self.header = header
+        self.units.update(units)
+        for k, value in items:
+            self.__setitem__(k, value)
 
     def test_read_write(self, basic_input):
         """
@@ -120,29 +405,79 @@ class ParamInput(CastepInput):
 class CellInput(CastepInput):
     """
     Representation for the content in `<seed>.cell` file.
-    """
 
-    def get_cell(self):
-        """Return cell vectors"""
+    The cell vectors and their inverse are cached, and only parsed again
+    when the lattice block is replaced or modified.
+    """
 
-        cell = []
-        if "lattice_cart" in self:
-            cell_lines = self["lattice_cart"]
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # (key, block, version, unit, cell, inverse) of the last lattice block parsed
+        self._cell_cache = None
 
-            for line in cell_lines:
-                cell.append([float(val) for val in line.split()])
+    def get_cell(self):
+        """Return cell vectors in angstrom"""
+        return self._cell_matrices()[0].copy()
 
-        elif "lattice_abc" in self:
-            abc_lines = self["lattice_abc"]
+    def get_cell_inverse(self):
+        """Return the inverse of the cell vectors"""
+        return self._cell_matrices(inverse=True)[1].copy()
 
-            abc = []
-            for line in abc_lines:
-                abc.extend([float(val) for val in line.split()])
-            assert len(abc) == 6, "Problem in lattice_abc block"
+    def _cell_matrices(self, inverse=False):
+        """
+        Return the cell vectors and their inverse as read-only arrays,
+        reusing the cached ones if the lattice block has not changed
 
-            cell = cell_abcs_to_vec(abc)
+        :param inverse: Compute the inverse if it is not cached, otherwise
+          it may be None
+        """
+        key = "lattice_cart" if "lattice_cart" in self else "lattice_abc"
+        value = self.get(key)
+        unit = self.units.get(key)
+        cached = self._cell_cache
+        if (
+            cached is not None
+            and cached[0] == key
+            and cached[1] is value
+            and cached[2] == value.version
+            and cached[3] == unit
+        ):
+            cell, inv = cached[4], cached[5]
+        else:
+            cell, inv = self._parse_cell(), None
+            cell.flags.writeable = False
+        if inverse and inv is None:
+            inv = np.linalg.inv(cell)
+            inv.flags.writeable = False
+        if isinstance(value, Block):
+            self._cell_cache = (key, value, value.version, unit, cell, inv)
+        return cell, inv
+
+    def _parse_cell(self):
+        """Parse the cell vectors from the lattice blocks, converted to angstrom"""
+        if "lattice_cart" in self:
+            cell, unit = self.get_block_array("lattice_cart", with_unit=True)
+            if unit is not None:
+                cell *= length_in_ang(unit)
+            return cell
+        if "lattice_abc" in self:
+            return cell_abcs_to_vecs(self.get_cell_abc()[None, :])[0]
+        return np.zeros((0,), dtype=np.float64)
+
+    def get_cell_abc(self):
+        """
+        Return the cell as [a, b, c, alpha, beta, gamma], with the lengths in
+        angstrom and the angles in degrees
+        """
+        if "lattice_abc" not in self:
+            return cell_vecs_to_abcs(self.get_cell())
 
-        return np.asarray(cell)
+        abc, unit = self.get_block_array("lattice_abc", with_unit=True)
+        abc = abc.ravel()
+        assert len(abc) == 6, "Problem in lattice_abc block"
+        if unit is not None:
+            abc[:3] *= length_in_ang(unit)
+        return abc
 
     def get_positions(self):
         """
@@ -152,6 +487,44 @@ class CellInput(CastepInput):
         :returns pos: A list of list of floats of the positions
         :returns tags: A dictionary of tags e.g spin, mixture, label etc
         """
+        elems, pos, tags, is_frac = self._read_positions()
+        if is_frac:
+            # We need to multiple the positions with cells
+            pos = np.dot(pos, self._cell_matrices()[0])
+        return elems, pos, tags
+
+    def get_scaled_positions(self):
+        """
+        Positions of ions in fractional coordinates
+
+        :returns elements: A list of elements
+        :returns pos: A (N, 3) array of the fractional coordinates
+        :returns tags: A list of the trailing tags
+        """
+        elems, pos, tags, is_frac = self._read_positions()
+        if not is_frac:
+            pos = np.dot(pos, self._cell_matrices(inverse=True)[1])
+        return elems, pos, tags
+
+    def get_position_tags(self):
+        """
+        Parse the tags of the positions into columns, see ``PositionTags``
+        """
+        pos_lines = self.get("positions_abs") or self.get("positions_frac")
+        if isinstance(pos_lines, NumericBlock) and pos_lines.is_numeric:
+            tags = pos_lines.tags
+            if tags is None:
+                tags = np.full(len(pos_lines), "")
+        else:
+            tags = self._read_positions()[2]
+        return PositionTags.from_strings(tags)
+
+    def _read_positions(self):
+        """
+        Read the positions as they are stored, with absolute positions in angstrom
+
+        :returns: elements, positions, tags and whether the positions are fractional
+        """
         is_frac = False
         pos_lines = self.get("positions_abs")
         if not pos_lines:
@@ -160,56 +533,192 @@ class CellInput(CastepInput):
         if not pos_lines:
             raise RuntimeError("No positions defined")
 
-        elems = []
-        pos = []
-        tags = []
-        for line in pos_lines:
-            elem, parser, tag = parse_pos_line(line)
-            elems.append(elem)
-            pos.append(parser)
-            tags.append(tag)
-
-        pos = np.array(pos)
-
-        if is_frac:
-            # We need to multiple the positions with cells
-            cell = self.get_cell()
-            pos = np.dot(pos, cell)
-
-        return elems, pos, tags
-
-    def set_cell(self, cell):
+        unit = None if is_frac else self.units.get("positions_abs")
+        if isinstance(pos_lines, NumericBlock) and pos_lines.is_numeric:
+            if pos_lines.labels is None:
+                name = "positions_frac" if is_frac else "positions_abs"
+                raise ValueError(f"The {name} block has no element labels")
+            elems = [elem.capitalize() for elem in pos_lines.labels.tolist()]
+            pos = np.array(pos_lines.values)
+            if pos_lines.tags is not None:
+                tags = pos_lines.tags.tolist()
+            else:
+                tags = [""] * len(elems)
+        else:
+            lines = list(pos_lines)
+            if not is_frac and lines and is_unit_line(lines[0]):
+                unit = lines.pop(0).strip()
+            elems, pos, tags = parse_pos_block(lines)
+        if unit is not None:
+            pos = pos * length_in_ang(unit)
+        return elems, pos, tags, is_frac
+
+    def set_cell(self, cell, abc=False):
         """
         Set cell. Accept a length 3 list/array or 3x3 list/array.
-        """
-        cell_lines = Block()
-        cell = np.asarray(cell)
-        if cell.shape == (3,):
-            cell = np.diag(cell)
-        if cell.shape != (3, 3):
-            raise ValueError(f"Cell must be a 3x3 matrix. But {cell} is given")
-
-        for coord in cell:
-            cell_lines.append(f"{coord[0]:.10f}  {coord[1]:.10f}  {coord[2]:.10f}")
+        The cell is stored as a NumericBlock and only formatted when written.
+        The lengths are in angstrom, any unit set for the lattice blocks is removed.
 
-        self["lattice_cart"] = Block(cell_lines)
+        :param abc: Write the cell as ``lattice_abc`` instead of ``lattice_cart``.
+          A length 6 list/array of [a, b, c, alpha, beta, gamma] is also accepted.
+        """
+        cell = np.asarray(cell, dtype=np.float64)
+        if abc and cell.shape == (6,):
+            abcs = cell
+        else:
+            if cell.shape == (3,):
+                cell = np.diag(cell)
+            if cell.shape != (3, 3):
+                raise ValueError(f"Cell must be a 3x3 matrix. But {cell} is given")
+            if abc:
+                abcs = cell_vecs_to_abcs(cell)
+
+        for key in ("lattice_cart", "lattice_abc"):
+            self.units.pop(key, None)
+        if abc:
+            self.pop("lattice_cart", None)
+            self["lattice_abc"] = NumericBlock(abcs.reshape(2, 3), sep="  ")
+        else:
+            self.pop("lattice_abc", None)
+            self["lattice_cart"] = NumericBlock(cell, sep="  ")
 
-    def set_positions(self, elements, positions, tags=None, frac=False):
+    def set_positions(self, elements, positions, tags=None, frac=False, scaled=None):
         """
         Set positions
+
+        The positions are stored as a NumericBlock, lines are only formatted
+        when the block is written out, in the same layout as ``construct_pos_line``.
+
+        :param tags: A list of the trailing tags of each line, or a ``PositionTags``
+        :param frac: Store the positions in ``positions_frac`` instead of ``positions_abs``
+        :param scaled: Whether the positions given are fractional, default to
+          the same as ``frac``. They are converted with the cell if needed.
+          Absolute positions are in angstrom, any unit set for ``positions_abs``
+          is removed.
         """
         if frac:
             bname = "positions_frac"
         else:
             bname = "positions_abs"
+            self.units.pop(bname, None)
 
-        pos_lines = Block()
-        if not tags:
+        if isinstance(tags, PositionTags):
+            tags = tags.to_strings()
+        if tags is None or len(tags) == 0:
             tags = [""] * len(elements)
-        for elem, parser, tag in zip(elements, positions, tags):
-            pos_lines.append(construct_pos_line(elem, parser, tag))
+        positions = np.array(positions, dtype=np.float64).reshape(len(elements), -1)
+        if scaled is None:
+            scaled = frac
+        if scaled and not frac:
+            positions = np.dot(positions, self._cell_matrices()[0])
+        elif frac and not scaled:
+            positions = np.dot(positions, self._cell_matrices(inverse=True)[1])
 
-        self[bname] = Block(pos_lines)
+        self[bname] = NumericBlock(positions, labels=elements, tags=tags)
+
+    def set_scaled_positions(self, elements, positions, tags=None, frac=True):
+        """
+        Set positions from fractional coordinates
+
+        :param frac: Store the positions in ``positions_frac``, otherwise they
+          are converted to absolute positions and stored in ``positions_abs``
+        """
+        self.set_positions(elements, positions, tags, frac=frac, scaled=True)
+
+    def get_close_contacts(self, cutoff):
+        """
+        Find the pairs of ions closer than the cutoff, see ``close_contacts``
+
+        :returns: Arrays of the indices of the pairs and their distances
+        """
+        scaled = self.get_scaled_positions()[1]
+        return close_contacts(self._cell_matrices()[0], scaled, cutoff)
+
+    def make_supercell(self, matrix, wrap=True, fname=None, chunk_size=16 * RENDER_CHUNK_SIZE):
+        """
+        Build a supercell, with the ions of each cell in turn
+
+        The lattice is written as ``lattice_cart`` and the positions in the
+        same block as this cell, both with lengths in angstrom. Other keywords
+        and blocks are copied.
+
+        :param matrix: A 3x3 integer matrix, the rows of which are the supercell
+          vectors in units of the cell vectors, or 3 integers for a diagonal one
+        :param wrap: Wrap the fractional coordinates into [0, 1)
+        :param fname: Write the supercell to this file instead of returning it.
+          The positions are generated and written a chunk at a time.
+        :param chunk_size: Approximate number of ions in each chunk written
+        :returns: A new CellInput, or None if ``fname`` is given
+        """
+        matrix = np.asarray(matrix)
+        if matrix.shape == (3,):
+            matrix = np.diag(matrix)
+        translations = supercell_translations(matrix)
+        inv_matrix = np.linalg.inv(matrix)
+        cell = self._cell_matrices()[0]
+        new_cell = np.rint(matrix) @ cell
+        frac = not self.get("positions_abs")
+        pos_key = "positions_frac" if frac else "positions_abs"
+        elems, scaled, tags = self.get_scaled_positions()
+        labels = np.array(elems, dtype=str)
+        tags = np.array(tags, dtype=str)
+
+        def make_positions(trans):
+            """Positions of the ions of the cells at the translations"""
+            pos = ((scaled[None, :, :] + trans[:, None, :]) @ inv_matrix).reshape(-1, 3)
+            if wrap:
+                pos -= np.floor(pos)
+                pos[pos >= 1.0] -= 1.0
+            if not frac:
+                pos = pos @ new_cell
+            return pos
+
+        out = type(self)()
+        out.header = list(self.header)
+        out.units = dict(self.units)
+        out.units.pop("positions_abs", None)
+        for key, value in self.items():
+            if key in ("lattice_cart", "lattice_abc"):
+                if "lattice_cart" not in out:
+                    out["lattice_cart"] = None
+            elif key in ("positions_abs", "positions_frac"):
+                out[pos_key] = None
+            else:
+                out[key] = copy.copy(value)
+        out.pop("lattice_abc", None)
+        out.set_cell(new_cell)
+
+        if fname is None:
+            ncells = len(translations)
+            out[pos_key] = NumericBlock(
+                make_positions(translations),
+                labels=np.tile(labels, ncells),
+                tags=np.tile(tags, ncells),
+            )
+            return out
+
+        # Cells in each chunk
+        step = max(1, chunk_size // max(1, len(labels)))
+        chunk_labels = np.tile(labels, step)
+        chunk_tags = np.tile(tags, step)
+        with open(fname, "w", encoding="utf-8") as fhandle:
+            fhandle.writelines(line + "\n" for line in out._iter_header())
+            for key, value in out.items():
+                if key != pos_key:
+                    lines = out._iter_item(key, value, cache=False)
+                    fhandle.writelines(line + "\n" for line in lines)
+                    continue
+                lines = list(out._iter_block(key, [], out.units.get(key, _NO_UNIT)))
+                fhandle.writelines(line + "\n" for line in lines[:-1])
+                for start in range(0, len(translations) if len(labels) else 0, step):
+                    trans = translations[start : start + step]
+                    nrows = len(trans) * len(labels)
+                    block = NumericBlock(
+                        make_positions(trans), labels=chunk_labels[:nrows], tags=chunk_tags[:nrows]
+                    )
+                    fhandle.write(block.render_text() + "\n")
+                fhandle.write(lines[-1] + "\n")
+        return None
 
 
 def parse_pos_line(cell_line):
@@ -234,6 +743,73 @@ def parse_pos_line(cell_line):
     return elem, coor, tags
 
 
+def parse_pos_block(cell_lines):
+    """
+    Parse all lines of a positions block in one pass.
+    Gives the same result as calling ``parse_pos_line`` for each line, but
+    the coordinates are converted in bulk.
+
+    :returns elems: A list of elements
+    :returns pos: A (N, 3) array of the coordinates
+    :returns tags: A list of the trailing tags
+    """
+    tokens = [line.strip().split(None, 4) for line in cell_lines]
+    if tokens and min(map(len, tokens)) < 4:
+        line = next(line for line, tks in zip(cell_lines, tokens) if len(tks) < 4)
+        raise ValueError(f"Cannot understand line: {line.strip()}")
+
+    elems = [tks[0].capitalize() for tks in tokens]
+    tags = [tks[4] if len(tks) == 5 else "" for tks in tokens]
+    coords = [val for tks in tokens for val in tks[1:4]]
+    pos = np.array(list(map(float, coords)), dtype=np.float64).reshape(-1, 3)
+
+    return elems, pos, tags
+
+
+def _column_index(columns):
+    """Return the index of the selected columns"""
+    if columns is None:
+        return slice(None)
+    if isinstance(columns, (int, np.integer)):
+        return slice(0, columns)
+    return np.asarray(columns, dtype=np.intp)
+
+
+def parse_block_array(lines, dtype=np.float64, columns=None, labels=False):
+    """
+    Parse the lines of a block into an array, converting all values at once
+
+    :param dtype: Type of the values
+    :param columns: The number of columns to read, or a sequence of the
+      indices of the columns, not counting the label. Any tokens after the
+      columns read are ignored. Default to all columns, in which case all
+      lines must have the same number of columns.
+    :param labels: Whether the first token of each line is a label
+    :returns: A (N, M) array of the values and an array of the labels,
+      which is None if ``labels`` is False
+    """
+    offset = 1 if labels else 0
+    select = _column_index(columns)
+    if columns is None:
+        rows = [line.split() for line in lines]
+        width = len(rows[0]) if rows else offset
+    else:
+        if isinstance(select, slice):
+            width = select.stop + offset
+        else:
+            width = int(select.max()) + 1 + offset if select.size else offset
+        rows = [line.split(None, width)[:width] for line in lines]
+
+    for line, row in zip(lines, rows):
+        if len(row) != width:
+            raise ValueError(f"Cannot understand line: {line.strip()}")
+
+    table = np.array(rows, dtype=str).reshape(len(rows), width)
+    values = table[:, offset:][:, select].astype(dtype)
+    names = table[:, 0] if labels else None
+    return values, names
+
+
 def construct_pos_line(elem, coor, tags):
     """
     Do the opposite of the parse_pos_line
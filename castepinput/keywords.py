@@ -0,0 +1,347 @@
+"""
+Registry of known CASTEP keywords and their types
+
+Each keyword has a single converter for its type, which is used by
+``convert_type_kw`` instead of inferring the type from the value. Unknown
+keywords and values that the converter does not accept fall back to the
+inference.
+"""
+
+from collections import namedtuple
+
+Keyword = namedtuple("Keyword", ["name", "type", "dimension", "convert"])
+Keyword.__doc__ = """
+A known keyword. ``dimension`` is the physical dimension of ``physical``
+keywords, which decides the units allowed, otherwise it is None.
+"""
+
+# Units allowed for each physical dimension, in lower case
+UNITS = {
+    "length": ("ang", "bohr", "a0", "m", "cm", "nm"),
+    "inv_length": ("1/ang", "1/bohr", "1/a0", "1/m", "1/cm", "1/nm"),
+    "energy": ("ev", "ha", "hartree", "mev", "ry", "mry", "j", "erg", "kcal/mol", "kj/mol"),
+    "force": ("ev/ang", "ha/bohr", "n"),
+    "pressure": ("gpa", "mpa", "pa", "ev/ang**3", "ha/bohr**3", "atm", "bar", "mbar"),
+    "time": ("ps", "fs", "aut", "ns", "s"),
+    "temperature": ("k",),
+    "frequency": ("thz", "hz", "mhz", "ghz", "cm-1", "ev", "mev", "ha", "k"),
+    "mass": ("amu", "kg", "g", "me"),
+}
+
+# Lengths of the length units in angstrom
+LENGTH_IN_ANG = {
+    "ang": 1.0,
+    "bohr": 0.529177210903,
+    "a0": 0.529177210903,
+    "m": 1e10,
+    "cm": 1e8,
+    "nm": 10.0,
+}
+
+# Blocks whose first line may give the unit of the values
+UNIT_BLOCKS = frozenset(
+    [
+        "lattice_cart",
+        "lattice_abc",
+        "positions_abs",
+        "positions_abs_product",
+        "positions_abs_intermediate",
+        "ionic_velocities",
+        "external_efield",
+        "external_pressure",
+        "species_mass",
+        "hubbard_u",
+    ]
+)
+
+
+def length_in_ang(unit):
+    """Return the length of a (case insensitive) length unit in angstrom"""
+    try:
+        return LENGTH_IN_ANG[unit.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown length unit {unit}") from None
+
+
+def to_string(value):
+    """Keep the value as a string"""
+    return value
+
+
+def to_bool(value):
+    """Convert a logical value"""
+    lower = value.strip().lower()
+    if lower in ("true", "t", ".true."):
+        return True
+    if lower in ("false", "f", ".false."):
+        return False
+    raise ValueError(f"Not a logical value: {value}")
+
+
+def to_float(value):
+    """Convert a real value, also accepting the Fortran exponent"""
+    try:
+        return float(value)
+    except ValueError:
+        return float(value.lower().replace("d", "e"))
+
+
+def to_int_vector(value):
+    """Convert a list of integers"""
+    return list(map(int, value.split()))
+
+
+def to_float_vector(value):
+    """Convert a list of reals"""
+    return list(map(to_float, value.split()))
+
+
+def to_defined(value):
+    """Keywords that only need to be present, which should have no value"""
+    if value:
+        raise ValueError(f"Unexpected value: {value}")
+    return value
+
+
+CONVERTERS = {
+    "string": to_string,
+    "logical": to_bool,
+    "integer": int,
+    "real": to_float,
+    "physical": to_float,
+    "integer_vector": to_int_vector,
+    "real_vector": to_float_vector,
+    "defined": to_defined,
+}
+
+_PARAM_KEYWORDS = {
+    "string": [
+        "task",
+        "comment",
+        "continuation",
+        "reuse",
+        "checkpoint",
+        "opt_strategy",
+        "write_checkpoint",
+        "xc_functional",
+        "basis_precision",
+        "metals_method",
+        "elec_method",
+        "mixing_scheme",
+        "smearing_scheme",
+        "elec_dump_file",
+        "elec_restore_file",
+        "geom_method",
+        "md_ensemble",
+        "md_thermostat",
+        "md_barostat",
+        "phonon_method",
+        "spectral_task",
+        "relativistic_treatment",
+        "pspot_beta_phi_type",
+        "pspot_nonlocal_type",
+        "sedc_scheme",
+        "data_distribution",
+        "spin_treatment",
+        "efield_calculate_nonlinear",
+        "magres_task",
+        "elnes_task",
+        "bs_xc_functional",
+        "cell_units",
+        "energy_unit",
+        "length_unit",
+        "run_time_unit",
+    ],
+    "logical": [
+        "calculate_stress",
+        "calculate_densdiff",
+        "calculate_elf",
+        "calculate_hirshfeld",
+        "calculate_raman",
+        "calculate_born_charges",
+        "popn_calculate",
+        "write_formatted_density",
+        "write_formatted_potential",
+        "write_formatted_elf",
+        "write_cell_structure",
+        "write_cif_structure",
+        "write_bib",
+        "write_orbitals",
+        "write_geom_trajectory",
+        "write_md_trajectory",
+        "spin_polarized",
+        "spin_polarised",
+        "spin_orbit_coupling",
+        "fix_occupancy",
+        "fixed_npw",
+        "sedc_apply",
+        "md_use_pathint",
+        "phonon_sum_rule",
+    ],
+    "integer": [
+        "iprint",
+        "backup_interval",
+        "num_backup_iter",
+        "run_time",
+        "nextra_bands",
+        "finite_basis_corr",
+        "finite_basis_npoints",
+        "mix_history_length",
+        "max_scf_cycles",
+        "max_sd_steps",
+        "max_cg_steps",
+        "num_dump_cycles",
+        "geom_max_iter",
+        "geom_convergence_win",
+        "geom_spin_fix",
+        "md_num_iter",
+        "phonon_max_cycles",
+        "efield_max_cycles",
+        "bs_nbands",
+        "bs_max_iter",
+        "rand_seed",
+        "num_proc_in_smp",
+        "num_proc_in_smp_fine",
+        "page_wvfns",
+        "opt_strategy_bias",
+        "spin_fix",
+        "nbands",
+        "elec_convergence_win",
+    ],
+    "real": [
+        "spin",
+        "perc_extra_bands",
+        "fine_grid_scale",
+        "grid_scale",
+        "charge",
+        "nelectrons",
+        "nup",
+        "ndown",
+        "mix_charge_amp",
+        "mix_spin_amp",
+        "sedc_s6",
+        "sedc_sr",
+    ],
+}
+
+_CELL_KEYWORDS = {
+    "integer_vector": [
+        "kpoints_mp_grid",
+        "kpoint_mp_grid",
+        "spectral_kpoints_mp_grid",
+        "spectral_kpoint_mp_grid",
+        "bs_kpoints_mp_grid",
+        "bs_kpoint_mp_grid",
+        "phonon_kpoints_mp_grid",
+        "phonon_kpoint_mp_grid",
+        "phonon_fine_kpoint_mp_grid",
+        "optics_kpoints_mp_grid",
+        "optics_kpoint_mp_grid",
+        "magres_kpoint_mp_grid",
+        "supercell_kpoints_mp_grid",
+        "supercell_kpoint_mp_grid",
+    ],
+    "real_vector": [
+        "kpoints_mp_offset",
+        "kpoint_mp_offset",
+        "spectral_kpoints_mp_offset",
+        "spectral_kpoint_mp_offset",
+        "bs_kpoints_mp_offset",
+        "bs_kpoint_mp_offset",
+        "phonon_kpoint_mp_offset",
+        "optics_kpoints_mp_offset",
+        "optics_kpoint_mp_offset",
+        "quantisation_axis",
+        "quantization_axis",
+    ],
+    "logical": [
+        "fix_all_cell",
+        "fix_all_ions",
+        "fix_com",
+        "fix_vol",
+        "cell_constraints_apply",
+    ],
+    "defined": [
+        "symmetry_generate",
+        "snap_to_symmetry",
+    ],
+}
+
+# Keywords with physical values, by their dimension
+_PHYSICAL_KEYWORDS = {
+    "energy": [
+        "cut_off_energy",
+        "basis_de_dloge",
+        "finite_basis_spacing",
+        "elec_energy_tol",
+        "elec_eigenvalue_tol",
+        "smearing_width",
+        "geom_energy_tol",
+        "phonon_energy_tol",
+        "bs_eigenvalue_tol",
+        "efield_energy_tol",
+    ],
+    "inv_length": [
+        "fine_gmax",
+        "mix_charge_gmax",
+        "mix_spin_gmax",
+        "kpoints_mp_spacing",
+        "kpoint_mp_spacing",
+        "spectral_kpoints_mp_spacing",
+        "spectral_kpoint_mp_spacing",
+        "bs_kpoint_path_spacing",
+        "spectral_kpoint_path_spacing",
+        "phonon_kpoint_mp_spacing",
+        "phonon_fine_kpoint_mp_spacing",
+        "optics_kpoint_mp_spacing",
+        "magres_kpoint_mp_spacing",
+    ],
+    "force": ["elec_force_tol", "geom_force_tol"],
+    "pressure": ["geom_stress_tol", "geom_modulus_est", "md_pressure"],
+    "length": ["geom_disp_tol", "symmetry_tol"],
+    "time": ["md_delta_t", "md_ion_t", "md_cell_t"],
+    "temperature": ["elec_temp", "md_temperature"],
+    "frequency": ["geom_frequency_est"],
+}
+
+
+def _build_registry():
+    registry = {}
+    for table in (_PARAM_KEYWORDS, _CELL_KEYWORDS):
+        for kw_type, names in table.items():
+            for name in names:
+                registry[name] = Keyword(name, kw_type, None, CONVERTERS[kw_type])
+    for dimension, names in _PHYSICAL_KEYWORDS.items():
+        for name in names:
+            registry[name] = Keyword(name, "physical", dimension, CONVERTERS["physical"])
+    return registry
+
+
+KEYWORDS = _build_registry()
+
+
+def get_keyword(name):
+    """Return the ``Keyword`` of a (case insensitive) name, or None if unknown"""
+    return KEYWORDS.get(name.lower())
+
+
+def register_keyword(name, kw_type, dimension=None):
+    """
+    Register a keyword, replacing any existing one
+
+    :param kw_type: One of the types in ``CONVERTERS``
+    :param dimension: The dimension of a ``physical`` keyword, one of those in ``UNITS``
+    """
+    if kw_type not in CONVERTERS:
+        raise ValueError(f"Unknown type {kw_type}")
+    if dimension is not None and dimension not in UNITS:
+        raise ValueError(f"Unknown dimension {dimension}")
+    KEYWORDS[name.lower()] = Keyword(name.lower(), kw_type, dimension, CONVERTERS[kw_type])
+
+
+def allowed_units(name):
+    """Return the units allowed for a keyword, which is empty if it has no units"""
+    keyword = get_keyword(name)
+    if keyword is None or keyword.dimension is None:
+        return ()
+    return UNITS[keyword.dimension]
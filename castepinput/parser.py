@@ -11,8 +11,11 @@ To stardardise data parsed. Output follows the convension
 3. case of the values themselves are not affected
 4. content of the blocks are not affected
 """
+import mmap
 import re
-from .common import Block, FormatError
+from . import profiling
+from .common import Block, FormatError, _detaching
+from .keywords import KEYWORDS
 
 COMMENT_SYMBOLS = ("#", "!")
 
@@ -20,6 +23,442 @@ COMMENT_SYMBOLS = ("#", "!")
 block_start = re.compile(r"%block (\w+)", flags=re.IGNORECASE)
 block_finish = re.compile(r"%endblock (\w+)", flags=re.IGNORECASE)
 kw_split = re.compile(r"[ \t:=]+")
+# RE for locating the start and the end of blocks in a memory mapped file
+block_marker = re.compile(rb"%(block|endblock) (\w+)", flags=re.IGNORECASE)
+# REs for parsing the whole buffer at once
+buffer_marker = re.compile(r"%(block|endblock) (\w+)", flags=re.IGNORECASE)
+buffer_hash_comment = re.compile(r"#([^\n]*)")
+
+ENGINES = ("lines", "regex")
+
+
+def split_comment(line):
+    """
+    Separate the comment from a stripped, non-empty line
+
+    :returns: A tuple of the line without the comment and the comment, which
+      is None if there is no comment.
+    """
+    # We first check for comment
+    if line[0] in COMMENT_SYMBOLS:
+        return "", line[1:].strip()
+
+    # Check if there is any trailing comments
+    for symbol in COMMENT_SYMBOLS:
+        pos = line.find(symbol)
+        if pos != -1:
+            # Remove trailing space
+            return line[:pos].strip(), line[pos + 1 :].strip()
+    return line, None
+
+
+def split_keyword(line):
+    """
+    Split a cleaned line into the (lower case) key and the value
+    """
+    tokens = kw_split.split(line, 1)
+    if len(tokens) == 2:
+        key, value = tokens
+    elif len(tokens) == 1:
+        key = tokens[0]
+        value = ""  # Empty string for key without values
+    else:
+        raise FormatError(f"Cannot parse into key-value pair in: {line}")
+    if not value:
+        value = ""
+    return key.lower(), value
+
+
+def block_marker_of(line):
+    """
+    Check if a cleaned line starting with ``%`` opens or closes a block
+
+    :returns: A tuple of whether the block starts and the (lower case) name
+      of the block, or None if the line is not a block marker
+    """
+    match = block_start.match(line)
+    if match:
+        return True, match.group(1).lower()
+    match = block_finish.match(line)
+    if match:
+        return False, match.group(1).lower()
+    return None
+
+
+def tokenize(lines):
+    """
+    Tokenize the lines of an input file in a single pass.
+
+    Only lines starting with ``%`` are checked for block markers, other lines
+    are either keywords or the content of the current block.
+
+    :param lines: An iterable of lines, e.g. an opened file
+    :returns: A generator of events, which can be one of
+      ``("comment", text)``, ``("keyword", key, value)`` and
+      ``("block", name, Block)``. Block events are yielded once the end
+      of the block is reached.
+    """
+    block_name = None  # Name of the block being read
+    block_lines = None
+    for line in lines:
+        line = line.strip()  # Get rid of white spaces
+        if not line:
+            continue  # skip empty lines
+
+        if "#" in line or "!" in line:
+            line, comment = split_comment(line)
+            yield ("comment", comment)
+            if not line:
+                continue
+
+        marker = block_marker_of(line) if line[0] == "%" else None
+        if marker is None:
+            if block_name is None:
+                key, value = split_keyword(line)
+                yield ("keyword", key, value)
+            else:
+                block_lines.append(line)
+            continue
+
+        is_start, name = marker
+        if is_start:
+            if block_name is not None:
+                raise FormatError(f"End of block {block_name}" " is not detected")
+            block_name = name
+            block_lines = []
+        else:
+            if block_name is None:
+                raise FormatError(f"Start of block {name} not" " found")
+            if name != block_name:
+                raise FormatError(f"Mismatch block names, start: {block_name}" f" finish: {name}")
+            yield ("block", block_name, Block(block_lines))
+            block_name = None
+            block_lines = None
+
+    if block_name is not None:
+        raise FormatError(f"End of block {block_name}" " not detected")
+
+
+def _line_span(text, pos):
+    """Return the start and the end of the line containing ``pos``"""
+    end = text.find("\n", pos)
+    return text.rfind("\n", 0, pos) + 1, len(text) if end == -1 else end
+
+
+def _region_lines(region):
+    """Return the stripped non-empty lines of a part of the buffer"""
+    return list(filter(None, map(str.strip, region.split("\n"))))
+
+
+def parse_buffer(text):
+    """
+    Parse the whole content of an input file, giving the same results as
+    ``tokenize``.
+
+    Instead of looking at each line, the buffer is searched for the comment
+    symbols and then for the block markers with a regex, and only the lines
+    found are handled one by one. The content between the markers is split
+    into lines in bulk.
+
+    :param text: The content of the file
+    :returns: A tuple of the dictionaries of the keywords and the blocks,
+      and the list of the comments
+    """
+    text, comments = _strip_comments(text)
+    return _parse_clean_buffer(text) + (comments,)
+
+
+def _strip_comments(text):
+    """
+    Remove the comments from a buffer
+
+    :returns: A tuple of the text without the comments and the list of the comments
+    """
+    # Lines with "!" are split one by one, as a "#" after it takes precedence
+    found = []  # Positions in the new text and the comments
+    pieces = []
+    pos = 0  # End of the text already processed
+    length = 0  # Length of the new text
+    bang = text.find("!")
+    while bang != -1:
+        start, end = _line_span(text, bang)
+        line, comment = split_comment(text[start:end].strip())
+        pieces.append(text[pos:start])
+        length += start - pos
+        found.append((length, comment))
+        pieces.append(line)
+        length += len(line)
+        pos = end
+        bang = text.find("!", end)
+    if pieces:
+        pieces.append(text[pos:])
+        text = "".join(pieces)
+
+    # The lines left can only have "#" comments
+    matches = buffer_hash_comment.finditer(text)
+    found.extend((match.start(), match.group(1).strip()) for match in matches)
+    found.sort(key=lambda item: item[0])
+    return buffer_hash_comment.sub("", text), [comment for _, comment in found]
+
+
+def _parse_clean_buffer(text):
+    """
+    Parse the keywords and the blocks of a buffer without comments
+
+    :returns: A tuple of the dictionaries of the keywords and the blocks
+    """
+    keywords = {}
+    blocks = {}
+
+    def add_keywords(region):
+        for line in _region_lines(region):
+            key, value = split_keyword(line)
+            keywords[key] = value
+
+    block_name = None  # Name of the block being read
+    pos = 0  # Start of the content after the last marker
+    for match in buffer_marker.finditer(text):
+        if match.start() < pos:
+            continue  # In the line of the last marker
+        start, end = _line_span(text, match.start())
+        prefix = text[start : match.start()]
+        if prefix and not prefix.isspace():
+            continue  # Not at the start of the line
+        region = text[pos:start]
+        pos = end
+        name = match.group(2).lower()
+        if match.group(1).lower() == "block":
+            if block_name is not None:
+                raise FormatError(f"End of block {block_name}" " is not detected")
+            add_keywords(region)
+            block_name = name
+        else:
+            if block_name is None:
+                raise FormatError(f"Start of block {name} not" " found")
+            if name != block_name:
+                raise FormatError(f"Mismatch block names, start: {block_name}" f" finish: {name}")
+            blocks[block_name] = Block(_region_lines(region))
+            block_name = None
+
+    if block_name is not None:
+        raise FormatError(f"End of block {block_name}" " not detected")
+    add_keywords(text[pos:])
+    return keywords, blocks
+
+
+def clean_lines(lines):
+    """
+    Return the stripped lines with the comments and blank lines removed
+    """
+    cleaned_lines = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        line, _ = split_comment(line)
+        if line:
+            cleaned_lines.append(line)
+    return cleaned_lines
+
+
+class MappedBlock(Block):
+    """
+    A block whose content is left in a memory mapped file.
+
+    The content is only decoded when the block is first accessed, after
+    which it behaves as a plain ``Block``. Comments inside the block are
+    dropped when decoding, as for the other parsers.
+    """
+
+    def __init__(self, buffer, start, end, encoding="utf-8", source=None):
+        """
+        Instantiate a MappedBlock
+
+        :param buffer: The memory mapped file
+        :param start: Offset of the first byte of the content
+        :param end: Offset after the last byte of the content
+        :param source: Path of the mapped file
+        """
+        super().__init__()
+        self.source = source
+        self._buffer = buffer
+        self._span = (start, end)
+        self.encoding = encoding
+
+    @property
+    def is_mapped(self):
+        """Whether the content has not been decoded yet"""
+        return self._buffer is not None
+
+    def raw_text(self):
+        """
+        Return the undecoded content as it is in the file, without
+        the final newline
+        """
+        return "\n".join(self.iter_raw_chunks())
+
+    def iter_raw_chunks(self, chunk_size=1 << 20):
+        """
+        Iterate through the content as it is in the file in chunks of about
+        ``chunk_size`` bytes. Each chunk contains whole lines and does not
+        include the newline at the end.
+        """
+        if not self.is_mapped:
+            raise RuntimeError("The content of the block has been decoded")
+        buffer = self._buffer
+        start, end = self._span
+        # Drop the final newline
+        if end > start and buffer[end - 1] == ord("\n"):
+            end -= 1
+        while start < end:
+            stop = start + chunk_size
+            if stop < end:
+                # Break at a newline
+                newline = buffer.rfind(b"\n", start, stop)
+                if newline == -1:
+                    newline = buffer.find(b"\n", stop, end)
+                stop = end if newline == -1 else newline
+            else:
+                stop = end
+            chunk = buffer[start:stop].decode(self.encoding)
+            if stop == end and chunk.endswith("\r"):
+                chunk = chunk[:-1]
+            yield chunk
+            start = stop + 1
+
+    def detach(self):
+        """Decode the content and release the mapped file"""
+        if self.is_mapped:
+            start_time = profiling.start()
+            start, end = self._span
+            lines = clean_lines(self._buffer[start:end].decode(self.encoding).splitlines())
+            self._buffer = None
+            list.extend(self, lines)
+            profiling.record("detach_block", start_time, lines=len(lines))
+        return self
+
+    def __reduce__(self):
+        return (Block, (list(self),))
+
+    def __reduce_ex__(self, protocol):
+        return self.__reduce__()
+
+    __iter__ = _detaching("__iter__", modify=False)
+    __len__ = _detaching("__len__", modify=False)
+    __getitem__ = _detaching("__getitem__", modify=False)
+    __contains__ = _detaching("__contains__", modify=False)
+    __reversed__ = _detaching("__reversed__", modify=False)
+    __eq__ = _detaching("__eq__", modify=False)
+    __ne__ = _detaching("__ne__", modify=False)
+    __add__ = _detaching("__add__", modify=False)
+
+    def __radd__(self, other):
+        # Called before list.__add__ of the other list, which would only see
+        # the empty list storage of a mapped block
+        if not isinstance(other, list):
+            return NotImplemented
+        self.detach()
+        return list(other) + list(self)
+
+    __mul__ = _detaching("__mul__", modify=False)
+    __rmul__ = _detaching("__rmul__", modify=False)
+    copy = _detaching("copy", modify=False)
+    count = _detaching("count", modify=False)
+    index = _detaching("index", modify=False)
+
+    __setitem__ = _detaching("__setitem__")
+    __delitem__ = _detaching("__delitem__")
+    __iadd__ = _detaching("__iadd__")
+    __imul__ = _detaching("__imul__")
+    append = _detaching("append")
+    extend = _detaching("extend")
+    insert = _detaching("insert")
+    pop = _detaching("pop")
+    remove = _detaching("remove")
+    clear = _detaching("clear")
+    sort = _detaching("sort")
+    reverse = _detaching("reverse")
+
+    __hash__ = None
+
+    def __repr__(self):
+        self.detach()
+        return super().__repr__()
+
+
+def parse_mapped(fname, convert_type=True, encoding="utf-8"):
+    """
+    Parse a file by memory mapping it.
+
+    Only the keyword lines are decoded and parsed, the blocks are returned
+    as ``MappedBlock`` objects that hold the offsets of their content.
+
+    :param fname: Path to the file
+    :param convert_type: Either try to convert the types of the values or not
+    :returns: A dictionary of the keywords and blocks
+    """
+    start_time = profiling.start()
+    with open(fname, "rb") as fhandle:
+        try:
+            buffer = mmap.mmap(fhandle.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            return {}
+
+    def parse_region(start, end):
+        text = buffer[start:end].decode(encoding)
+        for event in tokenize(text.splitlines()):
+            if event[0] == "keyword":
+                value = event[2]
+                if convert_type:
+                    value = convert_type_kw(value, event[1])
+                keywords[event[1]] = value
+            elif event[0] == "block":
+                # Blocks are located with the regex - this should not happen
+                raise FormatError(f"Unexpected block {event[1]}")
+
+    def next_line(pos):
+        newline = buffer.find(b"\n", pos)
+        return len(buffer) if newline == -1 else newline + 1
+
+    keywords = {}
+    blocks = {}
+    in_block = False
+    start_name = None
+    region_start = 0
+    content_start = 0
+    for match in block_marker.finditer(buffer):
+        # Only markers at the start of a line count
+        line_start = buffer.rfind(b"\n", 0, match.start()) + 1
+        if buffer[line_start : match.start()].strip():
+            continue
+        name = match.group(2).decode(encoding).lower()
+        if match.group(1).lower() == b"block":
+            if in_block is True:
+                raise FormatError(f"End of block {start_name}" " is not detected")
+            parse_region(region_start, line_start)
+            in_block = True
+            start_name = name
+            content_start = next_line(match.end())
+        else:
+            if in_block is False:
+                raise FormatError(f"Start of block {name} not" " found")
+            if name != start_name:
+                raise FormatError(f"Mismatch block names, start: {start_name}" f" finish: {name}")
+            blocks[name] = MappedBlock(buffer, content_start, line_start, encoding, source=fname)
+            in_block = False
+            region_start = next_line(match.end())
+
+    if in_block is True:
+        raise FormatError(f"End of block {start_name}" " not detected")
+    parse_region(region_start, len(buffer))
+    profiling.record(
+        "parse_mapped", start_time, bytes=len(buffer), keywords=len(keywords), blocks=len(blocks)
+    )
+
+    res = dict(keywords)
+    res.update(blocks)
+    return res
 
 
 class PlainParser:
@@ -28,41 +467,118 @@ class PlainParser:
     Does nothing fancy, basic text processing
     """
 
-    def __init__(self, lines):
+    def __init__(self, lines, engine="lines"):
         """
         Parser for cell/param files for castep.
         May also be useful for OptaDos/CASTEPConv that shares similar
         format.
         Parameters:
-        :params lines: A list of the file content or name of a file to be read
+        :params lines: A list of the file content, name of a file to be read
+          or a file object opened in text mode
+        :param engine: ``lines`` for processing the input line by line with
+          ``tokenize``, or ``regex`` for reading the whole input and parsing
+          it with ``parse_buffer``
         """
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine {engine}, must be one of {ENGINES}")
+        self.engine = engine
 
         if isinstance(lines, (list, tuple)):
             self._raw_lines = lines  # Raw input lines
+            self._source = None
         else:
-            with open(lines, encoding="utf-8") as fhandle:
-                lin = []
-                for line in fhandle:
-                    lin.append(line.strip())
-            self._raw_lines = lin
+            # A path or a file object - only read when parsing
+            self._raw_lines = None
+            self._source = lines
 
         self._lines = []  # Processed lines
         self._kwlines = []  # key-value paired lines
         self._blocks = {}  # A dictionary of blocks
         self._keywords = {}  # A dictionary of key value pairs
         self._comments = []
+        self._parsed = False
 
     def parse(self):
         """
         Parse the input file
+
+        The lines are processed in a single pass with ``tokenize`` so files
+        are read line by line without keeping intermediate copies.
         """
-        self._clean_up_lines()  # Remove comments, blank lines
-        self._split_block_kw()  # Extract blocks from the lines
-        self._parse_keywords()  # Parse the key, value pair
+        if self.engine == "regex":
+            self._parse_buffer()
+            return
+
+        keywords = {}
+        blocks = {}
+        comments = []
+        start_time = profiling.start()
+        lines = self._iter_raw_lines()
+        if start_time is not None:
+            lines = profiling.LineCounter(lines)
+        for event in tokenize(lines):
+            if event[0] == "keyword":
+                keywords[event[1]] = event[2]
+            elif event[0] == "block":
+                blocks[event[1]] = event[2]
+            else:
+                comments.append(event[1])
+        if start_time is not None:
+            profiling.record(
+                "tokenize",
+                start_time,
+                lines=lines.count,
+                keywords=len(keywords),
+                blocks=len(blocks),
+                comments=len(comments),
+            )
+
+        self._keywords = keywords
+        self._blocks = blocks
+        self._comments = comments
+        self._parsed = True
+
+    def _parse_buffer(self):
+        """Parse the whole input at once with ``parse_buffer``"""
+        start_time = profiling.start()
+        if self._raw_lines is not None:
+            text = "\n".join(self._raw_lines)
+        elif hasattr(self._source, "read"):
+            text = self._source.read()
+        else:
+            with open(self._source, encoding="utf-8") as fhandle:
+                text = fhandle.read()
+        keywords, blocks, comments = parse_buffer(text)
+        if start_time is not None:
+            profiling.record(
+                "tokenize",
+                start_time,
+                lines=text.count("\n") + 1,
+                keywords=len(keywords),
+                blocks=len(blocks),
+                comments=len(comments),
+            )
+
+        self._keywords = keywords
+        self._blocks = blocks
+        self._comments = comments
+        self._parsed = True
+
+    def _iter_raw_lines(self):
+        """Iterate through the raw lines of the input"""
+        if self._raw_lines is not None:
+            yield from self._raw_lines
+        elif hasattr(self._source, "read"):
+            yield from self._source
+        else:
+            with open(self._source, encoding="utf-8") as fhandle:
+                yield from fhandle
 
     @property
     def content(self):
         """A list of lines as inputs for parsing"""
+        if self._raw_lines is None:
+            self._raw_lines = list(self._iter_raw_lines())
         return self._raw_lines
 
     @property
@@ -87,20 +603,11 @@ class PlainParser:
             if not line:
                 continue  # skip empty lines
 
-            # We first check for comment
-            if line[0] in COMMENT_SYMBOLS:
-                comments.append(line[1:].strip())
-                continue
-
-            # Check if there is any trailing comments
-            for symbol in COMMENT_SYMBOLS:
-                pos = line.find(symbol)
-                if pos != -1:
-                    comments.append(line[pos + 1 :].strip())
-                    cld_line = line[:pos].strip()  # Remove trailing space
-                    break
-                cld_line = line
-            cleaned_lines.append(cld_line)
+            cld_line, comment = split_comment(line)
+            if comment is not None:
+                comments.append(comment)
+            if cld_line:
+                cleaned_lines.append(cld_line)
 
         self._lines = cleaned_lines
         self._comments = comments
@@ -116,47 +623,41 @@ class PlainParser:
         if self._lines is None:
             self._clean_up_lines()
 
-        # Extract
-        block_indices = {}
-        in_block = False
+        # Only lines starting with % can open or close blocks, the content
+        # of the blocks is collected while reading them
+        blocks = {}
         kwlines = []
-        start_name = None
-        for i, line in enumerate(self._lines):
-            start_match = block_start.match(line)
-            if start_match:
-                if in_block is True:
-                    raise FormatError(f"End of block {start_name}" " is not detected")
-                start = i
-                in_block = True
-                start_name = start_match.group(1).lower()
+        block_name = None  # Name of the block being read
+        block_lines = None
+        for line in self._lines:
+            marker = block_marker_of(line) if line[0] == "%" else None
+            if marker is None:
+                if block_name is None:
+                    kwlines.append(line)
+                else:
+                    block_lines.append(line)
                 continue
 
-            end_match = block_finish.match(line)
-            if end_match:
-                finish = i
-                end_name = end_match.group(1).lower()
-                if in_block is False:
-                    raise FormatError(f"Start of block {end_name} not" " found")
-                if end_name != start_name:
+            is_start, name = marker
+            if is_start:
+                if block_name is not None:
+                    raise FormatError(f"End of block {block_name}" " is not detected")
+                block_name = name
+                block_lines = []
+            else:
+                if block_name is None:
+                    raise FormatError(f"Start of block {name} not" " found")
+                if name != block_name:
                     raise FormatError(
-                        f"Mismatch block names, start: {start_name}" f" finish: {end_name}"
+                        f"Mismatch block names, start: {block_name}" f" finish: {name}"
                     )
                 # Push the content of the push into the main container
-                block_indices[start_name] = (start, finish)
-                in_block = False
-                continue
+                blocks[block_name] = Block(block_lines)
+                block_name = None
+                block_lines = None
 
-            if not in_block:
-                kwlines.append(line)
-
-        if in_block is True:
-            raise FormatError(f"End of block {start_name}" " not detected")
-
-        # Now extract block contents
-        blocks = {}
-        for key, index in block_indices.items():
-            lines = self._lines[index[0] + 1 : index[1]]
-            blocks[key.lower()] = Block(lines)
+        if block_name is not None:
+            raise FormatError(f"End of block {block_name}" " not detected")
 
         self._blocks = blocks
         self._kwlines = kwlines
@@ -166,18 +667,8 @@ class PlainParser:
         """Parse keyword, value pairs"""
         out_dict = {}
         for line in self._kwlines:
-            tokens = kw_split.split(line, 1)
-            if len(tokens) == 2:
-                key, value = tokens
-            elif len(tokens) == 1:
-                key = tokens[0]
-                value = ""  # Empty string for key without values
-            else:
-                raise FormatError(f"Cannot parse into key-value pair in: {line}")
-            if not value:
-                value = ""
-
-            out_dict[key.lower()] = value
+            key, value = split_keyword(line)
+            out_dict[key] = value
         self._keywords = out_dict
         return out_dict
 
@@ -186,7 +677,7 @@ class PlainParser:
         Get the parsed information in a dictionary in a dictionary.
         This is the main function that will be used.
         """
-        if not self._keywords:
+        if not self._parsed:
             self.parse()
         res = dict(self._keywords)
         res.update(self._blocks)
@@ -200,15 +691,16 @@ class Parser(PlainParser):
     bool >> int >> float >> plain text
     """
 
-    def __init__(self, lines, convert_type=True):
+    def __init__(self, lines, convert_type=True, engine="lines"):
         """
         Initialize the parser by passing either:
         - A list of lines to be parsed
         - A path to the file to be parsed
 
         :param convert_type: Either try to convert the types or not
+        :param engine: The engine used for parsing, see ``PlainParser``
         """
-        super().__init__(lines)
+        super().__init__(lines, engine=engine)
         self._convert_type = convert_type
 
     def parse(self):
@@ -222,14 +714,42 @@ class Parser(PlainParser):
 
         old_keywords = self._keywords
 
+        start_time = profiling.start()
         new_keywords = {}
         for key, value in old_keywords.items():
             new_keywords[key] = convert_type_kw(value, key)
+        if start_time is not None:
+            profiling.record(
+                "convert_type",
+                start_time,
+                values=len(new_keywords),
+                unconverted=_count_unconverted(new_keywords),
+            )
 
         self._keywords = new_keywords
         return None
 
 
+def _count_unconverted(keywords):
+    """Count the non-empty values left as strings"""
+    return sum(1 for value in keywords.values() if isinstance(value, str) and value)
+
+
+def parse_file(fname, plain=False, engine="lines"):
+    """
+    Parse a file into a dictionary
+
+    :param plain: Do not convert the types of the values
+    :param engine: The engine used for parsing, see ``PlainParser``
+    """
+    with open(fname, encoding="utf-8") as fhandle:
+        if plain:
+            parser = PlainParser(fhandle, engine=engine)
+        else:
+            parser = Parser(fhandle, engine=engine)
+        return parser.get_dict()
+
+
 class CannotConvertError(ValueError):
     pass
 
@@ -290,13 +810,68 @@ boolconv = Converter(booltest)
 emptyconv = Converter(emptystrtest)
 
 
+# Patterns for values that are plain numbers or arrays of numbers
+INT_RE = r"[+-]?[0-9]+"
+FLOAT_RE = r"[+-]?(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?"
+number_value = re.compile(
+    rf"\s*(?:(?P<int>{INT_RE})|(?P<float>{FLOAT_RE})"
+    rf"|(?P<intarray>{INT_RE}(?:\s+{INT_RE})+)|(?P<floatarray>{FLOAT_RE}(?:\s+{FLOAT_RE})+))\s*"
+)
+# Any character that cannot be part of something int/float would accept
+not_number_char = re.compile(r"[^0-9+\-.eE_\snNaAiIfFtTyY]")
+
+
 def convert_type_kw(value, key=None):
     """
     Try to convert type of the value
+
+    Values of the keywords in the registry (see ``keywords.KEYWORDS``) are
+    converted with the converter of their type. Otherwise, the value is
+    classified in a single pass, giving the same result as trying the
+    converters in the order of empty, bool, int, float, int array, float
+    array. Only unusual values (e.g. ``nan`` or ``1_000``) are passed
+    through the converters.
+
+    :param key: The (lower case) keyword of the value
     """
-    # the key argument is not used for now - reserve for per-key treatment
-    _ = key
+    if value == "":
+        return value
 
+    if key is not None:
+        keyword = KEYWORDS.get(key)
+        if keyword is not None:
+            try:
+                return keyword.convert(value)
+            except ValueError:
+                # Not a valid value of its type, e.g. with a unit
+                pass
+
+    match = number_value.fullmatch(value)
+    if match is not None:
+        group = match.lastgroup
+        if group == "int":
+            return int(value)
+        if group == "float":
+            return float(value)
+        if group == "intarray":
+            return list(map(int, value.split()))
+        return list(map(float, value.split()))
+
+    lower = value.strip().lower()
+    if lower == "true":
+        return True
+    if lower == "false":
+        return False
+    if value.isascii() and not_number_char.search(value):
+        # Cannot be a number or an array of numbers
+        return value
+    return _convert_type_slow(value)
+
+
+def _convert_type_slow(value):
+    """
+    Convert the type of the value by trying each of the converters
+    """
     # Note that the order of which these converters are call matters
     convs = [emptyconv, boolconv, intconv, floatconv, intarrayconv, floatarrayconv]
     for converter in convs:
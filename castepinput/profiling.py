@@ -0,0 +1,125 @@
+"""
+Opt-in collection of the timings and counts of the parsing and writing stages
+
+Stages report to the hooks registered with ``add_hook``, each called as
+``hook(stage, elapsed, counts)``. Nothing is timed or counted unless a hook
+is registered, so the cost when disabled is a check of the list of hooks per
+stage. ``StatsCollector`` is a hook that sums up the stats while used as a
+context manager::
+
+    with StatsCollector() as stats:
+        CellInput.from_file("seed.cell")
+    print(stats.summary())
+
+Stages reported:
+
+* ``tokenize`` splitting the lines into comments, keywords and blocks
+* ``convert_type`` converting the types of the values of the keywords
+* ``parse_mapped`` locating the blocks of a memory mapped file
+* ``load`` the whole loading of a file by ``CastepInput.load_file``
+* ``detach_block`` decoding the content of a memory mapped block
+* ``render_block`` rendering the lines of a block
+* ``write`` writing the content with ``CastepInput.write_to``
+"""
+
+import time
+
+# The registered hooks, nothing is collected if it is empty
+_hooks = []
+
+
+def add_hook(hook):
+    """
+    Register a hook to be called with the stats of each stage
+
+    :param hook: A callable taking the name of the stage, the time spent
+      in seconds and a dictionary of the counts
+    """
+    _hooks.append(hook)
+
+
+def remove_hook(hook):
+    """Remove a registered hook"""
+    _hooks.remove(hook)
+
+
+def enabled():
+    """Whether any hook is registered"""
+    return bool(_hooks)
+
+
+def start():
+    """Return the start time of a stage, or None if nothing is collected"""
+    if _hooks:
+        return time.perf_counter()
+    return None
+
+
+def record(stage, start_time, **counts):
+    """
+    Report a finished stage to the hooks
+
+    :param start_time: The value returned by ``start`` at the start of the stage
+    :param counts: Counts of things processed in the stage
+    """
+    if start_time is None:
+        return
+    elapsed = time.perf_counter() - start_time
+    for hook in tuple(_hooks):
+        hook(stage, elapsed, counts)
+
+
+class LineCounter:
+    """An iterator counting the lines passed through"""
+
+    def __init__(self, lines):
+        self._lines = iter(lines)
+        self.count = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = next(self._lines)
+        self.count += 1
+        return line
+
+
+class StatsCollector:
+    """
+    Sum up the stats of each stage while used as a context manager
+
+    ``stats`` is a dictionary keyed by the stage, each is a dictionary of the
+    number of ``calls``, the total ``time`` and the totals of the counts.
+    """
+
+    def __init__(self):
+        self.stats = {}
+
+    def __call__(self, stage, elapsed, counts):
+        entry = self.stats.setdefault(stage, {"calls": 0, "time": 0.0})
+        entry["calls"] += 1
+        entry["time"] += elapsed
+        for name, value in counts.items():
+            entry[name] = entry.get(name, 0) + value
+
+    def __enter__(self):
+        add_hook(self)
+        return self
+
+    def __exit__(self, *exc):
+        remove_hook(self)
+
+    def clear(self):
+        """Drop the stats collected"""
+        self.stats.clear()
+
+    def summary(self):
+        """Return a table of the stats as a string"""
+        lines = [f"{'stage':<16} {'calls':>8} {'time (s)':>12}  counts"]
+        for stage, entry in self.stats.items():
+            counts = " ".join(
+                f"{name}={value}" for name, value in entry.items() if name not in ("calls", "time")
+            )
+            lines.append(f"{stage:<16} {entry['calls']:>8d} {entry['time']:>12.6f}  {counts}")
+        return "\n".join(lines)
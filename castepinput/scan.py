@@ -0,0 +1,345 @@
+"""
+Scanning many inputs for selected keywords without parsing them fully
+
+Only the keyword lines are looked at, the content of the blocks is skipped
+and only the number of lines counted. Files can be on the filesystem or
+inside tar archives, and the results can be kept in a SQLite index that is
+refreshed by the modification time of the files.
+"""
+
+import io
+import json
+import os
+import sqlite3
+import tarfile
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from .common import FormatError, is_unit_line
+from .keywords import UNIT_BLOCKS
+from .parser import COMMENT_SYMBOLS, block_marker_of, split_comment, split_keyword
+
+SCAN_EXTENSIONS = (".cell", ".param")
+TAR_EXTENSIONS = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+ScanResult = namedtuple(
+    "ScanResult", ["path", "member", "mtime", "size", "keywords", "blocks", "error"]
+)
+ScanResult.__doc__ = """
+Result of scanning a single input. ``member`` is the name inside the tar
+archive at ``path``, or an empty string for plain files. ``keywords`` is a
+dictionary of the raw values of the keywords found, ``blocks`` a dictionary
+of the number of lines and the unit (or None) of each block. ``error`` is
+the message of the error if the input could not be scanned.
+"""
+
+
+def scan_lines(lines, keywords=None):
+    """
+    Extract keywords and count the lines of the blocks
+
+    :param lines: An iterable of lines
+    :param keywords: A collection of the (lower case) keywords to extract,
+      all keywords are extracted if None
+    :returns: A tuple of the dictionary of the raw values of the keywords and
+      the dictionary of ``(nlines, unit)`` of each block. Only the blocks in
+      ``UNIT_BLOCKS`` are checked for a unit.
+    :raises FormatError: If a block is not closed or closed with another name
+    """
+    values = {}
+    blocks = {}
+    block_name = None  # Name of the block being skipped
+    nlines = 0
+    unit = None
+    for line in lines:
+        line = line.strip()
+        if not line or line[0] in COMMENT_SYMBOLS:
+            continue
+        if line[0] == "%":
+            marker = block_marker_of(line)
+            if marker is not None:
+                is_start, name = marker
+                if is_start:
+                    if block_name is not None:
+                        raise FormatError(f"End of block {block_name} is not detected")
+                    block_name, nlines, unit = name, 0, None
+                else:
+                    if block_name is None:
+                        raise FormatError(f"Start of block {name} not found")
+                    if name != block_name:
+                        raise FormatError(
+                            f"Mismatch block names, start: {block_name} finish: {name}"
+                        )
+                    blocks[block_name] = (nlines, unit)
+                    block_name = None
+                continue
+        if block_name is not None:
+            # Only the first line may be a unit
+            if nlines == 0 and unit is None and block_name in UNIT_BLOCKS:
+                content = split_comment(line)[0]
+                if is_unit_line(content):
+                    unit = content
+                    continue
+            nlines += 1
+            continue
+
+        line, _ = split_comment(line)
+        if not line:
+            continue
+        key, value = split_keyword(line)
+        if keywords is None or key in keywords:
+            values[key] = value
+    if block_name is not None:
+        raise FormatError(f"End of block {block_name} not detected")
+    return values, blocks
+
+
+def _is_tar(path):
+    return path.lower().endswith(TAR_EXTENSIONS)
+
+
+def _scan_task(task):
+    """Scan a file or all inputs inside a tar archive, returning a list of ScanResult"""
+    path, keywords, extensions = task
+    try:
+        stat = os.stat(path)
+        if not _is_tar(path):
+            try:
+                with open(path, encoding="utf-8", errors="replace") as fhandle:
+                    values, blocks = scan_lines(fhandle, keywords)
+            except FormatError as exc:
+                values, blocks, error = {}, {}, str(exc)
+            else:
+                error = None
+            return [ScanResult(path, "", stat.st_mtime, stat.st_size, values, blocks, error)]
+
+        results = []
+        with tarfile.open(path, "r:*") as archive:
+            # Members are read as they are streamed from the archive
+            for member in archive:
+                if not member.isfile() or not member.name.lower().endswith(extensions):
+                    continue
+                try:
+                    with archive.extractfile(member) as raw:
+                        text = io.TextIOWrapper(raw, encoding="utf-8", errors="replace")
+                        values, blocks = scan_lines(text, keywords)
+                except Exception as exc:  # pylint: disable=broad-except
+                    values, blocks, error = {}, {}, str(exc)
+                else:
+                    error = None
+                results.append(
+                    ScanResult(path, member.name, stat.st_mtime, member.size, values, blocks, error)
+                )
+        return results
+    except Exception as error:  # pylint: disable=broad-except
+        return [ScanResult(path, "", None, None, {}, {}, str(error))]
+
+
+def find_inputs(paths, extensions=SCAN_EXTENSIONS):
+    """
+    Find the input files and tar archives under the paths
+
+    :param paths: Paths to files or directories, which are searched recursively
+    :returns: A list of the paths found
+    """
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+    found = []
+    for path in map(os.fspath, paths):
+        if not os.path.isdir(path):
+            found.append(path)
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                lower = name.lower()
+                if lower.endswith(extensions) or _is_tar(lower):
+                    found.append(os.path.join(root, name))
+    return found
+
+
+def scan(paths, keywords=None, workers=None, extensions=SCAN_EXTENSIONS):
+    """
+    Scan the inputs in files, directories and tar archives
+
+    :param paths: Paths to files, directories or tar archives
+    :param keywords: A collection of the keywords to extract, all if None
+    :param workers: Number of processes to use, default to the number of CPUs
+    :param extensions: Extensions of the files to scan
+    :returns: An iterator of ``ScanResult``
+    """
+    files = find_inputs(paths, extensions)
+    yield from _scan_files(files, keywords, workers, extensions)
+
+
+def _scan_files(files, keywords, workers, extensions):
+    if keywords is not None:
+        keywords = frozenset(key.lower() for key in keywords)
+    tasks = [(path, keywords, tuple(extensions)) for path in files]
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(tasks))
+    if workers <= 1:
+        for task in tasks:
+            yield from _scan_task(task)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        chunksize = max(1, len(tasks) // (workers * 4))
+        for results in executor.map(_scan_task, tasks, chunksize=chunksize):
+            yield from results
+
+
+class ScanIndex:
+    """
+    A SQLite index of the scanned inputs
+
+    The index has the tables:
+
+    * ``inputs(path, member, mtime, size, error)``
+    * ``keywords(path, member, key, value)`` the raw values of the keywords
+    * ``blocks(path, member, name, nlines, unit)`` the number of lines of the blocks
+
+    ``update`` only scans the files that are new or modified since the last
+    update, and removes the files that no longer exist.
+    """
+
+    def __init__(self, db_path, keywords=None):
+        """
+        Open or create an index
+
+        :param db_path: Path to the SQLite database
+        :param keywords: The keywords to extract, all if None. The whole index
+          is rebuilt if they differ from the ones used to build the index.
+        """
+        self.db_path = db_path
+        self.keywords = None if keywords is None else sorted(key.lower() for key in keywords)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS inputs (
+                path TEXT, member TEXT, mtime REAL, size INTEGER, error TEXT,
+                PRIMARY KEY (path, member)
+            );
+            CREATE TABLE IF NOT EXISTS keywords (
+                path TEXT, member TEXT, key TEXT, value TEXT
+            );
+            CREATE TABLE IF NOT EXISTS blocks (
+                path TEXT, member TEXT, name TEXT, nlines INTEGER, unit TEXT
+            );
+            CREATE INDEX IF NOT EXISTS keywords_path ON keywords (path, member);
+            CREATE INDEX IF NOT EXISTS keywords_key ON keywords (key);
+            CREATE INDEX IF NOT EXISTS blocks_path ON blocks (path, member);
+            CREATE INDEX IF NOT EXISTS blocks_name ON blocks (name);
+            """
+        )
+        stored = self.conn.execute("SELECT value FROM meta WHERE name = 'keywords'").fetchone()
+        setting = json.dumps(self.keywords)
+        if stored is None or stored[0] != setting:
+            with self.conn:
+                for table in ("inputs", "keywords", "blocks"):
+                    self.conn.execute(f"DELETE FROM {table}")
+                self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('keywords', ?)", (setting,))
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def update(self, paths, workers=None, extensions=SCAN_EXTENSIONS):
+        """
+        Scan the new and modified inputs under the paths
+
+        :param paths: Paths to files, directories or tar archives
+        :param workers: Number of processes to use
+        :returns: The number of files scanned
+        """
+        files = find_inputs(paths, extensions)
+        known = {}
+        for path, mtime in self.conn.execute("SELECT path, MAX(mtime) FROM inputs GROUP BY path"):
+            known[path] = mtime
+
+        changed = []
+        for path in files:
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                mtime = None
+            if mtime is None or known.get(path) != mtime:
+                changed.append(path)
+        current = set(files)
+        removed = [
+            path
+            for path in known
+            if path not in current and not os.path.exists(path) and _under(path, paths)
+        ]
+
+        with self.conn:
+            for path in changed + removed:
+                self._delete(path)
+            for res in _scan_files(changed, self.keywords, workers, extensions):
+                self._insert(res)
+        return len(changed)
+
+    def _delete(self, path):
+        for table in ("inputs", "keywords", "blocks"):
+            self.conn.execute(f"DELETE FROM {table} WHERE path = ?", (path,))
+
+    def _insert(self, res):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO inputs VALUES (?, ?, ?, ?, ?)",
+            (res.path, res.member, res.mtime, res.size, res.error),
+        )
+        self.conn.executemany(
+            "INSERT INTO keywords VALUES (?, ?, ?, ?)",
+            [(res.path, res.member, key, value) for key, value in res.keywords.items()],
+        )
+        self.conn.executemany(
+            "INSERT INTO blocks VALUES (?, ?, ?, ?, ?)",
+            [
+                (res.path, res.member, name, nlines, unit)
+                for name, (nlines, unit) in res.blocks.items()
+            ],
+        )
+
+    def query(self, sql, params=()):
+        """Run a SQL query on the index and return all rows"""
+        return self.conn.execute(sql, params).fetchall()
+
+    def get(self, path, member=""):
+        """
+        Return the stored result of an input as a ScanResult, or None if not indexed
+        """
+        path = os.fspath(path)
+        row = self.conn.execute(
+            "SELECT mtime, size, error FROM inputs WHERE path = ? AND member = ?", (path, member)
+        ).fetchone()
+        if row is None:
+            return None
+        values = dict(
+            self.conn.execute(
+                "SELECT key, value FROM keywords WHERE path = ? AND member = ?", (path, member)
+            )
+        )
+        blocks = {
+            name: (nlines, unit)
+            for name, nlines, unit in self.conn.execute(
+                "SELECT name, nlines, unit FROM blocks WHERE path = ? AND member = ?",
+                (path, member),
+            )
+        }
+        return ScanResult(path, member, row[0], row[1], values, blocks, row[2])
+
+
+def _under(path, roots):
+    """Whether the path is one of the roots or inside them"""
+    if isinstance(roots, (str, os.PathLike)):
+        roots = [roots]
+    for root in map(os.fspath, roots):
+        if path == root or path.startswith(os.path.join(root, "")):
+            return True
+    return False
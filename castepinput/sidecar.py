@@ -0,0 +1,154 @@
+"""
+Binary sidecar files for loading inputs without parsing the text
+
+The file starts with the magic bytes, the version and the length of a JSON
+header, followed by the header and the raw data of the arrays of the
+``NumericBlock`` objects, each aligned to ``ALIGNMENT`` bytes. The header
+holds the keywords with their types, the units, the header lines, the lines
+of the other blocks and where to find each array. Arrays are memory mapped
+when the file is loaded.
+"""
+
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from .common import Block, NumericBlock
+
+MAGIC = b"CASTEPSC"
+VERSION = 1
+ALIGNMENT = 64
+# Magic, version and the length of the JSON header
+_PREAMBLE = struct.Struct("<8sIQ")
+
+
+def _aligned(size):
+    """Round up to a multiple of ALIGNMENT"""
+    return -(-size // ALIGNMENT) * ALIGNMENT
+
+
+def _encode_item(value, arrays):
+    """Return the entry of a keyword or block, appending any arrays to ``arrays``"""
+
+    def add_array(array):
+        if array is None:
+            return None
+        arrays.append(np.ascontiguousarray(array))
+        return len(arrays) - 1
+
+    if isinstance(value, NumericBlock) and value.is_numeric:
+        return {
+            "type": "numeric",
+            "values": add_array(value.values),
+            "labels": add_array(value.labels),
+            "tags": add_array(value.tags),
+            "fmt": value.fmt,
+            "sep": value.sep,
+        }
+    if isinstance(value, Block):
+        return {"type": "block", "lines": list(value)}
+    if isinstance(value, tuple):
+        value = list(value)
+    return {"type": "value", "value": value}
+
+
+def write_sidecar(obj, fname):
+    """
+    Write a CastepInput as a sidecar file
+
+    :param obj: A CastepInput
+    :param fname: Path of the file to write
+    """
+    arrays = []
+    items = [[key, _encode_item(value, arrays)] for key, value in obj.items()]
+
+    # Place the arrays after the header
+    descriptors = []
+    offset = 0
+    for array in arrays:
+        descriptors.append({"dtype": array.dtype.str, "shape": array.shape, "offset": offset})
+        offset = _aligned(offset + array.nbytes)
+
+    header = {
+        "header": list(obj.header),
+        "units": obj.units,
+        "items": items,
+        "arrays": descriptors,
+    }
+    try:
+        header = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    except TypeError as error:
+        raise TypeError(f"Cannot store the values in a sidecar file: {error}") from error
+    data_start = _aligned(_PREAMBLE.size + len(header))
+
+    # Write to a new file, as the arrays of the old file may still be mapped
+    tmpname = f"{fname}.{os.getpid()}.tmp"
+    try:
+        with open(tmpname, "wb") as fhandle:
+            fhandle.write(_PREAMBLE.pack(MAGIC, VERSION, len(header)))
+            fhandle.write(header)
+            fhandle.write(b"\0" * (data_start - _PREAMBLE.size - len(header)))
+            for array, desc in zip(arrays, descriptors):
+                fhandle.seek(data_start + desc["offset"])
+                fhandle.write(array.tobytes())
+        os.replace(tmpname, fname)
+    finally:
+        if os.path.exists(tmpname):
+            os.remove(tmpname)
+
+
+def read_sidecar(fname):
+    """
+    Read a sidecar file
+
+    :returns: A tuple of the header lines, the units and a list of the
+      (key, value) pairs. The arrays of the NumericBlocks are memory mapped
+      and read-only.
+    """
+    with open(fname, "rb") as fhandle:
+        try:
+            buffer = mmap.mmap(fhandle.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            buffer = b""
+    if len(buffer) < _PREAMBLE.size:
+        raise ValueError(f"{fname} is not a sidecar file")
+    magic, version, header_size = _PREAMBLE.unpack_from(buffer)
+    if magic != MAGIC:
+        raise ValueError(f"{fname} is not a sidecar file")
+    if version != VERSION:
+        raise ValueError(f"Unsupported version {version} of the sidecar file {fname}")
+    header_end = _PREAMBLE.size + header_size
+    header = json.loads(buffer[_PREAMBLE.size : header_end].decode("utf-8"))
+    data_start = _aligned(header_end)
+
+    def get_array(index):
+        if index is None:
+            return None
+        desc = header["arrays"][index]
+        dtype = np.dtype(desc["dtype"])
+        count = int(np.prod(desc["shape"]))
+        if count == 0:
+            return np.empty(desc["shape"], dtype)
+        array = np.frombuffer(buffer, dtype, count, data_start + desc["offset"])
+        return array.reshape(desc["shape"])
+
+    items = []
+    for key, entry in header["items"]:
+        if entry["type"] == "numeric":
+            value = NumericBlock._from_arrays(
+                get_array(entry["values"]),
+                get_array(entry["labels"]),
+                get_array(entry["tags"]),
+                entry["fmt"],
+                entry["sep"],
+            )
+        elif entry["type"] == "block":
+            value = Block(entry["lines"])
+        else:
+            value = entry["value"]
+        items.append((key, value))
+    return header["header"], header["units"], items
@@ -0,0 +1,141 @@
+"""
+Columnar representation of the tags trailing the lines of positions blocks
+"""
+
+import re
+
+import numpy as np
+
+spin_tag = re.compile(r"\bSPIN\s*[=:]\s*([-+0-9.eEdD]+)", re.IGNORECASE)
+label_tag = re.compile(r"\bLABEL\s*[=:]\s*([^\s]+)", re.IGNORECASE)
+mixture_tag = re.compile(r"\bMIXTURE\s*[=:]\s*\(\s*(\d+)\s+([-+0-9.eEdD]+)\s*\)", re.IGNORECASE)
+
+
+def _parse_number(text):
+    """Parse a number which may use the Fortran exponent"""
+    return float(text.replace("d", "e").replace("D", "e"))
+
+
+def parse_tag(tag):
+    """
+    Parse the tags of a single line
+
+    :returns: A tuple of the spin, label, mixture id and weight and any other
+      text left in the tag. Missing spin or weight are NaN, a missing mixture id is -1.
+    """
+    spin, label, mixture, weight = np.nan, "", -1, np.nan
+    spans = []
+    match = spin_tag.search(tag)
+    if match:
+        spin = _parse_number(match.group(1))
+        spans.append(match.span())
+    match = label_tag.search(tag)
+    if match:
+        label = match.group(1)
+        spans.append(match.span())
+    match = mixture_tag.search(tag)
+    if match:
+        mixture = int(match.group(1))
+        weight = _parse_number(match.group(2))
+        spans.append(match.span())
+
+    other = tag
+    for start, end in sorted(spans, reverse=True):
+        other = other[:start] + other[end:]
+    return spin, label, mixture, weight, " ".join(other.split())
+
+
+def _format_number(value):
+    """Format a float with the shortest representation"""
+    return np.format_float_positional(value, trim="-")
+
+
+def _format_column(values, fmt, missing):
+    """Format the values of a column, only formatting each distinct value once"""
+    uniq, inverse = np.unique(values, return_inverse=True)
+    formatted = np.array(["" if missing(val) else fmt(val) for val in uniq.tolist()], dtype=str)
+    return formatted[inverse.reshape(-1)]
+
+
+class PositionTags:
+    """
+    Tags of the atoms in a positions block stored as arrays, one entry per atom
+
+    * ``spin`` the initial spins, NaN if not given
+    * ``label`` the labels, empty if not given
+    * ``mixture`` the mixture ids, -1 if not given
+    * ``weight`` the weights in the mixtures, NaN if not given
+    * ``other`` any other text in the tags
+    """
+
+    __slots__ = ("spin", "label", "mixture", "weight", "other")
+
+    def __init__(self, spin, label=None, mixture=None, weight=None, other=None):
+        """
+        Instantiate from the columns, the missing ones are filled as not given
+
+        :param spin: A sequence of the spins
+        """
+        self.spin = np.array(spin, dtype=np.float64)
+        natoms = len(self.spin)
+        self.label = np.full(natoms, "") if label is None else np.array(label, dtype=str)
+        self.mixture = np.full(natoms, -1) if mixture is None else np.array(mixture, dtype=np.int64)
+        self.weight = (
+            np.full(natoms, np.nan) if weight is None else np.array(weight, dtype=np.float64)
+        )
+        self.other = np.full(natoms, "") if other is None else np.array(other, dtype=str)
+        for name in self.__slots__[1:]:
+            if getattr(self, name).shape != (natoms,):
+                raise ValueError(f"Column {name} must have one entry per atom")
+
+    @classmethod
+    def from_strings(cls, tags):
+        """
+        Parse the tags of many lines, each distinct tag is only parsed once
+
+        :param tags: A sequence of the trailing tags of each line
+        """
+        tags = np.asarray(tags, dtype=str)
+        uniq, inverse = np.unique(tags, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        parsed = [parse_tag(tag) for tag in uniq.tolist()]
+        columns = [np.array(col) for col in zip(*parsed)] if parsed else [[]] * 5
+        return cls(*[np.asarray(col)[inverse] for col in columns])
+
+    def to_strings(self):
+        """
+        Rebuild the tags of each line from the columns
+
+        The tags are written in the order of spin, label, mixture and then
+        any other text.
+
+        :returns: An array of strings
+        """
+        if not len(self):
+            return np.array([], dtype=str)
+        weight = _format_column(self.weight, _format_number, lambda val: False)
+        mixture = np.char.add(np.char.add("MIXTURE=(", self.mixture.astype(str)), " ")
+        mixture = np.char.add(np.char.add(mixture, weight), ")")
+        parts = [
+            _format_column(self.spin, lambda val: "SPIN=" + _format_number(val), np.isnan),
+            _format_column(self.label, lambda val: "LABEL=" + val, lambda val: not val),
+            np.where(self.mixture < 0, "", mixture),
+            self.other,
+        ]
+
+        out = parts[0]
+        for part in parts[1:]:
+            sep = np.where((out != "") & (part != ""), " ", "")
+            out = np.char.add(np.char.add(out, sep), part)
+        return out
+
+    def __len__(self):
+        return len(self.spin)
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            return tuple(getattr(self, name)[index] for name in self.__slots__)
+        return type(self)(*[getattr(self, name)[index] for name in self.__slots__])
+
+    def __repr__(self):
+        return f"PositionTags(natoms={len(self)})"
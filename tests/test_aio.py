@@ -0,0 +1,78 @@
+"""
+Tests for loading and saving from asyncio code
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from castepinput import CellInput, ParamInput, aload_many
+from castepinput.aio import gather_bounded
+
+current_path = os.path.split(__file__)[0]
+
+
+def test_afrom_file_asave(tmpdir):
+    """Loading and saving give the same results as the blocking methods"""
+    fname = os.path.join(current_path, "data/cell_example_1.cell")
+    outname = str(tmpdir.join("out.cell"))
+
+    async def run():
+        cell = await CellInput.afrom_file(fname)
+        await cell.asave(outname)
+        return cell
+
+    cell = asyncio.run(run())
+    assert type(cell) is CellInput
+    assert dict(cell) == dict(CellInput.from_file(fname))
+    assert dict(CellInput.from_file(outname)) == dict(cell)
+
+    with ThreadPoolExecutor(1) as executor:
+        lazy = asyncio.run(CellInput.afrom_file(fname, lazy=True, executor=executor))
+    assert lazy.get_string() == cell.get_string()
+    regex = asyncio.run(CellInput.afrom_file(fname, engine="regex"))
+    assert dict(regex) == dict(cell)
+    with pytest.raises(ValueError):
+        asyncio.run(CellInput.afrom_file(fname, engine="fast"))
+
+    with pytest.raises(FileNotFoundError):
+        asyncio.run(ParamInput.afrom_file(str(tmpdir.join("missing.param"))))
+
+
+def test_gather_bounded():
+    """No more than the limit of awaitables run at once"""
+    running = []
+    peak = []
+
+    async def job(idx):
+        running.append(idx)
+        peak.append(len(running))
+        await asyncio.sleep(0.001)
+        running.remove(idx)
+        if idx == 5:
+            raise ValueError(idx)
+        return idx
+
+    results = asyncio.run(gather_bounded([job(i) for i in range(20)], 3, return_exceptions=True))
+    assert max(peak) == 3
+    assert results[:5] == [0, 1, 2, 3, 4]
+    assert isinstance(results[5], ValueError)
+
+
+def test_aload_many(tmpdir):
+    """Errors are reported per file and results are in order"""
+    paths = [os.path.join(current_path, f"data/cell_example_{i}.cell") for i in (1, 2, 3)]
+    paths.insert(1, str(tmpdir.join("missing.cell")))
+    results = asyncio.run(aload_many(paths, limit=2))
+    assert [res.path for res in results] == paths
+    assert results[1].data is None
+    assert isinstance(results[1].error, FileNotFoundError)
+    for res in results[:1] + results[2:]:
+        assert res.error is None
+        assert dict(res.data) == dict(CellInput.from_file(res.path))
+
+    results = asyncio.run(aload_many(paths[:1], engine="regex"))
+    assert dict(results[0].data) == dict(CellInput.from_file(paths[0]))
+    results = asyncio.run(aload_many(paths[:1], engine="fast"))
+    assert isinstance(results[0].error, ValueError)
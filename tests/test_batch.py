@@ -0,0 +1,85 @@
+"""
+Tests for loading and writing many files
+"""
+
+import copy
+import os
+
+import numpy as np
+import pytest
+
+from castepinput import CellInput, ParamInput, load_many, write_cells
+from castepinput.inputs import CastepInput
+
+current_path = os.path.split(__file__)[0]
+
+
+@pytest.fixture
+def seed_files(tmpdir):
+    """A few input files, one of them is malformed"""
+    paths = [os.path.join(current_path, f"data/cell_example_{i}.cell") for i in (1, 2, 3)]
+    bad = str(tmpdir.join("bad.cell"))
+    with open(bad, "w", encoding="utf-8") as fhandle:
+        fhandle.write("%BLOCK lattice_cart\n1 0 0\n")
+    param = str(tmpdir.join("test.param"))
+    with open(param, "w", encoding="utf-8") as fhandle:
+        fhandle.write("task : singlepoint\ncut_off_energy : 300\n")
+    return paths[:2] + [bad, param] + paths[2:]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_load_many(seed_files, workers):
+    """Results are the same as loading single files and in the input order"""
+    results = list(load_many(seed_files, workers=workers, chunksize=1))
+    assert [res.path for res in results] == seed_files
+
+    for res in results:
+        if res.path.endswith("bad.cell"):
+            assert res.data is None
+            assert res.error is not None
+            continue
+        assert res.error is None
+        expected_cls = ParamInput if res.path.endswith(".param") else CellInput
+        assert type(res.data) is expected_cls
+        assert dict(res.data) == dict(CastepInput.from_file(res.path))
+
+    results = list(load_many(seed_files[:1], workers=workers, plain=True, cls=CellInput))
+    assert results[0].data["kpoints_mp_grid"] == "1 1 1"
+
+    # The engine is passed to the parser
+    results = list(load_many(seed_files[:2], workers=workers, engine="regex"))
+    assert [dict(res.data) for res in results] == [
+        dict(CastepInput.from_file(path)) for path in seed_files[:2]
+    ]
+    results = list(load_many(seed_files[:1], workers=workers, engine="fast"))
+    assert "Unknown engine" in str(results[0].error)
+
+
+@pytest.mark.parametrize("unit", [None, "bohr"])
+@pytest.mark.parametrize("with_cells", [False, True])
+def test_write_cells(tmpdir, with_cells, unit):
+    """Files written are the same as setting the positions and saving"""
+    template = CellInput.from_file(os.path.join(current_path, "data/cell_example_1.cell"))
+    template.header = ["A template"]
+    if unit is not None:
+        template.units["lattice_cart"] = unit
+        template.units["positions_abs"] = unit
+    elems, pos, tags = template.get_positions()
+    rng = np.random.default_rng(0)
+    positions = pos + rng.random((3,) + pos.shape)
+    cells = template.get_cell() + rng.random((3, 3, 3)) if with_cells else None
+
+    pattern = str(tmpdir.join("frame-{}.cell"))
+    fnames = write_cells(template, positions, cells, fnames=pattern, workers=2)
+    assert fnames == [pattern.format(i) for i in range(3)]
+
+    for idx, fname in enumerate(fnames):
+        expected = copy.deepcopy(template)
+        expected.set_positions(elems, positions[idx], tags)
+        if with_cells:
+            expected.set_cell(cells[idx])
+        with open(fname, encoding="utf-8") as fhandle:
+            assert fhandle.read() == expected.get_string()
+
+    with pytest.raises(ValueError):
+        write_cells(template, positions[:, :1], fnames=pattern)
@@ -0,0 +1,92 @@
+"""
+Tests for the cache of parsed files
+"""
+
+import os
+import shutil
+
+import pytest
+
+from castepinput import CellInput
+from castepinput.cache import ParseCache
+
+current_path = os.path.split(__file__)[0]
+
+
+@pytest.fixture
+def cell_file(tmpdir):
+    """A copy of an example cell file"""
+    fname = str(tmpdir.join("test.cell"))
+    shutil.copy(os.path.join(current_path, "data/cell_example_1.cell"), fname)
+    return fname
+
+
+@pytest.mark.parametrize("use_hash", [False, True])
+def test_cache(cell_file, use_hash):
+    """Cached results are copies and the same as parsing"""
+    cache = ParseCache(use_hash=use_hash)
+    cin = CellInput.from_file(cell_file, cache=cache)
+    assert cache.misses == 1
+    assert dict(cin) == dict(CellInput.from_file(cell_file))
+
+    # Modifying the loaded input does not change the cache
+    cin["lattice_cart"][0] = "1 0 0"
+    cin["kpoints_mp_grid"].append(1)
+    cin2 = CellInput.from_file(cell_file, cache=cache)
+    assert cache.hits == 1
+    assert cin2["lattice_cart"][0] == "4 0 0"
+    assert cin2["kpoints_mp_grid"] == [1, 1, 1]
+
+    # Plain mode is a different entry
+    cin3 = CellInput.from_file(cell_file, plain=True, cache=cache)
+    assert cin3["kpoints_mp_grid"] == "1 1 1"
+    assert cache.misses == 2
+
+    # Changed files are parsed again
+    with open(cell_file, "a", encoding="utf-8") as fhandle:
+        fhandle.write("task : singlepoint\n")
+    assert CellInput.from_file(cell_file, cache=cache)["task"] == "singlepoint"
+    assert cache.misses == 3
+
+    with pytest.raises(ValueError):
+        CellInput.from_file(cell_file, cache=cache, lazy=True)
+
+    # The engine is used for parsing the files missing from the cache
+    cache = ParseCache(use_hash=use_hash)
+    with pytest.raises(ValueError):
+        CellInput.from_file(cell_file, cache=cache, engine="fast")
+    assert dict(cache.get_dict(cell_file, engine="regex")) == dict(CellInput.from_file(cell_file))
+
+
+def test_cache_eviction(tmpdir, cell_file):
+    """Least recently used entries are evicted"""
+    cache = ParseCache(max_entries=2)
+    for plain in (True, False, True):
+        CellInput.from_file(cell_file, plain=plain, cache=cache)
+    fname = str(tmpdir.join("test2.cell"))
+    shutil.copy(cell_file, fname)
+    CellInput.from_file(fname, cache=cache)
+    assert len(cache) == 2
+    assert cache.stats["hits"] == 1
+
+    # The plain entry was used most recently and kept
+    CellInput.from_file(cell_file, plain=True, cache=cache)
+    assert cache.hits == 2
+
+    cache = ParseCache(max_bytes=os.path.getsize(cell_file))
+    CellInput.from_file(cell_file, cache=cache)
+    CellInput.from_file(fname, cache=cache)
+    assert len(cache) == 1
+    assert cache.nbytes == os.path.getsize(cell_file)
+
+
+def test_cache_disk(tmpdir, cell_file):
+    """Entries are stored on the disk"""
+    directory = str(tmpdir.join("cache"))
+    cache = ParseCache(directory=directory)
+    cin = CellInput.from_file(cell_file, cache=cache)
+
+    cache = ParseCache(directory=directory)
+    assert dict(CellInput.from_file(cell_file, cache=cache)) == dict(cin)
+    assert cache.disk_hits == 1
+    assert cache.misses == 0
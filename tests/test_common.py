@@ -1,8 +1,11 @@
 """
 Tests for the common module
 """
+import copy
+import pickle
 
 import numpy as np
+import pytest
 from castepinput import common
 
 
@@ -17,6 +20,12 @@ def test_block():
     b.compact(inplace=True)
     assert b == expect
 
+    # In-place modifications are tracked
+    version = b.version
+    b.append("3 3 3")
+    b[0] = "0 0 0"
+    assert b.version == version + 2
+
 
 def test_abc_to_cell():
     """Test setting cell through cell parameters"""
@@ -41,3 +50,168 @@ def test_abc_to_cell():
     assert get_ang(va, vb) == np.pi / 3
     assert get_ang(vc, vb) == np.pi / 3
     assert get_ang(va, vc) == np.pi / 3
+
+
+def test_abcs_to_cells():
+    """Converting many cells at once"""
+    rng = np.random.default_rng(0)
+    abcs = np.column_stack([rng.random((50, 3)) + 1, rng.uniform(60, 120, (50, 3))])
+    abcs[::5, 3:] = 90.0
+    cells = common.cell_abcs_to_vecs(abcs)
+    assert cells.shape == (50, 3, 3)
+    for abc, cell in zip(abcs, cells):
+        assert np.all(common.cell_abcs_to_vec(abc) == cell)
+    # Orthorhombic cells are diagonal
+    assert np.all(cells[::5] == [np.diag(abc[:3]) for abc in abcs[::5]])
+
+    assert np.allclose(common.cell_vecs_to_abcs(cells), abcs)
+    assert np.allclose(common.cell_vecs_to_abcs(cells[0]), abcs[0])
+
+    with pytest.raises(ValueError):
+        common.cell_abcs_to_vecs(abcs[:, :5])
+
+
+def test_numeric_block():
+    """Test the array backed block"""
+    values = [[0.0, 0.5, 1.0], [1.0, 2.0, 3.0]]
+    block = common.NumericBlock(values, labels=["O", "Fe"], tags=["", "SPIN=1"])
+    lines = [
+        "O  0.0000000000 0.5000000000 1.0000000000 ",
+        "Fe  1.0000000000 2.0000000000 3.0000000000 SPIN=1",
+    ]
+    assert len(block) == 2
+    assert list(block) == lines
+    assert block == lines
+    assert block == common.Block(lines)
+    assert block[1] == lines[1]
+    assert "\n".join(block) == "\n".join(lines)
+    assert [] + block == lines
+    assert ["C 0 0 0"] + block == ["C 0 0 0"] + lines
+    assert sum([block, block], []) == lines * 2
+
+    # Values are read-only and replaced through the property
+    with pytest.raises(ValueError):
+        block.values[0, 0] = 1.0
+    block.values = np.zeros((2, 3))
+    assert block[0] == "O  0.0000000000 0.0000000000 0.0000000000 "
+    with pytest.raises(ValueError):
+        block.values = np.zeros((3, 3))
+
+    # Copies keep the arrays
+    for other in (copy.deepcopy(block), pickle.loads(pickle.dumps(block))):
+        assert other.is_numeric
+        assert other == block
+
+    # Modifying as a list turns it into a plain list of strings
+    block.append("C 0 0 0")
+    assert not block.is_numeric
+    assert len(block) == 3
+    assert block[2] == "C 0 0 0"
+    with pytest.raises(RuntimeError):
+        _ = block.values
+    assert pickle.loads(pickle.dumps(block)) == block
+
+
+@pytest.mark.parametrize("precision", [1, 5, 8, 10])
+def test_format_fixed(precision):
+    """Formatting in bulk gives the same strings as python"""
+    rng = np.random.default_rng(0)
+    values = np.concatenate(
+        [
+            rng.random(1000) * 200 - 100,
+            rng.integers(-1000, 1000, 100) / 8,
+            [0.0, -0.0, 1e-12, -1e-12, 0.25, 99999.99999999999, 1e5, 1e20, np.nan, -np.inf],
+        ]
+    )
+    chars, done = common.format_fixed(values, precision)
+    assert done.sum() > 1000
+    for row, value in zip(chars[done], values[done]):
+        assert row[row != 0].tobytes().decode() == f"{value:.{precision}f}"
+
+
+def test_numeric_block_render():
+    """Bulk rendering falls back to python for unsupported values"""
+    values = [[1.0, np.nan], [0.125, -1e6], [1 / 3, 2.5]]
+    for labels, tags, fmt in [
+        (["Fe", "O", "Ce"], ["", "SPIN=1", "LABEL=x y"], "{:.10f}"),
+        (None, None, "{:.4f}"),
+        (["Fé", "O", "Ce"], None, "{:.10f}"),
+        (["Fe", "O", "Ce"], None, "{:.3e}"),
+    ]:
+        block = common.NumericBlock(values, labels=labels, tags=tags, fmt=fmt)
+        assert block.render() == block._render_rows(slice(None))
+        assert block.render(1, 3) == block._render_rows(slice(1, 3))
+        assert block.render_text() == "\n".join(block._render_rows(slice(None)))
+        assert "\n".join(block.iter_text(chunk_size=2)) == block.render_text()
+
+
+def test_numeric_block_indexing(monkeypatch):
+    """Indexing only renders the rows requested"""
+    block = common.NumericBlock(np.arange(30.0).reshape(10, 3), labels=["O"] * 10, fmt="{:.1f}")
+    lines = block.render()
+    rendered = []
+    render = common.NumericBlock.render
+
+    def counted_render(self, start=0, stop=None):
+        result = render(self, start, stop)
+        rendered.append(len(result))
+        return result
+
+    monkeypatch.setattr(common.NumericBlock, "render", counted_render)
+    for index in (0, 3, 9, -1, -10):
+        assert block[index] == lines[index]
+    assert rendered == [1] * 5
+    for index in (10, -11):
+        with pytest.raises(IndexError):
+            _ = block[index]
+    with pytest.raises(TypeError):
+        _ = block["a"]
+
+    rendered.clear()
+    slices = [(2, 5, 1), (-3, None, 1), (1, 8, 3), (None, None, -2), (8, 2, -3), (5, 2, 1)]
+    for index in [slice(*args) for args in slices] + [slice(20, 30)]:
+        assert block[index] == lines[index]
+    assert rendered == [3, 3, 7, 9, 4]
+
+    assert lines[4] in block
+    assert "C 0 0 0" not in block
+    assert block.count(lines[4]) == 1
+    assert block.index(lines[4]) == 4
+    assert block.index(lines[4], 2, 6) == 4
+    with pytest.raises(ValueError):
+        block.index(lines[4], 5)
+    with pytest.raises(ValueError):
+        block.index("C 0 0 0")
+
+
+def test_supercell_translations():
+    trans = common.supercell_translations(np.diag([2, 1, 3]))
+    assert len(trans) == 6
+    assert trans.min() == 0
+    assert trans.max(axis=0).tolist() == [1, 0, 2]
+
+    matrix = np.array([[-1, 2, 3], [4, -5, 6], [7, 8, -9]])
+    trans = common.supercell_translations(matrix)
+    assert len(trans) == abs(round(np.linalg.det(matrix)))
+    frac = trans @ np.linalg.inv(matrix)
+    assert np.all((frac > -1e-8) & (frac < 1))
+
+    with pytest.raises(ValueError):
+        common.supercell_translations(np.diag([1, 0, 1]))
+
+
+@pytest.mark.parametrize(
+    "line, expected",
+    [
+        ("ang", True),
+        (" bohr/ps ", True),
+        ("1e-3", False),
+        ("nan", False),
+        ("1.0d0", False),
+        ("1", False),
+        ("ang 1", False),
+        ("", False),
+    ],
+)
+def test_is_unit_line(line, expected):
+    assert common.is_unit_line(line) is expected
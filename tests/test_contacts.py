@@ -0,0 +1,58 @@
+"""
+Tests for finding close contacts
+"""
+import itertools
+
+import numpy as np
+import pytest
+
+from castepinput import CellInput
+from castepinput.contacts import close_contacts, close_contacts_many
+
+
+def brute_force(cell, scaled, cutoff, nimages=3):
+    """Minimum image distances of all pairs closer than the cutoff"""
+    pos = scaled @ cell
+    found = {}
+    for image in itertools.product(range(-nimages, nimages + 1), repeat=3):
+        dists = np.linalg.norm(pos[None, :, :] + np.dot(image, cell) - pos[:, None, :], axis=2)
+        for i, j in zip(*np.nonzero(dists < cutoff)):
+            if i == j and not any(image):
+                continue
+            key = (min(i, j), max(i, j))
+            found[key] = min(found.get(key, np.inf), dists[i, j])
+    return found
+
+
+@pytest.mark.parametrize("seed", range(8))
+@pytest.mark.parametrize("cutoff", [0.8, 2.5])
+def test_close_contacts(seed, cutoff):
+    """Same pairs as comparing all images, including cells shorter than the cutoff"""
+    rng = np.random.default_rng(seed)
+    cell = np.diag(rng.uniform(2, 8, 3))
+    cell[1, 0] = rng.uniform(-2, 2)
+    cell[2, :2] = rng.uniform(-1.5, 1.5, 2)
+    scaled = rng.uniform(-0.5, 1.5, (40, 3))
+
+    i, j, dist = close_contacts(cell, scaled, cutoff)
+    expected = brute_force(cell, scaled, cutoff)
+    assert list(zip(i.tolist(), j.tolist())) == sorted(expected)
+    assert np.allclose(dist, [expected[key] for key in sorted(expected)])
+
+
+def test_close_contacts_cell():
+    """Checking a CellInput and many structures"""
+    cell = CellInput()
+    cell.set_cell([10, 10, 10])
+    cell.set_positions(["O", "H", "H", "O"], [[0, 0, 0], [0.9, 0, 0], [9.5, 0, 0], [5, 5, 5]])
+    i, j, dist = cell.get_close_contacts(1.0)
+    assert i.tolist() == [0, 0]
+    assert j.tolist() == [1, 2]
+    assert np.allclose(dist, [0.9, 0.5])
+
+    empty = (np.eye(3) * 10, np.zeros((0, 3)))
+    results = close_contacts_many([cell, empty, (np.eye(3) * 10, [[0, 0, 0]])], 1.0, workers=2)
+    assert [len(res[0]) for res in results] == [2, 0, 0]
+
+    with pytest.raises(ValueError):
+        cell.get_close_contacts(0)
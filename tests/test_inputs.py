@@ -1,12 +1,16 @@
 """
 Test module for the inputs
 """
+import io
 import os
+import shutil
+import tracemalloc
 import pytest
 import numpy as np
 
 from castepinput.inputs import CastepInput, CellInput
-from castepinput.inputs import Block, parse_pos_line, construct_pos_line
+from castepinput.inputs import Block, NumericBlock, parse_pos_line, parse_pos_block
+from castepinput.inputs import construct_pos_line, parse_block_array
 
 current_path = os.path.split(__file__)[0]
 
@@ -129,6 +133,28 @@ def test_pos_lines():
         assert a[0] == a[1]
 
 
+def test_pos_block():
+    """
+    Test parsing the positions block in one go
+    """
+    lines = [
+        "Ce 1.23 2.34 2.6 SPIN=1 LABEL=Ce1 MIX=(1 1)",
+        "  o 0 0 0",
+        "O\t1e-3 -2.5 3   SPIN=-1",
+        "Fe 0 1 2 SPIN=1 \t ",
+        "Fe 0 1 2 LABEL=a  MIX=(1 1)  ",
+    ]
+    elems, pos, tags = parse_pos_block(lines)
+    expected = [parse_pos_line(line) for line in lines]
+    assert elems == [e[0] for e in expected]
+    assert pos.shape == (5, 3)
+    assert pos.tolist() == [e[1] for e in expected]
+    assert tags == [e[2] for e in expected]
+
+    with pytest.raises(ValueError):
+        parse_pos_block(["O 0 0 0", "O 0 0"])
+
+
 def test_input_pos_lines(cell_input):
     """
     Rest construction and presing of positions lines
@@ -175,6 +201,183 @@ def test_set_cell(cell_input):
         cell_input.set_cell([1, 2, 3, 4])
 
 
+def test_set_cell_abc(cell_input):
+    """Cells written as lattice_abc"""
+    cell_input.set_cell([3, 4, 5], abc=True)
+    assert "lattice_cart" not in cell_input
+    assert cell_input["lattice_abc"] == [
+        "3.0000000000  4.0000000000  5.0000000000",
+        "90.0000000000  90.0000000000  90.0000000000",
+    ]
+    assert np.all(cell_input.get_cell() == np.diag([3, 4, 5]))
+
+    cell_input.set_cell([3, 3, 3, 90, 90, 120], abc=True)
+    cell = cell_input.get_cell()
+    assert np.allclose(cell_input.get_cell_abc(), [3, 3, 3, 90, 90, 120])
+    assert np.allclose(cell[1], [-1.5, 3 * np.sqrt(3) / 2, 0])
+
+    # Read from the lines of the block
+    cell_input["lattice_abc"] = Block(cell_input["lattice_abc"])
+    assert np.all(cell_input.get_cell() == cell)
+
+    # Setting vectors replaces lattice_abc
+    cell_input.set_cell(cell)
+    assert "lattice_abc" not in cell_input
+    assert np.allclose(cell_input.get_cell_abc(), [3, 3, 3, 90, 90, 120])
+
+
+def test_block_array(cell_input):
+    """Blocks read and written as arrays"""
+    cell_input["kpoints_list"] = Block(["0 0 0 0.25", "0.5 0.5 0.5 0.75"])
+    kpts = cell_input.get_block_array("kpoints_list")
+    assert kpts.shape == (2, 4)
+    assert np.all(kpts[:, 3] == [0.25, 0.75])
+    assert np.all(cell_input.get_block_array("kpoints_list", columns=3) == kpts[:, :3])
+    assert np.all(cell_input.get_block_array("kpoints_list", columns=[3, 0]) == kpts[:, [3, 0]])
+
+    cell_input["species_mass"] = Block(["Fe 55.8 # Comment", "O 16.0"])
+    names, mass = cell_input.get_block_array("species_mass", columns=1, labels=True)
+    assert names.tolist() == ["Fe", "O"]
+    assert np.all(mass == [[55.8], [16.0]])
+
+    cell_input["ionic_velocities"] = Block(["ang/ps", "1 2 3", "4 5 6"])
+    vel, unit = cell_input.get_block_array("ionic_velocities", with_unit=True)
+    assert unit == "ang/ps"
+    assert np.all(vel == [[1, 2, 3], [4, 5, 6]])
+
+    cell_input["cell_constraints"] = Block(["1 2 3", "0 0 0"])
+    cons = cell_input.get_block_array("cell_constraints", dtype=int)
+    assert cons.dtype.kind == "i"
+
+    # Written back in bulk
+    cell_input.set_block_array("cell_constraints", cons)
+    assert cell_input["cell_constraints"] == ["1 2 3", "0 0 0"]
+    cell_input.set_block_array("ionic_velocities", vel * 2, unit="ang/ps")
+    assert cell_input.get_block_array("ionic_velocities", with_unit=True)[1] == "ang/ps"
+    assert "ang/ps" in cell_input.get_string()
+    cell_input.set_block_array("species_mass", mass, labels=names)
+    assert cell_input["species_mass"][0] == "Fe  55.8000000000"
+    names, mass2 = cell_input.get_block_array("species_mass", labels=True)
+    assert names.tolist() == ["Fe", "O"]
+    assert np.all(mass2 == mass)
+
+    # Unit lines are skipped when reading the cell
+    cell_input["lattice_cart"] = Block(["ang", "2 0 0", "0 2 0", "0 0 2"])
+    assert np.all(cell_input.get_cell() == np.eye(3) * 2)
+
+    # The unit in the block is kept when the block is replaced
+    cell_input["ionic_velocities"] = Block(["bohr/ps", "1 2 3"])
+    vel = cell_input.get_block_array("ionic_velocities")
+    cell_input.set_block_array("ionic_velocities", vel * 2)
+    assert cell_input.get_block_array("ionic_velocities", with_unit=True)[1] == "bohr/ps"
+    assert "%BLOCK ionic_velocities\nbohr/ps\n2.0" in cell_input.get_string()
+
+    cell_input["kpoints_list"] = Block(["0 0 0 0.25", "0.5 0.5"])
+    with pytest.raises(ValueError, match="kpoints_list"):
+        cell_input.get_block_array("kpoints_list")
+    with pytest.raises(ValueError):
+        cell_input.get_block_array("cell_constraints", labels=True)
+
+
+def test_cell_units(cell_input):
+    """Lattice blocks in other units are converted to angstrom"""
+    bohr = 0.529177210903
+    cell_input["lattice_cart"] = Block(["bohr", "10 0 0", "0 10 0", "0 0 10"])
+    assert np.allclose(cell_input.get_cell(), np.eye(3) * 10 * bohr)
+    assert np.allclose(cell_input.get_cell_abc()[:3], 10 * bohr)
+
+    cell_input["lattice_cart"] = Block(["10 0 0", "0 10 0", "0 0 10"])
+    cell_input.units["lattice_cart"] = "nm"
+    assert np.allclose(cell_input.get_cell(), np.eye(3) * 100)
+    # Set in angstrom
+    cell_input.set_cell(cell_input.get_cell())
+    assert "lattice_cart" not in cell_input.units
+    assert np.allclose(cell_input.get_cell(), np.eye(3) * 100)
+
+    cell_input["lattice_cart"] = Block(["furlong", "10 0 0", "0 10 0", "0 0 10"])
+    with pytest.raises(ValueError):
+        cell_input.get_cell()
+
+    del cell_input["lattice_cart"]
+    cell_input["lattice_abc"] = Block(["Bohr", "2 2 2", "90 90 90"])
+    assert np.allclose(cell_input.get_cell_abc(), [2 * bohr] * 3 + [90] * 3)
+
+
+def test_parse_block_array():
+    values, names = parse_block_array([])
+    assert values.shape == (0, 0)
+    assert names is None
+    values, names = parse_block_array(["a 1 2 x", "b 3 4"], dtype=int, columns=2, labels=True)
+    assert values.tolist() == [[1, 2], [3, 4]]
+    assert names.tolist() == ["a", "b"]
+    with pytest.raises(ValueError):
+        parse_block_array(["a 1", "b"], columns=1, labels=True)
+
+
+@pytest.mark.parametrize("matrix", [[2, 1, 3], [[1, 1, 0], [-1, 1, 0], [0, 0, 2]]])
+@pytest.mark.parametrize("frac", [True, False])
+def test_make_supercell(cell_input, matrix, frac, tmpdir):
+    """Supercells with diagonal and general matrices"""
+    cell_input.set_cell([[3, 0, 0], [0.5, 3, 0], [0, 0.3, 4]])
+    scaled = [[0.1, 0.2, 0.3], [0.6, 0.7, 1.2]]
+    cell_input.set_scaled_positions(["Fe", "O"], scaled, tags=["SPIN=1", ""], frac=frac)
+    supercell = cell_input.make_supercell(matrix)
+
+    full = np.diag(matrix) if np.ndim(matrix) == 1 else np.array(matrix)
+    ncells = abs(round(np.linalg.det(full)))
+    cell = cell_input.get_cell()
+    assert np.allclose(supercell.get_cell(), full @ cell)
+    elems, new_scaled, tags = supercell.get_scaled_positions()
+    assert elems == ["Fe", "O"] * ncells
+    assert tags == ["SPIN=1", ""] * ncells
+    assert np.all((new_scaled >= 0) & (new_scaled < 1))
+    assert ("positions_frac" in supercell) == frac
+    assert supercell["symmetry_generate"] is True
+
+    # Each ion is a lattice translation of the ion in the cell, with no duplicates
+    shifts = supercell.get_scaled_positions()[1] @ supercell.get_cell() @ np.linalg.inv(cell)
+    shifts = shifts - np.tile(scaled, (ncells, 1))
+    assert np.allclose(shifts, np.rint(shifts))
+    assert len({tuple(row) for row in np.rint(shifts).astype(int)[::2]}) == ncells
+
+    # Streamed to a file a few ions at a time
+    fname = str(tmpdir.join("supercell.cell"))
+    assert cell_input.make_supercell(matrix, fname=fname, chunk_size=3) is None
+    with open(fname, encoding="utf-8") as fhandle:
+        assert fhandle.read() == supercell.get_string()
+
+    with pytest.raises(ValueError):
+        cell_input.make_supercell([[1, 0, 0], [1, 0, 0], [0, 0, 1]])
+    with pytest.raises(ValueError):
+        cell_input.make_supercell([1.5, 1, 1])
+
+
+def test_make_supercell_units():
+    """Supercells of cells given in bohr are written in angstrom"""
+    bohr = 0.529177210903
+    cell_input = CellInput()
+    cell_input["lattice_cart"] = Block(["bohr", "10 0 0", "0 10 0", "0 0 10"])
+    cell_input["positions_abs"] = Block(["bohr", "O 1 2 3", "H 5 5 5"])
+    supercell = cell_input.make_supercell([2, 1, 1])
+    assert "lattice_cart" not in supercell.units
+    assert "positions_abs" not in supercell.units
+    assert np.allclose(supercell.get_cell(), np.diag([20, 10, 10]) * bohr)
+    assert np.allclose(supercell["lattice_cart"].values, np.diag([20, 10, 10]) * bohr)
+    pos = supercell.get_positions()[1]
+    assert np.allclose(pos[:2], np.array([[1, 2, 3], [5, 5, 5]]) * bohr)
+    assert np.allclose(pos[2:], np.array([[11, 2, 3], [15, 5, 5]]) * bohr)
+
+    cell_input = CellInput()
+    cell_input.units["lattice_cart"] = "bohr"
+    cell_input.units["positions_abs"] = "bohr"
+    cell_input.set_block_array("lattice_cart", np.eye(3) * 10)
+    cell_input.set_block_array("positions_abs", [[1, 2, 3]], labels=["O"])
+    supercell = cell_input.make_supercell([2, 1, 1])
+    assert np.allclose(supercell.get_cell(), np.diag([20, 10, 10]) * bohr)
+    assert np.allclose(supercell.get_positions()[1][1], [11 * bohr, 2 * bohr, 3 * bohr])
+    assert "bohr" not in supercell.get_string().lower()
+
+
 def test_set_pos(cell_input):
     """
     Test set_positions method
@@ -186,6 +389,62 @@ def test_set_pos(cell_input):
     assert np.all(r[1] == p)
     visual_inspect(cell_input)
 
+    # Positions need the elements
+    cell_input.set_block_array("positions_abs", p)
+    with pytest.raises(ValueError, match="no element labels"):
+        cell_input.get_positions()
+
+    # Positions are set in angstrom whatever the unit of the block was
+    cell_input.units["positions_abs"] = "bohr"
+    cell_input.set_positions(["H"], [[1, 0, 0]])
+    assert "positions_abs" not in cell_input.units
+    assert np.allclose(cell_input.get_positions()[1], [[1, 0, 0]])
+    cell_input["lattice_cart"] = Block(["bohr", "10 0 0", "0 10 0", "0 0 10"])
+    cell_input.units["positions_abs"] = "bohr"
+    cell_input.set_scaled_positions(["H"], [[0.5, 0, 0]], frac=False)
+    assert np.allclose(cell_input.get_positions()[1], [[5 * 0.529177210903, 0, 0]])
+    assert np.allclose(cell_input.get_scaled_positions()[1], [[0.5, 0, 0]])
+
+
+def test_scaled_positions(cell_input, monkeypatch):
+    """Conversions between absolute and fractional positions"""
+    cell_input["lattice_cart"] = Block(["2 0 0", "0 4 0", "0 0 5"])
+    frac = [[0.5, 0.5, 0.5], [0.25, 0.0, 0.1]]
+    cell_input.set_scaled_positions(["O", "Fe"], frac)
+    assert "positions_frac" in cell_input
+    assert np.allclose(cell_input.get_positions()[1], [[1, 2, 2.5], [0.5, 0, 0.5]])
+    assert np.allclose(cell_input.get_scaled_positions()[1], frac)
+
+    # Converted when stored in the other block
+    cell_input.set_positions(["O", "Fe"], [[1, 2, 2.5], [0.5, 0, 0.5]], frac=True, scaled=False)
+    assert np.allclose(cell_input["positions_frac"].values, frac)
+    del cell_input["positions_frac"]
+    cell_input.set_scaled_positions(["O", "Fe"], frac, frac=False)
+    assert np.allclose(cell_input["positions_abs"].values, [[1, 2, 2.5], [0.5, 0, 0.5]])
+    assert np.allclose(cell_input.get_scaled_positions()[1], frac)
+    assert np.allclose(cell_input.get_cell_inverse(), np.diag([0.5, 0.25, 0.2]))
+
+    # The cell is only parsed again when the lattice block changes
+    parsed = []
+    parse_cell = CellInput._parse_cell
+    monkeypatch.setattr(CellInput, "_parse_cell", lambda self: parsed.append(1) or parse_cell(self))
+    for _ in range(3):
+        cell_input.get_scaled_positions()
+        cell_input.get_cell()
+    assert not parsed
+    cell_input["lattice_cart"][0] = "3 0 0"
+    assert cell_input.get_cell()[0, 0] == 3
+    cell_input.set_cell([1, 1, 1])
+    assert np.all(cell_input.get_cell_inverse() == np.eye(3))
+    cell_input.set_cell([1, 1, 1, 90, 90, 90], abc=True)
+    assert np.all(cell_input.get_cell() == np.eye(3))
+    assert len(parsed) == 3
+
+    # The cached cell is not changed through the returned arrays
+    cell = cell_input.get_cell()
+    cell[0, 0] = 2
+    assert cell_input.get_cell()[0, 0] == 1
+
 
 @pytest.mark.parametrize(
     "data, expected",
@@ -199,3 +458,234 @@ def test_cell_and_pos(data, expected):
     cin = CellInput.from_file(os.path.join(current_path, f"data/cell_example_{data}.cell"))
     assert cin.get_cell().tolist() == expected["cell"]
     assert cin.get_positions()[1].tolist() == expected["pos"]
+
+
+def test_set_pos_numeric(cell_input):
+    """Positions and cell are kept as arrays until written out"""
+    pos = np.array([[0.1, 0.2, 0.3], [1.0 / 3, 0, 0]])
+    cell_input.set_positions(["O", "Fe"], pos, ["", "SPIN=1"])
+    cell_input.set_cell([3, 4, 5])
+    block = cell_input["positions_abs"]
+    assert block.is_numeric
+    expected = [construct_pos_line(*args) for args in zip(["O", "Fe"], pos, ["", "SPIN=1"])]
+    assert list(block) == expected
+    assert cell_input["lattice_cart"][1] == "0.0000000000  4.0000000000  0.0000000000"
+
+    # No rounding from the string round trip
+    elems, npos, tags = cell_input.get_positions()
+    assert elems == ["O", "Fe"]
+    assert np.all(npos == pos)
+    assert tags == ["", "SPIN=1"]
+
+    # Writing and reading back gives the same content
+    text = cell_input.get_string()
+    assert "%BLOCK positions_abs\nO  0.1000000000 0.2000000000 0.3000000000 \n" in text
+
+
+@pytest.mark.parametrize("data", [1, 2, 3])
+def test_lazy_load(data, tmpdir):
+    """Test loading with the blocks left in the memory mapped file"""
+    fname = os.path.join(current_path, f"data/cell_example_{data}.cell")
+    cin = CellInput.from_file(fname)
+    lazy = CellInput.from_file(fname, lazy=True)
+    assert list(lazy.keys()) == list(cin.keys())
+    assert all(block.is_mapped for block in lazy.values() if isinstance(block, Block))
+    for block in lazy.values():
+        if isinstance(block, Block):
+            assert "\n".join(block.iter_raw_chunks(chunk_size=4)) == block.raw_text()
+
+    # Adding to a list decodes the content
+    mapped = CellInput.from_file(fname, lazy=True)
+    for key, block in mapped.items():
+        if isinstance(block, Block):
+            assert [] + block == cin[key]
+            assert sum([block], []) == cin[key]
+
+    # Unaccessed blocks are copied as they are
+    outname = str(tmpdir.join("lazy.cell"))
+    lazy.save(outname)
+    with open(outname, encoding="utf-8") as fhandle:
+        assert "4 0 0 # A simple lattice" in fhandle.read() or data != 1
+    assert dict(CellInput.from_file(outname)) == dict(cin)
+
+    # Content is decoded on access
+    assert lazy.get_cell().tolist() == cin.get_cell().tolist()
+    assert lazy.get_positions()[1].tolist() == cin.get_positions()[1].tolist()
+    assert dict(lazy) == dict(cin)
+    assert lazy.get_string() == cin.get_string()
+
+    # Saving onto the mapped file itself
+    lazy = CellInput.from_file(outname, lazy=True)
+    lazy.save(outname)
+    assert dict(CellInput.from_file(outname, lazy=True)) == dict(cin)
+
+    # Saving after the mapped file is removed
+    copyname = str(tmpdir.join("copy.cell"))
+    shutil.copy(outname, copyname)
+    lazy = CellInput.from_file(copyname, lazy=True)
+    os.remove(copyname)
+    lazy.save(outname)
+    assert dict(CellInput.from_file(outname)) == dict(cin)
+
+
+@pytest.mark.parametrize("data", [1, 2, 3])
+def test_sidecar(data, tmpdir):
+    """Round trip through the binary sidecar file"""
+    cin = CellInput.from_file(os.path.join(current_path, f"data/cell_example_{data}.cell"))
+    cin.header = ["A header"]
+    cin.units["lattice_cart"] = "ang"
+    cin["cut_off_energy"] = 300.5
+    cin["flag"] = True
+    cin["grid"] = (1, 2, 3)
+    cin["symmetry_generate"] = None
+    cin["species_pot"] = Block(["O O_00.usp"])
+    elems, pos, tags = cin.get_positions()
+    cin.set_positions(elems, pos + 1 / 3, ["SPIN=1"] + tags[1:])
+
+    fname = str(tmpdir.join("sidecar.bin"))
+    cin.save_sidecar(fname)
+    loaded = CellInput.from_sidecar(fname)
+    assert type(loaded) is CellInput
+    assert loaded.get_string() == cin.get_string()
+    assert loaded.header == cin.header
+    assert loaded.units == cin.units
+    assert list(loaded.keys()) == list(cin.keys())
+    assert loaded["cut_off_energy"] == 300.5
+    assert loaded["flag"] is True
+    assert loaded["species_pot"] == ["O O_00.usp"]
+
+    # The arrays are memory mapped without copying
+    block = loaded["positions_abs"]
+    assert block.is_numeric
+    assert np.all(block.values == cin["positions_abs"].values)
+    assert not block.values.flags.writeable
+    assert block.tags.tolist() == cin["positions_abs"].tags.tolist()
+
+    # Overwriting the file does not affect the mapped arrays
+    values = np.array(block.values)
+    CellInput().save_sidecar(fname)
+    assert np.all(block.values == values)
+
+    # Blocks loaded can be modified as usual
+    block.values = block.values * 2
+    block.append("X 0 0 0")
+    assert loaded.get_positions()[0][-1] == "X"
+
+    with open(fname, "w", encoding="utf-8") as fhandle:
+        fhandle.write("%BLOCK lattice_cart\n")
+    with pytest.raises(ValueError):
+        CellInput.from_sidecar(fname)
+
+
+def test_render_cache(cell_input, monkeypatch):
+    """Blocks are only rendered again when changed"""
+    calls = []
+    render = NumericBlock.render
+
+    def counted_render(self, *args):
+        calls.append(self)
+        return render(self, *args)
+
+    monkeypatch.setattr(NumericBlock, "render", counted_render)
+    cell_input.set_positions(["O", "O"], [[0, 0, 0], [1, 0, 0]])
+    cell_input["species_pot"] = Block(["O O_00.usp"])
+    text = cell_input.get_string()
+    assert len(calls) == 1
+
+    cell_input["kpoints_mp_grid"] = [2, 2, 2]
+    assert cell_input.get_string() == text + "kpoints_mp_grid     : 2 2 2\n"
+    assert len(calls) == 1
+
+    # Assigning new values
+    cell_input["positions_abs"].values = [[0, 0, 0], [2, 0, 0]]
+    assert "O  2.0000000000" in cell_input.get_string()
+    assert len(calls) == 2
+
+    # Format and separator of the values
+    cell_input["positions_abs"].fmt = "{:.3f}"
+    assert "O  2.000 0.000 0.000 \n" in cell_input.get_string()
+    cell_input["positions_abs"].sep = "  "
+    assert "O  2.000  0.000  0.000 \n" in cell_input.get_string()
+    assert len(calls) == 4
+    cell_input["positions_abs"].fmt = "{:.10f}"
+    cell_input["positions_abs"].sep = " "
+
+    # Units of the blocks
+    cell_input.units["positions_abs"] = "ang"
+    assert "%BLOCK positions_abs\nang\n" in cell_input.get_string()
+    del cell_input.units["positions_abs"]
+    assert "%BLOCK positions_abs\nO" in cell_input.get_string()
+
+    # In-place modification of plain blocks
+    cell_input["species_pot"].append("C C_00.usp")
+    assert "O O_00.usp\nC C_00.usp\n%ENDBLOCK" in cell_input.get_string()
+    cell_input["species_pot"][0] = "O O_01.usp"
+    assert "O O_01.usp\nC C_00.usp\n%ENDBLOCK" in cell_input.get_string()
+
+    del cell_input["species_pot"]
+    assert "species_pot" not in cell_input.get_string()
+    assert "species_pot" not in cell_input._rendered
+
+
+@pytest.mark.parametrize("cache", [True, False])
+def test_write_to(basic_input, cache):
+    """Streaming the output gives the same content as get_string"""
+    cell = CellInput(basic_input)
+    cell.set_positions(["O"] * 10, np.random.random((10, 3)))
+    for chunk_lines in (1, 3, 100):
+        fhandle = io.StringIO()
+        cell.write_to(fhandle, cache=cache, chunk_lines=chunk_lines)
+        assert fhandle.getvalue() == cell.get_string()
+    assert list(cell.iter_lines(cache=cache)) == cell.get_file_lines()
+
+    fhandle = io.StringIO()
+    CastepInput().write_to(fhandle)
+    assert fhandle.getvalue() == CastepInput().get_string()
+
+
+def _peak_write_memory(natoms, tmpdir):
+    """Peak memory traced when streaming a cell with the given number of atoms"""
+    cell = CellInput()
+    cell.set_cell([10, 10, 10])
+    cell.set_positions(["O"] * natoms, np.random.random((natoms, 3)))
+    outname = str(tmpdir.join("out.cell"))
+    tracemalloc.start()
+    try:
+        cell.save(outname, cache=False)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _peak_lazy_copy_memory(natoms, tmpdir):
+    """Peak memory traced when saving a lazily loaded cell"""
+    cell = CellInput()
+    cell.set_cell([10, 10, 10])
+    cell.set_positions(["O"] * natoms, np.random.random((natoms, 3)))
+    fname = str(tmpdir.join("in.cell"))
+    cell.save(fname)
+    assert not cell._rendered
+    lazy = CellInput.from_file(fname, lazy=True)
+    tracemalloc.start()
+    try:
+        lazy.save(str(tmpdir.join("out.cell")))
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_save_memory(tmpdir):
+    """Saving lazily loaded blocks does not buffer the whole file"""
+    _peak_lazy_copy_memory(100, tmpdir)
+    small = _peak_lazy_copy_memory(20000, tmpdir)
+    large = _peak_lazy_copy_memory(200000, tmpdir)
+    assert large < 2 * small + (4 << 20)
+
+
+def test_write_to_memory(tmpdir):
+    """Streaming a NumericBlock does not buffer the whole block"""
+    _peak_write_memory(100, tmpdir)  # Build the lookup tables used for formatting
+    small = _peak_write_memory(20000, tmpdir)
+    large = _peak_write_memory(200000, tmpdir)
+    # The rendered text of the large block is about 10 MB
+    assert large < 2 * small + (1 << 20)
@@ -0,0 +1,40 @@
+"""
+Tests for the registry of keywords
+"""
+import pytest
+
+from castepinput import keywords
+from castepinput.parser import convert_type_kw
+
+
+def test_registry():
+    """Look up the known keywords"""
+    kw = keywords.get_keyword("CUT_OFF_ENERGY")
+    assert kw.type == "physical"
+    assert kw.dimension == "energy"
+    assert "ev" in keywords.allowed_units("cut_off_energy")
+    assert keywords.allowed_units("task") == ()
+    assert keywords.allowed_units("not_a_keyword") == ()
+    assert keywords.get_keyword("not_a_keyword") is None
+    assert keywords.get_keyword("geom_spin_fix").type == "integer"
+    assert convert_type_kw("-3", "geom_spin_fix") == -3
+    # Blocks are not keywords
+    assert keywords.get_keyword("hubbard_alpha") is None
+    for name, kw in keywords.KEYWORDS.items():
+        assert name == kw.name == name.lower()
+        assert kw.convert is keywords.CONVERTERS[kw.type]
+
+
+def test_register_keyword():
+    """Registering new keywords"""
+    assert convert_type_kw("1 2", "my_keyword") == [1, 2]
+    keywords.register_keyword("MY_KEYWORD", "string")
+    try:
+        assert convert_type_kw("1 2", "my_keyword") == "1 2"
+    finally:
+        del keywords.KEYWORDS["my_keyword"]
+
+    with pytest.raises(ValueError):
+        keywords.register_keyword("my_keyword", "complex")
+    with pytest.raises(ValueError):
+        keywords.register_keyword("my_keyword", "physical", "volume")
@@ -4,8 +4,9 @@ Test parser
 
 import os
 import pytest
-from castepinput.parser import PlainParser, Parser
-from castepinput.parser import Block
+from castepinput.parser import PlainParser, Parser, parse_mapped
+from castepinput.parser import convert_type_kw, _convert_type_slow
+from castepinput.parser import Block, FormatError, parse_buffer
 
 current_path = os.path.split(__file__)[0]
 
@@ -101,3 +102,154 @@ def test_cell_parser(parser):
     assert out_dict["cut_off_energy"] == 300
     assert out_dict["xc_functional"] == "pbesol"
     assert out_dict["symmetry_generate"] == ""
+
+
+@pytest.mark.parametrize("data", [1, 2, 3])
+def test_single_pass(data):
+    """The single pass parse gives the same results as the staged one"""
+    fname = os.path.join(current_path, f"data/cell_example_{data}.cell")
+    staged = PlainParser(fname)
+    staged._clean_up_lines()
+    staged._split_block_kw()
+    staged._parse_keywords()
+
+    with open(fname, encoding="utf-8") as fhandle:
+        parser = PlainParser(fhandle)
+        parser.parse()
+    assert parser._keywords == staged._keywords
+    assert parser._blocks == staged._blocks
+    assert parser.comments == staged.comments
+    assert parser.get_dict() == parser.get_dict()
+
+
+@pytest.mark.parametrize("data", [1, 2, 3])
+def test_regex_engine(data):
+    """The regex engine gives the same results as the line by line one"""
+    fname = os.path.join(current_path, f"data/cell_example_{data}.cell")
+    lines = PlainParser(fname)
+    regex = PlainParser(fname, engine="regex")
+    assert regex.get_dict() == lines.get_dict()
+    assert regex.comments == lines.comments
+    assert Parser(fname, engine="regex").get_dict() == Parser(fname).get_dict()
+
+
+@pytest.mark.parametrize(
+    "lines",
+    [
+        lines_example + block_lines,
+        ["a ! b # c", "!d # e", "  # f ! g", "h ! i ! j", "k#"],
+        ["  %BLOCK x  ", " 1 2 ! 3 ", "%ENDBLOCK X", "x %block y", "# %block z"],
+        ["%BLOCK a", "%blockx 1", "1 2 % 3", "%ENDBLOCK a", "%key 1", "%ENDBLOCKS", ""],
+        ["%BLOCK a ! c", "", "%ENDBLOCK a", "%BLOCK a", "2", "%ENDBLOCK a", "x 1", "x 2"],
+    ],
+)
+def test_parse_buffer(lines):
+    """Comments, blocks and keywords are found as by tokenize"""
+    parser = PlainParser(lines)
+    parser.parse()
+    keywords, blocks, comments = parse_buffer("\n".join(lines))
+    assert keywords == parser._keywords
+    assert list(blocks.items()) == list(parser._blocks.items())
+    assert comments == parser.comments
+
+
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        PlainParser(lines_example, engine="fast")
+
+
+def test_percent_lines():
+    """Lines starting with % that are not block markers"""
+    lines = ["%BLOCK a", "%blockx 1", "1 2 % 3", "%ENDBLOCK a", "%key 1", "%ENDBLOCKS"]
+    assert PlainParser(lines).get_dict() == {
+        "a": ["%blockx 1", "1 2 % 3"],
+        "%key": "1",
+        "%endblocks": "",
+    }
+
+    staged = PlainParser(lines)
+    staged._clean_up_lines()
+    blocks, kwlines = staged._split_block_kw()
+    assert blocks == {"a": ["%blockx 1", "1 2 % 3"]}
+    assert kwlines == ["%key 1", "%ENDBLOCKS"]
+
+
+@pytest.mark.parametrize(
+    "lines",
+    [
+        ["%BLOCK A", "%BLOCK B", "%ENDBLOCK B"],
+        ["%ENDBLOCK A"],
+        ["%BLOCK A", "1 2 3", "%ENDBLOCK B"],
+        ["%BLOCK A", "1 2 3"],
+    ],
+)
+def test_block_errors(lines, tmpdir):
+    """Malformed blocks are reported"""
+    with pytest.raises(FormatError):
+        PlainParser(lines).get_dict()
+    with pytest.raises(FormatError):
+        PlainParser(lines, engine="regex").get_dict()
+
+    staged = PlainParser(lines)
+    staged._clean_up_lines()
+    with pytest.raises(FormatError):
+        staged._split_block_kw()
+
+    fname = str(tmpdir.join("error.cell"))
+    with open(fname, "w", encoding="utf-8") as fhandle:
+        fhandle.write("\n".join(lines))
+    with pytest.raises(FormatError):
+        parse_mapped(fname)
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("", ""),
+        ("True", True),
+        (" false ", False),
+        ("300", 300),
+        ("-3", -3),
+        ("1_000", 1000),
+        ("1e-3", 1e-3),
+        ("2.", 2.0),
+        (".5", 0.5),
+        ("4 4 4", [4, 4, 4]),
+        ("0.25 0 0.25", [0.25, 0.0, 0.25]),
+        ("inf", float("inf")),
+        ("  ", []),
+        ("300 eV", "300 eV"),
+        ("fine", "fine"),
+        ("geometryoptimisation", "geometryoptimisation"),
+    ],
+)
+def test_convert_type(value, expected):
+    """Type conversion gives the same result as trying each converter"""
+    out = convert_type_kw(value)
+    assert out == expected
+    assert type(out) is type(expected)
+    assert out == _convert_type_slow(value)
+
+
+@pytest.mark.parametrize(
+    "key, value, expected",
+    [
+        ("comment", "123", "123"),
+        ("task", "True", "True"),
+        ("cut_off_energy", "300", 300.0),
+        ("cut_off_energy", "300 eV", "300 eV"),
+        ("elec_energy_tol", "1.0d-6", 1e-6),
+        ("fix_all_cell", "T", True),
+        ("max_scf_cycles", "30", 30),
+        ("kpoints_mp_grid", "4 4 4", [4, 4, 4]),
+        ("kpoints_mp_offset", "0 0 0.5", [0.0, 0.0, 0.5]),
+        ("symmetry_generate", "", ""),
+        ("symmetry_generate", "yes", "yes"),
+        ("unknown_keyword", "1 2", [1, 2]),
+    ],
+)
+def test_convert_type_registry(key, value, expected):
+    """Known keywords are converted by their types"""
+    out = convert_type_kw(value, key)
+    assert out == expected
+    assert type(out) is type(expected)
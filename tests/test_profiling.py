@@ -0,0 +1,61 @@
+"""
+Tests for collecting the stats of the stages
+"""
+import os
+
+from castepinput import CellInput, profiling
+
+current_path = os.path.split(__file__)[0]
+
+
+def test_stats_collector(tmpdir):
+    """Stats are collected only inside the context"""
+    fname = os.path.join(current_path, "data/cell_example_1.cell")
+    CellInput.from_file(fname)
+    assert not profiling.enabled()
+
+    with profiling.StatsCollector() as stats:
+        assert profiling.enabled()
+        cell = CellInput.from_file(fname)
+        cell.save(str(tmpdir.join("out.cell")), cache=True)
+        lazy = CellInput.from_file(fname, lazy=True)
+        lazy.get_cell()
+    assert not profiling.enabled()
+    CellInput.from_file(fname)
+
+    stats = stats.stats
+    assert stats["tokenize"]["calls"] == 1
+    with open(fname, encoding="utf-8") as fhandle:
+        assert stats["tokenize"]["lines"] == len(fhandle.readlines())
+    assert stats["tokenize"]["blocks"] == 2
+    assert stats["tokenize"]["keywords"] == 2
+    assert stats["convert_type"]["values"] == 2
+    assert stats["convert_type"]["unconverted"] == 0
+    assert stats["load"]["calls"] == 2
+    assert stats["parse_mapped"]["blocks"] == 2
+    assert stats["detach_block"]["calls"] == 1
+    assert stats["render_block"]["calls"] == 2
+    assert stats["write"]["lines"] == cell.get_string().count("\n")
+    assert all(entry["time"] >= 0 for entry in stats.values())
+
+
+def test_hooks():
+    """Hooks are called with each stage"""
+    calls = []
+
+    def hook(stage, elapsed, counts):
+        calls.append((stage, counts))
+
+    profiling.add_hook(hook)
+    try:
+        CellInput(a="1", b=[1, 2]).get_string()
+        with profiling.StatsCollector() as stats:
+            profiling.record("custom", profiling.start(), items=3)
+    finally:
+        profiling.remove_hook(hook)
+    assert calls == [("custom", {"items": 3})]
+    assert stats.stats["custom"]["items"] == 3
+    assert "custom" in stats.summary()
+    # Nothing is recorded without a start time
+    profiling.record("custom", None)
+    assert stats.stats["custom"]["calls"] == 1
@@ -0,0 +1,142 @@
+"""
+Tests for scanning many inputs
+"""
+import os
+import shutil
+import tarfile
+
+import pytest
+
+from castepinput.common import FormatError
+from castepinput.scan import ScanIndex, scan, scan_lines
+
+current_path = os.path.split(__file__)[0]
+
+
+def test_scan_lines():
+    """Keywords are extracted and the lines of blocks counted"""
+    lines = [
+        "! comment",
+        "task : singlepoint # trailing",
+        "cut_off_energy = 300",
+        "%BLOCK positions_abs",
+        "ang # unit",
+        "O 0 0 0",
+        "# comment in block",
+        "H 1 0 0 ! a comment",
+        "%ENDBLOCK positions_abs",
+        "%block species_pot",
+        "O O_00.usp",
+        "%endblock species_pot",
+        "symmetry_generate",
+    ]
+    values, blocks = scan_lines(lines)
+    assert values == {"task": "singlepoint", "cut_off_energy": "300", "symmetry_generate": ""}
+    assert blocks == {"positions_abs": (2, "ang"), "species_pot": (1, None)}
+    values, _ = scan_lines(lines, keywords={"task"})
+    assert values == {"task": "singlepoint"}
+
+    # Only blocks that can carry a unit are checked for one
+    _, blocks = scan_lines(["%block species_pot", "C19", "%endblock species_pot"])
+    assert blocks == {"species_pot": (1, None)}
+
+
+@pytest.mark.parametrize(
+    "lines",
+    [
+        ["%block positions_abs", "O 0 0 0", "task : singlepoint"],
+        ["%block positions_abs", "O 0 0 0", "%endblock positions_frac"],
+        ["%block positions_abs", "%block species_pot", "%endblock species_pot"],
+        ["%endblock positions_abs"],
+    ],
+)
+def test_scan_lines_errors(lines):
+    """Blocks that are not closed properly are errors"""
+    with pytest.raises(FormatError):
+        scan_lines(lines)
+
+
+@pytest.fixture
+def seed_dir(tmpdir):
+    """A directory with input files and a tar archive of them"""
+    root = tmpdir.mkdir("seeds")
+    sub = root.mkdir("sub")
+    for i in (1, 2, 3):
+        shutil.copy(os.path.join(current_path, f"data/cell_example_{i}.cell"), str(sub))
+    with open(str(root.join("test.param")), "w", encoding="utf-8") as fhandle:
+        fhandle.write("task : geometryoptimisation\ncut_off_energy : 500 # eV\n")
+    root.join("notes.txt").write("task : ignored\n")
+    with tarfile.open(str(root.join("archive.tar.gz")), "w:gz") as archive:
+        archive.add(str(sub), arcname="sub")
+    return root
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_scan(seed_dir, workers):
+    """Scan files and tar members"""
+    results = list(scan(str(seed_dir), keywords=["TASK", "kpoints_mp_grid"], workers=workers))
+    members = sorted((os.path.basename(res.path), res.member) for res in results)
+    assert members == [
+        ("archive.tar.gz", "sub/cell_example_1.cell"),
+        ("archive.tar.gz", "sub/cell_example_2.cell"),
+        ("archive.tar.gz", "sub/cell_example_3.cell"),
+        ("cell_example_1.cell", ""),
+        ("cell_example_2.cell", ""),
+        ("cell_example_3.cell", ""),
+        ("test.param", ""),
+    ]
+    for res in results:
+        assert res.error is None
+        if res.path.endswith(".param"):
+            assert res.keywords == {"task": "geometryoptimisation"}
+        else:
+            assert res.keywords == {"kpoints_mp_grid": "1 1 1"}
+            name = "positions_frac" if "_3" in res.member + res.path else "positions_abs"
+            assert res.blocks[name] == (2, None)
+
+    # Errors are reported in the result of the file
+    seed_dir.join("broken.cell").write("%block positions_abs\nO 0 0 0\n")
+    results = [
+        res for res in scan(str(seed_dir), workers=workers) if res.path.endswith("broken.cell")
+    ]
+    assert len(results) == 1
+    assert "positions_abs" in results[0].error
+    assert results[0].mtime is not None
+    with tarfile.open(str(seed_dir.join("broken.tar")), "w") as archive:
+        archive.add(str(seed_dir.join("broken.cell")), arcname="broken.cell")
+    results = list(scan(str(seed_dir.join("broken.tar")), workers=workers))
+    assert "positions_abs" in results[0].error
+
+
+def test_scan_index(seed_dir, tmpdir):
+    """The index is only updated for modified files"""
+    db_path = str(tmpdir.join("index.db"))
+    with ScanIndex(db_path, keywords=["task", "cut_off_energy"]) as index:
+        assert index.update(str(seed_dir), workers=1) == 5
+        rows = index.query("SELECT value FROM keywords WHERE key = 'cut_off_energy'")
+        assert rows == [("500",)]
+        natoms = index.query(
+            "SELECT SUM(nlines) FROM blocks WHERE name IN ('positions_abs', 'positions_frac')"
+        )
+        assert natoms == [(12,)]
+        # Nothing changed
+        assert index.update(str(seed_dir), workers=1) == 0
+
+    param = str(seed_dir.join("test.param"))
+    with open(param, "a", encoding="utf-8") as fhandle:
+        fhandle.write("%BLOCK devel_code\n1 2 3\n%ENDBLOCK devel_code\n")
+    os.utime(param, (1, 1))
+    os.remove(str(seed_dir.join("sub", "cell_example_1.cell")))
+
+    with ScanIndex(db_path, keywords=["cut_off_energy", "task"]) as index:
+        assert index.update(str(seed_dir), workers=1) == 1
+        res = index.get(param)
+        assert res.keywords == {"task": "geometryoptimisation", "cut_off_energy": "500"}
+        assert res.blocks == {"devel_code": (1, None)}
+        assert index.query("SELECT COUNT(*) FROM inputs") == [(6,)]
+        assert index.get(str(seed_dir.join("sub", "cell_example_1.cell"))) is None
+
+    # Changing the keywords rebuilds the index
+    with ScanIndex(db_path, keywords=["task"]) as index:
+        assert index.query("SELECT COUNT(*) FROM inputs") == [(0,)]
+        assert index.update(str(seed_dir), workers=1) == 4
@@ -0,0 +1,68 @@
+"""
+Tests for the tags of positions
+"""
+import numpy as np
+import pytest
+
+from castepinput import CellInput, PositionTags
+from castepinput.common import Block
+from castepinput.tags import parse_tag
+
+
+def test_parse_tag():
+    """Parse the tags of a single line"""
+    spin, label, mixture, weight, other = parse_tag("SPIN=2.0 LABEL=Fe1")
+    assert (spin, label, mixture, other) == (2.0, "Fe1", -1, "")
+    assert np.isnan(weight)
+    spin, label, mixture, weight, other = parse_tag("spin : -1.5d0 MIXTURE=( 1 0.5 ) NOISE=1")
+    assert (spin, label, mixture, weight, other) == (-1.5, "", 1, 0.5, "NOISE=1")
+    spin, label, mixture, weight, other = parse_tag("")
+    assert np.isnan(spin) and np.isnan(weight)
+    assert (label, mixture, other) == ("", -1, "")
+
+
+def test_position_tags():
+    """Columns of the tags and writing them back"""
+    strings = ["SPIN=2 LABEL=Fe1", "", "SPIN=-1.5 MIXTURE=(1 0.5) NOISE", "SPIN=2 LABEL=Fe1"]
+    tags = PositionTags.from_strings(strings)
+    assert len(tags) == 4
+    assert np.array_equal(tags.spin, [2.0, np.nan, -1.5, 2.0], equal_nan=True)
+    assert tags.label.tolist() == ["Fe1", "", "", "Fe1"]
+    assert tags.mixture.tolist() == [-1, -1, 1, -1]
+    assert tags.other.tolist() == ["", "", "NOISE", ""]
+    assert tags.to_strings().tolist() == strings
+
+    # Only the order of the tags is normalised
+    assert PositionTags.from_strings(["LABEL=a spin=1.0"]).to_strings().tolist() == [
+        "SPIN=1 LABEL=a"
+    ]
+
+    subset = tags[2:]
+    assert isinstance(subset, PositionTags)
+    assert subset.mixture.tolist() == [1, -1]
+    assert tags[0][:3] == (2.0, "Fe1", -1)
+
+    tags = PositionTags([1.0, np.nan])
+    assert tags.to_strings().tolist() == ["SPIN=1", ""]
+    assert PositionTags.from_strings([]).to_strings().tolist() == []
+    with pytest.raises(ValueError):
+        PositionTags([1.0], label=["a", "b"])
+    with pytest.raises(AttributeError):
+        tags.extra = 1
+
+
+def test_cell_position_tags():
+    """Tags of the positions of a CellInput"""
+    cell = CellInput()
+    cell["positions_abs"] = Block(["Fe 0 0 0 SPIN=2", "Fe 0.5 0.5 0.5 SPIN=-2", "O 0 0 1"])
+    tags = cell.get_position_tags()
+    assert np.array_equal(tags.spin, [2.0, -2.0, np.nan], equal_nan=True)
+
+    tags.spin = np.nan_to_num(-tags.spin)
+    elems, pos, _ = cell.get_positions()
+    cell.set_positions(elems, pos, tags)
+    assert cell["positions_abs"].tags.tolist() == ["SPIN=-2", "SPIN=2", "SPIN=0"]
+    assert cell.get_position_tags().spin.tolist() == [-2.0, 2.0, 0.0]
+
+    cell.set_positions(elems, pos)
+    assert cell.get_position_tags().to_strings().tolist() == ["", "", ""]